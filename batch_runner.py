@@ -0,0 +1,351 @@
+"""
+Headless NL2SQL batch runner.
+
+Reads questions from a file, generates SQL for them with bounded
+concurrency, runs each statement through the same security gate as the app
+and executes it on a pooled Oracle session. One record per question is
+streamed to JSONL or Parquet as soon as it finishes, with per-stage
+timings and errors.
+
+Questions are read one per line (blank lines and lines starting with # are
+skipped), or from a .jsonl file of {"id": ..., "question": ...} objects.
+Connection and gate settings come from the same environment variables as
+the app; the password is read from ORACLE_PASSWORD or prompted for.
+
+    python batch_runner.py questions.txt --output results.jsonl
+    python batch_runner.py questions.jsonl --output results.parquet --format parquet \\
+        --generate-workers 16 --execute-workers 8
+"""
+import argparse
+import getpass
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from dotenv import load_dotenv
+from deferred_values import deferred_columns, resolve
+from generation_cache import GenerationCache
+from groq_handler import GroqHandler, retryable_error
+from llm_scheduler import RequestScheduler
+from oracle_manager import OracleManager
+from security import SecurityManager
+import telemetry
+
+# Fields of every output record
+FIELDS = [
+    "index", "id", "question", "sql", "status", "error", "rows", "truncated",
+    "columns", "data", "schema_ms", "generate_ms", "gate_ms", "execute_ms", "total_ms",
+    "gate_reason", "limited", "started_at",
+]
+
+
+def read_questions(path: str) -> List[Tuple[str, str]]:
+    """(id, question) pairs from a text or JSON-lines file."""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                entry = json.loads(line)
+                items.append((str(entry.get("id", number)), entry["question"]))
+            else:
+                items.append((str(number), line))
+    return items
+
+
+def _optional_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+def _gate_threshold(name: str, default: str) -> Optional[float]:
+    """A plan-gate threshold; "none" or "off" disables it."""
+    value = os.getenv(name, default).strip()
+    return None if value.lower() in ("", "none", "off") else float(value)
+
+
+def build_oracle(sessions: int) -> OracleManager:
+    """An OracleManager configured like the app's, always pooled with room for every executor."""
+    return OracleManager(
+        os.getenv("ORACLE_DSN"),
+        use_pool=True,
+        pool_min=int(os.getenv("ORACLE_POOL_MIN", "1")),
+        pool_max=max(sessions, int(os.getenv("ORACLE_POOL_MAX", "4"))),
+        pool_increment=int(os.getenv("ORACLE_POOL_INCREMENT", "1")),
+        pool_wait_timeout=float(os.getenv("ORACLE_POOL_WAIT_TIMEOUT", "10")),
+        stmt_cache_size=int(os.getenv("ORACLE_STMT_CACHE_SIZE", "20")),
+        pool_user=os.getenv("ORACLE_POOL_USER"),
+        pool_password=os.getenv("ORACLE_POOL_PASSWORD"),
+        proxy_auth=os.getenv("ORACLE_POOL_PROXY_AUTH", "false").lower() == "true",
+        fetch_batch_size=int(os.getenv("ORACLE_FETCH_BATCH_SIZE", "1000")),
+        max_bytes=int(os.getenv("ORACLE_MAX_BYTES", str(256 * 1024 * 1024))),
+        catalog_dir=os.getenv("SCHEMA_CATALOG_DIR", ".schema_catalog"),
+        catalog_owners=[o.strip() for o in os.getenv("SCHEMA_CATALOG_OWNERS", "").split(",") if o.strip()],
+        auto_bind=os.getenv("ORACLE_AUTO_BIND", "true").lower() == "true",
+        lob_inline_limit=int(os.getenv("ORACLE_LOB_INLINE_LIMIT", str(64 * 1024))),
+    )
+
+
+def build_security() -> SecurityManager:
+    return SecurityManager(
+        max_cost=_gate_threshold("SQL_GATE_MAX_COST", "100000"),
+        max_cardinality=_gate_threshold("SQL_GATE_MAX_CARDINALITY", "1000000"),
+        max_full_scan_blocks=_gate_threshold("SQL_GATE_MAX_FULL_SCAN_BLOCKS", "100000"),
+        allow_cartesian=os.getenv("SQL_GATE_ALLOW_CARTESIAN", "false").lower() == "true",
+        action=os.getenv("SQL_GATE_ACTION", "limit"),
+        row_limit=int(os.getenv("SQL_GATE_ROW_LIMIT", "1000")),
+        fail_closed=os.getenv("SQL_GATE_FAIL_CLOSED", "true").lower() == "true",
+    )
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Result rows as JSON-ready dicts, with deferred LOBs in full and NaN as null."""
+    if df.empty:
+        return []
+    df = df.astype(object).where(df.notna(), None)
+    for column in deferred_columns(df):
+        df[column] = df[column].map(resolve)
+    return df.to_dict("records")
+
+
+class BatchRunner:
+    """
+    Pipelines generation and execution over one thread pool: at most
+    generate_workers LLM calls and execute_workers database sessions are
+    in use at any time, so a question can be executing while later ones
+    are still being generated.
+    """
+
+    def __init__(self, groq: GroqHandler, oracle: OracleManager, security: SecurityManager,
+                 generate_workers: int = 8, execute_workers: int = 4,
+                 max_rows: int = 1000, timeout: Optional[float] = None,
+                 schema_context: bool = True):
+        self.groq = groq
+        self.oracle = oracle
+        self.security = security
+        self.generate_workers = generate_workers
+        self.execute_workers = execute_workers
+        self.max_rows = max_rows
+        # Per round-trip database call limit in seconds; None means no limit
+        self.timeout = timeout
+        self.schema_context = schema_context
+        self._generate_slots = threading.BoundedSemaphore(generate_workers)
+        self._execute_slots = threading.BoundedSemaphore(execute_workers)
+
+    def run(self, questions: List[Tuple[str, str]]) -> Iterator[Dict[str, Any]]:
+        """Yield one record per question in completion order."""
+        workers = self.generate_workers + self.execute_workers
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+            futures = [
+                pool.submit(self._run_item, index, item_id, question)
+                for index, (item_id, question) in enumerate(questions)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _run_item(self, index: int, item_id: str, question: str) -> Dict[str, Any]:
+        record: Dict[str, Any] = dict.fromkeys(FIELDS)
+        record.update(index=index, id=item_id, question=question, status="failed", started_at=time.time())
+        start = time.perf_counter()
+        with telemetry.use_trace(telemetry.Trace(f"Batch #{item_id}")):
+            try:
+                self._pipeline(question, record)
+            except Exception as e:
+                logging.error(f"Batch item {item_id} failed: {str(e)}")
+                record["error"] = str(e)
+        record["total_ms"] = _ms(time.perf_counter() - start)
+        return record
+
+    def _pipeline(self, question: str, record: Dict[str, Any]):
+        with self._generate_slots:
+            context = None
+            if self.schema_context:
+                stage = time.perf_counter()
+                with telemetry.span("schema.context"):
+                    context = self.oracle.schema_context(question)
+                record["schema_ms"] = _ms(time.perf_counter() - stage)
+            stage = time.perf_counter()
+            sql = self.groq._generate_sql(question, context)
+            record["generate_ms"] = _ms(time.perf_counter() - stage)
+        if not sql:
+            record["error"] = "Empty response from Groq API."
+            return
+        record["sql"] = sql
+
+        with self._execute_slots:
+            if not self.security.sanitize_input(sql):
+                record["status"] = "blocked"
+                record["error"] = "Query blocked by security rules"
+                return
+            stage = time.perf_counter()
+            with telemetry.span("sql.plan_check"):
+                verdict = self.security.check_plan(self.oracle, sql)
+            record["gate_ms"] = _ms(time.perf_counter() - stage)
+            record["gate_reason"] = verdict.reason
+            record["limited"] = verdict.limited
+            if not verdict.allowed:
+                record["status"] = "blocked"
+                record["error"] = f"Query blocked by the plan check: {verdict.reason}"
+                return
+
+            stage = time.perf_counter()
+            df = self.oracle.stream_query(
+                verdict.sql, max_rows=self.max_rows, use_cache=False,
+                call_timeout_ms=int(self.timeout * 1000) if self.timeout else 0,
+            ).to_dataframe()
+            record["execute_ms"] = _ms(time.perf_counter() - stage)
+
+        record["status"] = "done"
+        record["rows"] = len(df)
+        record["truncated"] = bool(df.attrs.get("truncated", False))
+        record["columns"] = [str(c) for c in df.columns]
+        record["data"] = _records(df)
+
+
+class JsonlWriter:
+    def __init__(self, path: Optional[str]):
+        self._file = open(path, "w", encoding="utf-8") if path else sys.stdout
+
+    def write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class ParquetWriter:
+    """
+    Streams records into a Parquet file one row group per flush_every records.
+    Result rows and column lists are stored as JSON text so every record
+    shares one schema regardless of its result's shape.
+    """
+
+    def __init__(self, path: str, flush_every: int = 50):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self.schema = pa.schema([
+            ("index", pa.int64()), ("id", pa.string()), ("question", pa.string()),
+            ("sql", pa.string()), ("status", pa.string()), ("error", pa.string()),
+            ("rows", pa.int64()), ("truncated", pa.bool_()), ("columns", pa.string()),
+            ("data", pa.string()), ("schema_ms", pa.float64()), ("generate_ms", pa.float64()),
+            ("gate_ms", pa.float64()), ("execute_ms", pa.float64()), ("total_ms", pa.float64()),
+            ("gate_reason", pa.string()), ("limited", pa.bool_()), ("started_at", pa.float64()),
+        ])
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        self.flush_every = flush_every
+        self._pending: List[Dict[str, Any]] = []
+
+    def write(self, record: Dict[str, Any]):
+        row = dict(record)
+        for field in ("columns", "data"):
+            if row[field] is not None:
+                row[field] = json.dumps(row[field], default=str)
+        self._pending.append(row)
+        if len(self._pending) >= self.flush_every:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._writer.write_table(self._pa.Table.from_pylist(self._pending, schema=self.schema))
+            self._pending = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="text file with one question per line, or a .jsonl file")
+    parser.add_argument("--output", help="output file; JSONL goes to stdout when omitted")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--user", default=os.getenv("ORACLE_USER"), help="defaults to ORACLE_USER")
+    parser.add_argument("--generate-workers", type=int, default=int(os.getenv("BATCH_GENERATE_WORKERS", "8")),
+                        help="concurrent LLM calls")
+    parser.add_argument("--execute-workers", type=int, default=int(os.getenv("BATCH_EXECUTE_WORKERS", "4")),
+                        help="concurrent database sessions")
+    parser.add_argument("--max-rows", type=int, default=int(os.getenv("BATCH_MAX_ROWS", "1000")),
+                        help="rows fetched and recorded per question")
+    parser.add_argument("--timeout", type=float, default=float(os.getenv("QUERY_TIMEOUT_SECONDS", "120")),
+                        help="per database call limit in seconds; 0 disables it")
+    parser.add_argument("--no-cache", action="store_true", help="always call the model, bypassing the NL2SQL cache")
+    parser.add_argument("--no-schema-context", action="store_true", help="do not send catalog tables with questions")
+    parser.add_argument("--flush-every", type=int, default=50, help="records per Parquet row group")
+    args = parser.parse_args()
+
+    if args.format == "parquet" and not args.output:
+        parser.error("--format parquet requires --output")
+    if not args.user:
+        parser.error("--user or ORACLE_USER is required")
+
+    telemetry.configure(
+        level=os.getenv("TELEMETRY_LEVEL", "summary"),
+        jsonl_path=os.getenv("TELEMETRY_JSONL_PATH") or None,
+    )
+    questions = read_questions(args.questions)
+
+    oracle = build_oracle(args.execute_workers)
+    password = os.getenv("ORACLE_PASSWORD") or getpass.getpass(f"Password for {args.user}: ")
+    if not oracle.connect(args.user, password):
+        sys.exit("Could not connect to the database.")
+    if not args.no_schema_context:
+        oracle.refresh_catalog()
+
+    cache = None
+    if not args.no_cache:
+        similarity = os.getenv("NL2SQL_CACHE_SIMILARITY")
+        cache = GenerationCache(
+            os.getenv("NL2SQL_CACHE_PATH", ".nl2sql_cache.sqlite3"),
+            max_entries=int(os.getenv("NL2SQL_CACHE_MAX_ENTRIES", "5000")),
+            similarity_threshold=float(similarity) if similarity else None,
+        )
+    scheduler = RequestScheduler(
+        requests_per_minute=_optional_float("GROQ_REQUESTS_PER_MINUTE"),
+        tokens_per_minute=_optional_float("GROQ_TOKENS_PER_MINUTE"),
+        max_retries=int(os.getenv("GROQ_MAX_RETRIES", "4")),
+        retryable=retryable_error,
+    )
+    runner = BatchRunner(
+        GroqHandler(cache=cache, scheduler=scheduler), oracle, build_security(),
+        generate_workers=args.generate_workers, execute_workers=args.execute_workers,
+        max_rows=args.max_rows, timeout=args.timeout or None,
+        schema_context=not args.no_schema_context,
+    )
+
+    writer = ParquetWriter(args.output, args.flush_every) if args.format == "parquet" else JsonlWriter(args.output)
+    counts: Dict[str, int] = {}
+    start = time.perf_counter()
+    try:
+        for record in runner.run(questions):
+            writer.write(record)
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+    finally:
+        writer.close()
+        oracle.close_pool()
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"{len(questions)} questions in {elapsed:.1f}s "
+          f"({len(questions) / elapsed if elapsed else 0:.2f}/s): {summary}", file=sys.stderr)
+    llm = scheduler.stats()
+    print(f"LLM requests: {llm['requests']}, retries: {llm['retries']} (rate limited: {llm['rate_limited']}), "
+          f"coalesced: {llm['coalesced']}, avg wait: {llm['avg_wait_ms']:.0f} ms", file=sys.stderr)
+    sys.exit(1 if counts.get("failed") else 0)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    main()
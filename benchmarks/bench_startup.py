@@ -0,0 +1,103 @@
+"""
+Startup and rerun latency of the Streamlit app.
+
+Measures, each in a fresh interpreter so module caches start cold:
+  * import time of main_app's dependencies,
+  * the first script run of main_app (cold start),
+  * subsequent reruns, which is the overhead every widget interaction pays.
+
+Results are written as JSON lines so runs can be appended and compared:
+
+    python benchmarks/bench_startup.py --reruns 20 --output startup.jsonl
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from common import ROOT, write_records
+
+MODULES = [
+    "streamlit", "pandas", "numpy", "cx_Oracle", "groq", "plotly.express",
+    "sklearn.ensemble", "pyarrow", "groq_handler", "oracle_manager", "health_monitor",
+]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+APP_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+reruns = int(sys.argv[1])
+start = time.perf_counter()
+app = AppTest.from_file("main_app.py", default_timeout=60)
+app.run()
+cold = time.perf_counter() - start
+timings = []
+for _ in range(reruns):
+    start = time.perf_counter()
+    app.run()
+    timings.append(time.perf_counter() - start)
+print(json.dumps({
+    "cold_run_seconds": cold,
+    "rerun_seconds": timings,
+    "exceptions": [str(e.value) for e in app.exception],
+    "heavy_modules_loaded": sorted(
+        m for m in ("plotly", "sklearn", "pyarrow", "joblib") if m in sys.modules
+    ),
+}))
+"""
+
+
+def _run(script: str, *args: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", script, *args],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per measurement")
+    parser.add_argument("--output", help="append JSON lines here instead of stdout")
+    args = parser.parse_args()
+
+    records = []
+
+    for module in MODULES:
+        runs = [_run(IMPORT_SCRIPT, module) for _ in range(args.repeat)]
+        seconds = [r["seconds"] for r in runs if "seconds" in r]
+        record = {"benchmark": "import", "module": module}
+        if seconds:
+            record["median_seconds"] = statistics.median(seconds)
+        else:
+            record["error"] = runs[0].get("error")
+        records.append(record)
+
+    for _ in range(args.repeat):
+        run = _run(APP_SCRIPT, str(args.reruns))
+        record = {"benchmark": "app"}
+        if "error" in run:
+            record["error"] = run["error"]
+        else:
+            reruns = run.pop("rerun_seconds")
+            record.update(run)
+            if reruns:
+                record["rerun_median_seconds"] = statistics.median(reruns)
+                record["rerun_max_seconds"] = max(reruns)
+        records.append(record)
+
+    write_records(records, args.output)
+
+
+if __name__ == "__main__":
+    main()
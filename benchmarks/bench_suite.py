@@ -0,0 +1,253 @@
+"""
+Offline benchmarks for the NL2SQL and result paths.
+
+No database or API key is needed: cx_Oracle is replaced by
+fake_oracle (synthetic rows, configurable round-trip latency) and the
+Groq client by fake_groq (configurable time to first token and token rate).
+
+Measured:
+  * nl2sql   - end to end: generate SQL, execute, profile, build the
+               analysis prompt and get the analysis, with per-stage times
+  * fetch    - OracleManager.execute_query throughput by row count and
+               row width
+  * prompt   - profile_dataframe plus create_analysis_prompt and the
+               chat context by result size
+  * chat     - prompt tokens and latency per turn of a long chat about
+               one result
+
+Times are medians of untraced runs; one extra traced run records the
+tracemalloc peak. Records are written as JSON lines tagged with the git
+sha. Compare two runs with --compare:
+
+    python benchmarks/bench_suite.py --output after.jsonl
+    python benchmarks/bench_suite.py --compare before.jsonl after.jsonl
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+from typing import Dict, List
+
+from common import measure, read_records, run_timed, write_records
+import fake_oracle
+from fake_groq import FakeGroqClient
+
+WORKLOAD = fake_oracle.Workload()
+fake_oracle.install(WORKLOAD)
+
+# main_app builds its process-wide resources at import; keep them offline
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("NL2SQL_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "nl2sql.sqlite3"))
+
+from oracle_manager import OracleManager  # noqa: E402
+from groq_handler import GroqHandler  # noqa: E402
+from data_profiler import profile_dataframe, estimate_tokens  # noqa: E402
+from conversation import Conversation  # noqa: E402
+from main_app import create_analysis_prompt, create_chat_context  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)
+
+DSN = "bench:1521/BENCH"
+QUESTION = "Show orders above 100 with their customer names and creation dates"
+
+
+def _manager() -> OracleManager:
+    oracle = OracleManager(DSN, max_rows=None, max_bytes=None)
+    oracle.connect("bench", "bench")
+    return oracle
+
+
+def bench_fetch(rows: List[int], widths: List[int], repeat: int) -> List[Dict]:
+    records = []
+    WORKLOAD.latency = 0.0
+    oracle = _manager()
+    for row_count in rows:
+        for width in widths:
+            WORKLOAD.table_for_sql = lambda sql, n=row_count, w=width: fake_oracle.SyntheticTable(n, w)
+            WORKLOAD.round_trips = 0
+            seconds, peak, df = run_timed(
+                lambda: oracle.execute_query("SELECT * FROM BENCH.ORDERS", use_cache=False), repeat
+            )
+            records.append({
+                "benchmark": "fetch",
+                "case": f"rows={row_count} width={width}",
+                "seconds": seconds,
+                "rows_per_second": row_count / seconds if seconds else None,
+                "frame_bytes": int(df.memory_usage(deep=True).sum()),
+                "peak_bytes": peak,
+                "round_trips_per_query": WORKLOAD.round_trips / (repeat + 1),
+            })
+    oracle.close()
+    return records
+
+
+def bench_prompt(rows: List[int], width: int, repeat: int) -> List[Dict]:
+    records = []
+    oracle = _manager()
+    sql = "SELECT * FROM BENCH.ORDERS"
+    for row_count in rows:
+        WORKLOAD.table_for_sql = lambda sql, n=row_count: fake_oracle.SyntheticTable(n, width)
+        df = oracle.execute_query(sql, use_cache=False)
+
+        def build():
+            profile = profile_dataframe(df)
+            chat = Conversation(create_chat_context(sql, profile)).messages(QUESTION)
+            return create_analysis_prompt(sql, profile), "\n".join(m["content"] for m in chat)
+
+        seconds, peak, (analysis, chat) = run_timed(build, repeat)
+        records.append({
+            "benchmark": "prompt",
+            "case": f"rows={row_count} width={width}",
+            "seconds": seconds,
+            "peak_bytes": peak,
+            "analysis_prompt_tokens": estimate_tokens(analysis),
+            "chat_prompt_tokens": estimate_tokens(chat),
+        })
+    oracle.close()
+    return records
+
+
+def bench_chat(turns: int, result_rows: int, llm_latency: float, llm_tps: float) -> List[Dict]:
+    """One conversation of `turns` questions; prompt size should stop growing once history is compacted."""
+    answer = ("The result shows steady order volume with a few large amounts. " * 8
+              + "\n```sql\nSELECT * FROM BENCH.ORDERS WHERE AMOUNT_1 > 5000;\n```")
+    client = FakeGroqClient(respond=lambda messages: answer,
+                            first_token_latency=llm_latency, tokens_per_second=llm_tps)
+    groq = GroqHandler(client=client)
+    oracle = _manager()
+    sql = "SELECT * FROM BENCH.ORDERS"
+    WORKLOAD.table_for_sql = lambda sql: fake_oracle.SyntheticTable(result_rows, 16)
+    conversation = Conversation(create_chat_context(sql, profile_dataframe(oracle.execute_query(sql, use_cache=False))))
+    oracle.close()
+
+    prompt_tokens, latencies = [], []
+    for turn in range(turns):
+        question = f"{QUESTION} (follow-up {turn})"
+        before = client.prompt_tokens
+        with measure() as m:
+            reply = "".join(groq.chat_stream(conversation.messages(question)))
+        latencies.append(m.seconds)
+        prompt_tokens.append(client.prompt_tokens - before)
+        conversation.add(question, reply)
+
+    return [{
+        "benchmark": "chat",
+        "case": f"turns={turns} rows={result_rows} llm_latency={llm_latency} llm_tps={llm_tps}",
+        "seconds": statistics.median(latencies),
+        "first_turn_prompt_tokens": prompt_tokens[0],
+        "last_turn_prompt_tokens": prompt_tokens[-1],
+        "max_turn_prompt_tokens": max(prompt_tokens),
+        "first_turn_seconds": latencies[0],
+        "last_turn_seconds": latencies[-1],
+        "compacted_turns": conversation.compacted_turns,
+    }]
+
+
+def bench_nl2sql(result_rows: int, width: int, db_latency: float, llm_latency: float,
+                 llm_tps: float, repeat: int) -> List[Dict]:
+    client = FakeGroqClient(first_token_latency=llm_latency, tokens_per_second=llm_tps)
+    groq = GroqHandler(client=client)
+    oracle = _manager()
+    WORKLOAD.latency = db_latency
+    WORKLOAD.table_for_sql = lambda sql: fake_oracle.SyntheticTable(result_rows, width)
+    stages: Dict[str, List[float]] = {"generate": [], "execute": [], "profile": [], "analyze": []}
+
+    def run():
+        with measure() as m:
+            sql = groq.generate_sql(QUESTION)
+        stages["generate"].append(m.seconds)
+        with measure() as m:
+            df = oracle.execute_query(sql, use_cache=False)
+        stages["execute"].append(m.seconds)
+        with measure() as m:
+            prompt = create_analysis_prompt(sql, profile_dataframe(df))
+        stages["profile"].append(m.seconds)
+        with measure() as m:
+            groq.analyze_data(prompt)
+        stages["analyze"].append(m.seconds)
+
+    seconds, peak, _ = run_timed(run, repeat)
+    WORKLOAD.latency = 0.0
+    oracle.close()
+
+    record = {
+        "benchmark": "nl2sql",
+        "case": f"rows={result_rows} width={width} db_latency={db_latency} "
+                f"llm_latency={llm_latency} llm_tps={llm_tps}",
+        "seconds": seconds,
+        "peak_bytes": peak,
+        "llm_calls": client.calls,
+        "prompt_tokens": client.prompt_tokens,
+        "completion_tokens": client.completion_tokens,
+    }
+    for stage, timings in stages.items():
+        # The last run is the traced one; leave it out of the stage medians
+        record[f"{stage}_seconds"] = statistics.median(timings[:-1] or timings)
+    return [record]
+
+
+def compare(before_path: str, after_path: str, threshold: float):
+    """Print the relative change of seconds and peak_bytes per benchmark case."""
+    def index(records):
+        # Later records of the same case win, so appended files compare their last run
+        return {(r["benchmark"], r.get("case")): r for r in records}
+
+    before = index(read_records(before_path))
+    after = index(read_records(after_path))
+    regressions = 0
+    for key in sorted(after):
+        if key not in before:
+            continue
+        parts = []
+        for metric in ("seconds", "peak_bytes"):
+            old, new = before[key].get(metric), after[key].get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            flag = ""
+            if change > threshold:
+                flag = " REGRESSION"
+                regressions += 1
+            parts.append(f"{metric} {change:+.1%}{flag}")
+        print(f"{key[0]:<8} {key[1]:<60} {'  '.join(parts)}")
+    return regressions
+
+
+def _ints(text: str) -> List[int]:
+    return [int(v) for v in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=["nl2sql", "fetch", "prompt", "chat"], action="append")
+    parser.add_argument("--rows", type=_ints, default=[1000, 10000, 100000])
+    parser.add_argument("--widths", type=_ints, default=[4, 16, 48])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db-latency", type=float, default=0.002, help="seconds per round trip")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds to first token")
+    parser.add_argument("--llm-tps", type=float, default=500.0, help="completion tokens per second")
+    parser.add_argument("--output", help="append JSON lines here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change flagged by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    selected = args.only or ["nl2sql", "fetch", "prompt", "chat"]
+    records = []
+    if "nl2sql" in selected:
+        records += bench_nl2sql(1000, 12, args.db_latency, args.llm_latency, args.llm_tps, args.repeat)
+    if "fetch" in selected:
+        records += bench_fetch(args.rows, args.widths, args.repeat)
+    if "prompt" in selected:
+        records += bench_prompt(args.rows, 16, args.repeat)
+    if "chat" in selected:
+        records += bench_chat(20, 1000, args.llm_latency, args.llm_tps)
+    write_records(records, args.output)
+
+
+if __name__ == "__main__":
+    main()
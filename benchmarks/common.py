@@ -0,0 +1,84 @@
+"""Helpers shared by the benchmark scripts: run metadata and JSON-lines output."""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def git_sha() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run_metadata() -> Dict:
+    return {"timestamp": time.time(), "git_sha": git_sha(), "python": sys.version.split()[0]}
+
+
+def write_records(records: Iterable[Dict], output: Optional[str] = None):
+    """Append records as JSON lines to output, or print them."""
+    common = run_metadata()
+    lines = [json.dumps({**common, **record}, default=str) for record in records]
+    if output:
+        with open(output, "a") as f:
+            f.write("\n".join(lines) + "\n")
+    else:
+        print("\n".join(lines))
+
+
+def read_records(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Measurement:
+    """Wall time and, when traced, the Python memory peak of a block."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.peak_bytes = 0
+
+
+@contextmanager
+def measure(trace: bool = False):
+    """Time a block; trace=True also records its tracemalloc peak (and slows it down)."""
+    measurement = Measurement()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield measurement
+    finally:
+        measurement.seconds = time.perf_counter() - start
+        if trace:
+            measurement.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+
+def run_timed(fn: Callable[[], Any], repeat: int) -> Tuple[float, int, Any]:
+    """
+    Median wall time of repeat untraced calls, then one traced call for the
+    memory peak, so tracing overhead never leaks into the timings.
+    Returns (median seconds, peak bytes, result of the last call).
+    """
+    timings = []
+    for _ in range(repeat):
+        with measure() as m:
+            fn()
+        timings.append(m.seconds)
+    with measure(trace=True) as m:
+        result = fn()
+    return statistics.median(timings), m.peak_bytes, result
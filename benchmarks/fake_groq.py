@@ -0,0 +1,85 @@
+"""
+A local stand-in for the Groq chat completions API.
+
+FakeGroqClient exposes chat.completions.create with the response shapes
+GroqHandler reads (choices, message/delta content, usage), and simulates
+time to first token plus a steady token rate.
+"""
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_SQL = "SELECT *\nFROM BENCH.ORDERS\nWHERE AMOUNT_1 > 100;"
+
+
+def _count_tokens(text: str) -> int:
+    # Same rough 4-characters-per-token rule as data_profiler.estimate_tokens
+    return max(1, len(text) // 4)
+
+
+class _Stream:
+    def __init__(self, chunks, first_token: float, delay: float):
+        self._chunks = chunks
+        self._first_token = first_token
+        self._delay = delay
+        self.response = SimpleNamespace(close=lambda: None)
+
+    def __iter__(self):
+        time.sleep(self._first_token)
+        for chunk in self._chunks:
+            yield chunk
+            time.sleep(self._delay)
+
+
+class _Completions:
+    def __init__(self, client: "FakeGroqClient"):
+        self._client = client
+
+    def create(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.2,
+               stream: bool = False, **kwargs):
+        client = self._client
+        client.calls += 1
+        content = client.respond(messages)
+        prompt_tokens = sum(_count_tokens(m["content"]) for m in messages)
+        completion_tokens = _count_tokens(content)
+        client.prompt_tokens += prompt_tokens
+        client.completion_tokens += completion_tokens
+        delay = 1.0 / client.tokens_per_second if client.tokens_per_second else 0.0
+
+        if stream:
+            pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+            chunks = [
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+                for piece in pieces
+            ]
+            # Like Groq, report usage on the final chunk
+            chunks.append(SimpleNamespace(choices=[], x_groq=SimpleNamespace(usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ))))
+            return _Stream(chunks, client.first_token_latency, delay)
+
+        time.sleep(client.first_token_latency + completion_tokens * delay)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+
+class FakeGroqClient:
+    """Drop-in for groq.Groq; pass it as GroqHandler(client=...)."""
+
+    def __init__(self, respond: Optional[Callable[[List[Dict[str, str]]], str]] = None,
+                 first_token_latency: float = 0.0, tokens_per_second: float = 0.0):
+        self.respond = respond or (lambda messages: DEFAULT_SQL)
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.chat = SimpleNamespace(completions=_Completions(self))
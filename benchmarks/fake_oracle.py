@@ -0,0 +1,294 @@
+"""
+A cx_Oracle stand-in for offline benchmarks.
+
+install() registers this module's fake as `cx_Oracle` in sys.modules, so it
+must run before oracle_manager is imported. Every statement returns rows
+from a SyntheticTable chosen by the configured workload, and every
+round trip (execute, fetch) sleeps for the configured latency.
+"""
+import datetime
+import decimal
+import random
+import sys
+import threading
+import time
+import types
+from typing import Callable, List, Optional
+
+
+class _DbType:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self):
+        return f"<DbType {self.name}>"
+
+
+DB_TYPE_NUMBER = _DbType("DB_TYPE_NUMBER")
+DB_TYPE_BINARY_FLOAT = _DbType("DB_TYPE_BINARY_FLOAT")
+DB_TYPE_BINARY_DOUBLE = _DbType("DB_TYPE_BINARY_DOUBLE")
+DB_TYPE_VARCHAR = _DbType("DB_TYPE_VARCHAR")
+DB_TYPE_CHAR = _DbType("DB_TYPE_CHAR")
+DB_TYPE_DATE = _DbType("DB_TYPE_DATE")
+DB_TYPE_TIMESTAMP = _DbType("DB_TYPE_TIMESTAMP")
+DB_TYPE_CLOB = _DbType("DB_TYPE_CLOB")
+DB_TYPE_NCLOB = _DbType("DB_TYPE_NCLOB")
+DB_TYPE_BLOB = _DbType("DB_TYPE_BLOB")
+DB_TYPE_LONG = _DbType("DB_TYPE_LONG")
+DB_TYPE_LONG_RAW = _DbType("DB_TYPE_LONG_RAW")
+SPOOL_ATTRVAL_WAIT = 1
+SPOOL_ATTRVAL_TIMEDWAIT = 3
+
+
+class _Error:
+    def __init__(self, code: int, message: str):
+        self.code = code
+        self.message = message
+
+
+class DatabaseError(Exception):
+    pass
+
+
+def _error(code: int, message: str) -> DatabaseError:
+    return DatabaseError(_Error(code, message))
+
+
+class SyntheticTable:
+    """
+    Rows of `width` columns cycling through integer, decimal, text and date
+    types. Rows are drawn from a block generated once, so producing them adds
+    little to the measured fetch time and the table is never held in memory.
+    """
+
+    def __init__(self, rows: int, width: int, text_length: int = 24, seed: int = 0,
+                 block_size: int = 1024):
+        self.rows = rows
+        self.width = width
+        self.description = []
+        for j in range(width):
+            kind = j % 4
+            if kind == 0:
+                self.description.append((f"ID_{j}", DB_TYPE_NUMBER, 10, None, 10, 0, True))
+            elif kind == 1:
+                self.description.append((f"AMOUNT_{j}", DB_TYPE_NUMBER, 12, None, 12, 2, True))
+            elif kind == 2:
+                self.description.append((f"NAME_{j}", DB_TYPE_VARCHAR, text_length, text_length, None, None, True))
+            else:
+                self.description.append((f"CREATED_{j}", DB_TYPE_DATE, 23, None, None, None, True))
+
+        rng = random.Random(seed)
+        base = datetime.datetime(2024, 1, 1)
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        self._block = []
+        for i in range(min(rows, block_size)):
+            row = []
+            for j in range(width):
+                kind = j % 4
+                if kind == 0:
+                    row.append(i)
+                elif kind == 1:
+                    row.append(round(rng.uniform(0, 10000), 2))
+                elif kind == 2:
+                    row.append("".join(rng.choice(letters) for _ in range(text_length)))
+                else:
+                    row.append(base + datetime.timedelta(minutes=i))
+            self._block.append(tuple(row))
+
+    def generate(self, start: int, count: int) -> List[tuple]:
+        block = self._block
+        n = len(block)
+        return [block[i % n] for i in range(start, min(start + count, self.rows))]
+
+
+class Workload:
+    """Maps a statement to the SyntheticTable it returns, plus per-round-trip latency."""
+
+    def __init__(self, table_for_sql: Optional[Callable[[str], SyntheticTable]] = None,
+                 latency: float = 0.0):
+        self.table_for_sql = table_for_sql or (lambda sql: SyntheticTable(100, 8))
+        self.latency = latency
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakeVar:
+    def __init__(self, type_, size=0, arraysize=1, outconverter=None):
+        self.type = type_
+        self.size = size
+        self.arraysize = arraysize
+        self.outconverter = outconverter
+        self._values = {}
+
+    def setvalue(self, pos: int, value):
+        self._values[pos] = value
+
+    def getvalue(self, pos: int = 0):
+        return self._values.get(pos)
+
+
+class FakeCursor:
+    def __init__(self, connection: "FakeConnection"):
+        self.connection = connection
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self.outputtypehandler = None
+        self.description = None
+        self._table: Optional[SyntheticTable] = None
+        self._position = 0
+        self._converters = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def var(self, type_, size=0, arraysize=1, outconverter=None, **kwargs):
+        return FakeVar(type_, size, arraysize, outconverter)
+
+    def execute(self, sql: str, binds=None, **kwargs):
+        self.connection._check_cancel()
+        self.connection.workload.round_trip()
+        self._table = self.connection.workload.table_for_sql(sql)
+        self._position = 0
+        self.description = list(self._table.description) if self._table else None
+        self._converters = None
+        if self._table and self.outputtypehandler is not None:
+            converters = []
+            for name, type_code, size, _, precision, scale, _ in self._table.description:
+                var = self.outputtypehandler(self, name, type_code, size, precision, scale)
+                converters.append(self._converter(var))
+            self._converters = converters
+
+    @staticmethod
+    def _converter(var: Optional[FakeVar]):
+        if var is None:
+            return None
+        # Like the driver: convert to the variable's type, then apply its outconverter
+        cast = {int: int, float: float, decimal.Decimal: lambda v: decimal.Decimal(str(v))}.get(var.type)
+        if cast is None:
+            return var.outconverter
+        convert = var.outconverter or (lambda value: value)
+        return lambda value: None if value is None else convert(cast(value))
+
+    def fetchmany(self, size: Optional[int] = None) -> List[tuple]:
+        if self._table is None:
+            raise _error(24374, "define not done before fetch or execute and fetch")
+        self.connection._check_cancel()
+        self.connection.workload.round_trip()
+        rows = self._table.generate(self._position, size or self.arraysize)
+        self._position += len(rows)
+        if self._converters and any(self._converters):
+            rows = [
+                tuple(value if convert is None else convert(value)
+                      for value, convert in zip(row, self._converters))
+                for row in rows
+            ]
+        return rows
+
+    def fetchone(self) -> Optional[tuple]:
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchall(self) -> List[tuple]:
+        return self.fetchmany(self._table.rows - self._position if self._table else 0)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._table = None
+
+
+class FakeConnection:
+    def __init__(self, workload: Workload, username: str = "BENCH"):
+        self.workload = workload
+        self.username = username
+        self.call_timeout = 0
+        self.stmtcachesize = 20
+        self._cancelled = False
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _check_cancel(self):
+        if self._cancelled:
+            self._cancelled = False
+            raise _error(1013, "user requested cancel of current operation")
+
+    def ping(self):
+        self.workload.round_trip()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeSessionPool:
+    def __init__(self, workload: Workload, min: int = 1, max: int = 4, increment: int = 1,
+                 wait_timeout: int = 0, **kwargs):
+        self.workload = workload
+        self.wait_timeout = wait_timeout
+        self.min = min
+        self.max = max
+        self.increment = increment
+        self.opened = min
+        self.busy = 0
+        self.stmtcachesize = 20
+        self._slots = threading.BoundedSemaphore(max)
+        self._lock = threading.Lock()
+
+    def acquire(self, user: Optional[str] = None, password: Optional[str] = None) -> FakeConnection:
+        if not self._slots.acquire(timeout=self.wait_timeout / 1000 if self.wait_timeout else None):
+            raise _error(24457, "OCISessionGet() could not find a free session in the specified timeout period")
+        with self._lock:
+            self.busy += 1
+            self.opened = min(max(self.opened, self.busy), self.max)
+        return FakeConnection(self.workload, (user or "BENCH").upper())
+
+    def release(self, connection: FakeConnection):
+        with self._lock:
+            self.busy -= 1
+        self._slots.release()
+
+    def close(self, force: bool = False):
+        pass
+
+
+def make_module(workload: Workload) -> types.ModuleType:
+    """Build a module exposing the subset of the cx_Oracle API this app uses."""
+    module = types.ModuleType("cx_Oracle")
+    for name, value in globals().items():
+        if name.startswith(("DB_TYPE_", "SPOOL_")):
+            setattr(module, name, value)
+    module.DatabaseError = DatabaseError
+    module.makedsn = lambda host, port, service_name=None, **kwargs: f"{host}:{port}/{service_name}"
+    module.connect = lambda user=None, password=None, dsn=None, **kwargs: FakeConnection(
+        workload, (user or "BENCH").upper()
+    )
+    module.SessionPool = lambda **kwargs: FakeSessionPool(workload, **{
+        k: kwargs[k] for k in ("min", "max", "increment", "wait_timeout") if k in kwargs
+    })
+    module.workload = workload
+    return module
+
+
+def install(workload: Workload) -> types.ModuleType:
+    """Register the fake as cx_Oracle; call before importing oracle_manager."""
+    if "oracle_manager" in sys.modules:
+        raise RuntimeError("install() must run before oracle_manager is imported")
+    module = make_module(workload)
+    sys.modules["cx_Oracle"] = module
+    return module
@@ -0,0 +1,212 @@
+import datetime
+import decimal
+import itertools
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from sql_tokenizer import Token, tokenize, significant, keyword, string_value, SQLTokenizeError
+
+# Literals under these clauses change the result shape or meaning when bound
+# (select-list column names, ORDER BY/GROUP BY positions), so they stay inline.
+_LITERAL_CLAUSES = {"SELECT", "GROUP", "ORDER", "MODEL"}
+_CLAUSE_KEYWORDS = {
+    "SELECT", "FROM", "WHERE", "GROUP", "ORDER", "HAVING", "CONNECT", "START",
+    "OFFSET", "FETCH", "MODEL",
+}
+# Arguments of these constructs must be literals
+_LITERAL_ONLY_PARENS = {
+    "PIVOT", "UNPIVOT", "OVER", "SAMPLE", "PARTITION", "SUBPARTITION",
+    "JSON_VALUE", "JSON_QUERY", "JSON_EXISTS", "JSON_TABLE", "JSON_OBJECT",
+    "XMLTABLE", "XMLQUERY", "XMLEXISTS", "XMLELEMENT",
+}
+# Length/precision arguments of data types are not expressions
+_TYPE_NAMES = {
+    "CHAR", "NCHAR", "VARCHAR", "VARCHAR2", "NVARCHAR2", "RAW", "NUMBER", "FLOAT",
+    "DECIMAL", "TIMESTAMP", "INTERVAL", "UROWID", "YEAR", "MONTH", "DAY", "SECOND",
+}
+# Keywords whose following literal is part of the syntax
+_LITERAL_AFTER = {"INTERVAL", "ESCAPE"}
+
+
+class BoundStatement(NamedTuple):
+    sql: str
+    binds: Dict[str, Any]
+    # Bind names that need an explicit type (CHAR semantics, TIMESTAMP precision)
+    input_types: Dict[str, str]
+
+
+def rewrite_literals(sql: str, pad_in_lists: bool = True, allow_binds: bool = False) -> BoundStatement:
+    """
+    Replace literals in a single SELECT statement with bind variables.
+    String literals are bound with CHAR semantics, DATE/TIMESTAMP literals as
+    dates and timestamps, and IN-lists are padded to power-of-two lengths so
+    lists of similar size share a cursor. Statements that already use binds
+    (unless allow_binds, which keeps named binds and picks other names), are
+    not queries, or cannot be tokenized are returned unchanged.
+    """
+    unchanged = BoundStatement(sql, {}, {})
+    try:
+        tokens = tokenize(sql)
+    except SQLTokenizeError:
+        return unchanged
+
+    words = significant(tokens)
+    if not words or keyword(words[0]) not in ("SELECT", "WITH"):
+        return unchanged
+    existing = {t.text[1:].upper() for t in words if t.kind == "bind"}
+    if existing and (not allow_binds or any(name.isdigit() for name in existing)):
+        return unchanged
+
+    binds: Dict[str, Any] = {}
+    input_types: Dict[str, str] = {}
+    # (start, end, text) character spans of the original SQL to replace
+    edits: List[Tuple[int, int, str]] = []
+
+    names = (f"b{n}" for n in itertools.count(1))
+
+    def new_bind(value, input_type=None) -> str:
+        name = next(n for n in names if n.upper() not in existing)
+        binds[name] = value
+        if input_type:
+            input_types[name] = input_type
+        return f":{name}"
+
+    clause_stack: List[Optional[str]] = [None]
+    paren_stack: List[str] = []
+    i = 0
+    while i < len(words):
+        token = words[i]
+        word = keyword(token)
+        previous = words[i - 1] if i else None
+
+        if token.kind == "op" and token.text == "(":
+            opener = keyword(previous) if previous is not None else ""
+            paren_stack.append(opener)
+            clause_stack.append(clause_stack[-1])
+
+            if opener == "IN" and pad_in_lists and _literal_context(clause_stack, paren_stack[:-1]):
+                end = _rewrite_in_list(words, i, edits, new_bind)
+                if end is not None:
+                    paren_stack.pop()
+                    clause_stack.pop()
+                    i = end + 1
+                    continue
+        elif token.kind == "op" and token.text == ")":
+            if paren_stack:
+                paren_stack.pop()
+                clause_stack.pop()
+        elif word in _CLAUSE_KEYWORDS:
+            clause_stack[-1] = word
+        elif token.kind in ("string", "number"):
+            if _literal_context(clause_stack, paren_stack) and keyword(previous or token) not in _LITERAL_AFTER:
+                replacement = _bind_literal(words, i, new_bind)
+                if replacement is not None:
+                    start, text = replacement
+                    edits.append((words[start].pos, _end(token), text))
+        i += 1
+
+    if not binds:
+        return unchanged
+
+    out = []
+    cursor = 0
+    for start, end, text in edits:
+        out.append(sql[cursor:start])
+        out.append(text)
+        cursor = end
+    out.append(sql[cursor:])
+    return BoundStatement("".join(out), binds, input_types)
+
+
+def _end(token: Token) -> int:
+    return token.pos + len(token.text)
+
+
+def _literal_context(clause_stack: List[Optional[str]], paren_stack: List[str]) -> bool:
+    if clause_stack[-1] in _LITERAL_CLAUSES or clause_stack[-1] is None:
+        return False
+    if any(opener in _LITERAL_ONLY_PARENS for opener in paren_stack):
+        return False
+    if paren_stack and paren_stack[-1] in _TYPE_NAMES:
+        return False
+    return True
+
+
+def _bind_literal(words: List[Token], i: int, new_bind):
+    """Return (first token index to replace, bind text) for the literal at i, or None."""
+    token = words[i]
+    previous = keyword(words[i - 1]) if i else ""
+
+    if token.kind == "number":
+        value = _number_value(token.text)
+        return None if value is None else (i, new_bind(value))
+
+    if token.text[:1] in "nN":
+        # National character literals keep their NCHAR semantics inline
+        return None
+    text = string_value(token.text)
+    if previous == "DATE":
+        try:
+            return i - 1, new_bind(datetime.date.fromisoformat(text))
+        except ValueError:
+            return None
+    if previous == "TIMESTAMP":
+        try:
+            value = datetime.datetime.fromisoformat(text)
+        except ValueError:
+            return None
+        if value.tzinfo is not None:
+            # A TIMESTAMP bind would drop the offset; TIMESTAMP WITH TIME ZONE literals stay inline
+            return None
+        return i - 1, new_bind(value, "TIMESTAMP")
+    # Oracle string literals are CHAR, so bind them with CHAR comparison semantics
+    return i, new_bind(text, "CHAR")
+
+
+def _number_value(text: str):
+    if text[-1:] in "fFdD":
+        # BINARY_FLOAT/BINARY_DOUBLE literals keep their type inline
+        return None
+    if any(c in text for c in ".eE"):
+        return decimal.Decimal(text)
+    return int(text)
+
+
+def _rewrite_in_list(words: List[Token], open_index: int, edits, new_bind) -> Optional[int]:
+    """Bind a literal-only IN-list, padding it with its last value. Returns the ')' index."""
+    items = []
+    i = open_index + 1
+    while i < len(words):
+        token = words[i]
+        if token.kind not in ("string", "number") or token.text[:1] in "nN":
+            return None
+        items.append(i)
+        following = words[i + 1] if i + 1 < len(words) else None
+        if following is None or following.kind != "op":
+            return None
+        if following.text == ")":
+            break
+        if following.text != ",":
+            return None
+        i += 2
+    else:
+        return None
+
+    close_index = items[-1] + 1
+    values = []
+    for index in items:
+        token = words[index]
+        if token.kind == "number":
+            value = _number_value(token.text)
+            if value is None:
+                return None
+            values.append((value, None))
+        else:
+            values.append((string_value(token.text), "CHAR"))
+
+    size = 1
+    while size < len(values):
+        size *= 2
+    values += [values[-1]] * (size - len(values))
+
+    bind_list = ", ".join(new_bind(value, input_type) for value, input_type in values)
+    edits.append((words[items[0]].pos, _end(words[items[-1]]), bind_list))
+    return close_index
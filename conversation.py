@@ -0,0 +1,77 @@
+import re
+from typing import Dict, List, NamedTuple
+from data_profiler import estimate_tokens
+
+
+class Turn(NamedTuple):
+    question: str
+    answer: str
+    tokens: int
+
+
+class Conversation:
+    """
+    Chat about one executed result. The context (instructions, SQL and
+    result profile) is built once and sent unchanged as the first message
+    of every turn, so it forms a stable prompt prefix. Recent turns follow
+    verbatim; once they exceed history_token_budget the oldest are folded
+    into a short local summary, keeping each turn's prompt size flat.
+    """
+
+    def __init__(self, context: str, history_token_budget: int = 1000,
+                 summary_token_budget: int = 300, answer_summary_chars: int = 240):
+        self.context = context
+        self.context_tokens = estimate_tokens(context)
+        self.history_token_budget = history_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.answer_summary_chars = answer_summary_chars
+        self.turns: List[Turn] = []
+        # One line per compacted turn, oldest first
+        self.summary: List[str] = []
+        self.compacted_turns = 0
+
+    def messages(self, question: str) -> List[Dict[str, str]]:
+        """Chat messages for the next question: context, summary, recent turns, question."""
+        messages = [{"role": "system", "content": self.context}]
+        if self.summary:
+            messages.append({"role": "system", "content": (
+                "Summary of earlier questions in this conversation:\n" + "\n".join(self.summary)
+            )})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn.question})
+            messages.append({"role": "assistant", "content": turn.answer})
+        messages.append({"role": "user", "content": question})
+        return messages
+
+    def prompt_tokens(self, question: str) -> int:
+        """Local estimate of the prompt size for the next question."""
+        return sum(estimate_tokens(m["content"]) for m in self.messages(question))
+
+    def add(self, question: str, answer: str):
+        self.turns.append(Turn(question, answer, estimate_tokens(question) + estimate_tokens(answer)))
+        self._compact()
+
+    def clear(self):
+        self.turns = []
+        self.summary = []
+        self.compacted_turns = 0
+
+    @property
+    def history_tokens(self) -> int:
+        return sum(turn.tokens for turn in self.turns)
+
+    def _compact(self):
+        # The latest turn always stays verbatim so follow-ups can refer to it
+        while len(self.turns) > 1 and self.history_tokens > self.history_token_budget:
+            turn = self.turns.pop(0)
+            self.summary.append(f"- Q: {_squash(turn.question, 160)} A: {_squash(turn.answer, self.answer_summary_chars)}")
+            self.compacted_turns += 1
+        while len(self.summary) > 1 and estimate_tokens("\n".join(self.summary)) > self.summary_token_budget:
+            self.summary.pop(0)
+
+
+def _squash(text: str, max_chars: int) -> str:
+    """Text on one line without code blocks, cut at max_chars."""
+    text = re.sub(r"```.*?```", "[SQL]", text, flags=re.DOTALL)
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[: max_chars - 1] + "…"
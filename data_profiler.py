@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Rough characters-per-token ratio for English text and tabular dumps
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate used to keep prompts inside the context window."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def profile_dataframe(df: pd.DataFrame, token_budget: int = 4000, top_k: int = 5,
+                      max_sample_rows: int = 30) -> str:
+    """
+    Build a compact text profile of a DataFrame that fits within token_budget.
+    Small results are included verbatim; larger ones are described by
+    per-column statistics plus a stratified sample of rows.
+    """
+    full = df.to_string(max_rows=max_sample_rows + 1)
+    if len(df) <= max_sample_rows and estimate_tokens(full) <= token_budget:
+        return f"Rows: {len(df)}, Columns: {len(df.columns)}\n{full}"
+
+    sections = [f"Rows: {len(df)}, Columns: {len(df.columns)}"]
+
+    nulls = df.isna().mean()
+    sections.append("Null ratio per column:\n" + nulls.round(3).to_string())
+
+    numeric = df.select_dtypes(include="number")
+    if not numeric.empty:
+        stats = numeric.describe(percentiles=[0.05, 0.25, 0.5, 0.75, 0.95]).T
+        sections.append("Numeric columns:\n" + stats.round(3).to_string())
+
+    datetimes = df.select_dtypes(include=["datetime", "datetimetz"])
+    if not datetimes.empty:
+        bounds = pd.DataFrame({"min": datetimes.min(), "max": datetimes.max()})
+        sections.append("Date columns:\n" + bounds.to_string())
+
+    categorical = df.select_dtypes(exclude=["number", "datetime", "datetimetz"])
+    lines = []
+    for col in categorical.columns:
+        try:
+            counts = categorical[col].value_counts(dropna=True)
+        except TypeError:
+            # Unhashable cell values (e.g. LOB handles) have no frequency table
+            continue
+        top = ", ".join(f"{_short(v)} ({n})" for v, n in counts.head(top_k).items())
+        lines.append(f"{col}: {counts.size} distinct; top: {top}")
+    if lines:
+        sections.append("Categorical columns:\n" + "\n".join(lines))
+
+    profile = "\n\n".join(sections)
+    remaining = token_budget - estimate_tokens(profile)
+
+    sample_rows = max_sample_rows
+    while sample_rows > 0:
+        sample = stratified_sample(df, sample_rows)
+        text = "Sample rows:\n" + sample.to_string()
+        if estimate_tokens(text) <= remaining:
+            return profile + "\n\n" + text
+        sample_rows //= 2
+
+    # Even the statistics alone exceed the budget; hard-trim the text
+    return profile[: token_budget * CHARS_PER_TOKEN]
+
+
+def stratified_sample(df: pd.DataFrame, n: int, max_groups: int = 20) -> pd.DataFrame:
+    """
+    Sample about n rows, spread across the groups of the lowest-cardinality
+    categorical column so small groups are still represented.
+    """
+    if len(df) <= n:
+        return df
+
+    strata = None
+    for col in df.select_dtypes(exclude=["number", "datetime", "datetimetz"]).columns:
+        try:
+            groups = df[col].nunique(dropna=True)
+        except TypeError:
+            continue
+        if 1 < groups <= max_groups and (strata is None or groups < strata[1]):
+            strata = (col, groups)
+
+    if strata is None:
+        # Evenly spaced rows preserve the ordering of ORDER BY results
+        positions = np.linspace(0, len(df) - 1, n).astype(int)
+        return df.iloc[np.unique(positions)]
+
+    col = strata[0]
+    per_group = max(1, n // strata[1])
+    shuffled = df.sample(frac=1, random_state=0)
+    sample = shuffled.groupby(col, group_keys=False, dropna=True).head(per_group)
+    return sample.sort_index().head(n)
+
+
+def _short(value, limit: int = 40) -> str:
+    text = str(value)
+    return text if len(text) <= limit else text[: limit - 3] + "..."
@@ -0,0 +1,83 @@
+import sys
+from typing import Union
+import pandas as pd
+
+Payload = Union[str, bytes]
+
+
+class DeferredValue:
+    """
+    A large LOB value fetched inline but kept out of the display path.
+    It renders as a short preview; load() returns the full payload when the
+    user expands the cell.
+    """
+
+    __slots__ = ("_payload", "preview_chars")
+
+    def __init__(self, payload: Payload, preview_chars: int = 200):
+        self._payload = payload
+        self.preview_chars = preview_chars
+
+    @property
+    def size(self) -> int:
+        return len(self._payload)
+
+    def load(self) -> Payload:
+        return self._payload
+
+    def __str__(self) -> str:
+        unit = "bytes" if isinstance(self._payload, bytes) else "chars"
+        if isinstance(self._payload, bytes):
+            preview = self._payload[: self.preview_chars // 2].hex()
+        else:
+            preview = self._payload[: self.preview_chars]
+        return f"{preview}… [{self.size} {unit}]"
+
+    __repr__ = __str__
+
+    def __sizeof__(self) -> int:
+        # Report the payload so memory budgets (memory_usage(deep=True)) stay honest
+        return object.__sizeof__(self) + sys.getsizeof(self._payload)
+
+
+def deferring_converter(inline_limit: int, preview_chars: int = 200):
+    """Output converter that wraps LOB values larger than inline_limit."""
+    def convert(value):
+        if value is not None and len(value) > inline_limit:
+            return DeferredValue(value, preview_chars)
+        return value
+    return convert
+
+
+def resolve(value):
+    """Full payload of a possibly deferred value."""
+    return value.load() if isinstance(value, DeferredValue) else value
+
+
+def deferred_columns(df: pd.DataFrame):
+    """Names of object columns holding at least one DeferredValue."""
+    return [
+        column for column in df.columns
+        if df[column].dtype == object
+        and df[column].map(lambda v: isinstance(v, DeferredValue)).any()
+    ]
+
+
+def display_frame(df: pd.DataFrame, max_chars: int) -> pd.DataFrame:
+    """Copy of df with long text truncated for display; deferred values show previews."""
+    if not max_chars:
+        return df
+    shown = df.copy(deep=False)
+    for column in shown.columns:
+        if shown[column].dtype != object and not pd.api.types.is_string_dtype(shown[column]):
+            continue
+
+        def truncate(value):
+            if isinstance(value, DeferredValue):
+                return str(value)
+            if isinstance(value, str) and len(value) > max_chars:
+                return value[:max_chars] + f"… [{len(value)} chars]"
+            return value
+
+        shown[column] = shown[column].map(truncate)
+    return shown
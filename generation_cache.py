@@ -0,0 +1,189 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Set
+
+# Quoted values keep their case and comparison operators are kept as tokens:
+# "name = 'King'" and "salary > 5000" ask for different rows than
+# "name = 'KING'" and "salary < 5000".
+_TOKEN = re.compile(r"""'[^']*'|"[^"]*"|<>|!=|<=|>=|[<>=]|[A-Za-z0-9_]+""")
+
+# Filler words that never change which rows a question asks for; every other
+# word (table and column names, values, numbers) must match exactly.
+_STOPWORDS = frozenset("""
+    a about all an any are as at be by can could display do does each find for from get give
+    have how i in is it list me my of on please return show tell that the their them there
+    these this those to us want was we were what which who with would you
+""".split())
+
+
+def _tokenize(text: str) -> List[str]:
+    return [t if t[0] in "'\"" else t.lower() for t in _TOKEN.findall(text)]
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase words, strip punctuation and collapse whitespace; quoted values and operators stay verbatim."""
+    return " ".join(_tokenize(question))
+
+
+def _tokens(normalized: str) -> Set[str]:
+    return set(_tokenize(normalized))
+
+
+def _entities(tokens: Set[str]) -> Set[str]:
+    return tokens - _STOPWORDS
+
+
+class GenerationCache:
+    """
+    Disk-backed NL2SQL cache with an in-memory LRU front.
+
+    Entries live in a SQLite file so they survive restarts and can be shared
+    between replicas pointing at the same path. Keys combine the normalized
+    question with a hash of the system prompt and the model name, so prompt
+    or model changes never serve stale SQL.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, memory_entries: int = 256,
+                 similarity_threshold: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        # Jaccard similarity above which a near-duplicate question is served
+        # from the cache; None disables fuzzy matching. Near duplicates may
+        # only differ in filler words.
+        self.similarity_threshold = similarity_threshold
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS nl2sql_cache (
+                key TEXT PRIMARY KEY,
+                context TEXT NOT NULL,
+                question TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS nl2sql_cache_lru ON nl2sql_cache (context, last_used)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def context_key(system_prompt: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{system_prompt}".encode()).hexdigest()
+
+    @staticmethod
+    def _key(context: str, normalized: str) -> str:
+        return hashlib.sha256(f"{context}\0{normalized}".encode()).hexdigest()
+
+    def get(self, question: str, system_prompt: str, model: str) -> Optional[str]:
+        """Return cached SQL for the question, or None on a miss."""
+        context = self.context_key(system_prompt, model)
+        normalized = normalize_question(question)
+        key = self._key(context, normalized)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            row = self._db.execute(
+                "SELECT response FROM nl2sql_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._touch(key)
+                self._remember(key, row[0])
+                self.hits += 1
+                return row[0]
+
+            if self.similarity_threshold is not None:
+                match = self._find_similar(context, normalized)
+                if match is not None:
+                    self.near_hits += 1
+                    return match
+
+            self.misses += 1
+            return None
+
+    def put(self, question: str, system_prompt: str, model: str, response: str):
+        context = self.context_key(system_prompt, model)
+        normalized = normalize_question(question)
+        key = self._key(context, normalized)
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO nl2sql_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, context, normalized, response, now, now),
+            )
+            self._db.execute("""
+                DELETE FROM nl2sql_cache WHERE key IN (
+                    SELECT key FROM nl2sql_cache
+                    ORDER BY last_used DESC
+                    LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._db.commit()
+            self._remember(key, response)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM nl2sql_cache")
+            self._db.commit()
+            self._memory.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM nl2sql_cache").fetchone()[0]
+            return {
+                "entries": entries,
+                "memory_entries": len(self._memory),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+            }
+
+    def _find_similar(self, context: str, normalized: str) -> Optional[str]:
+        tokens = _tokens(normalized)
+        entities = _entities(tokens)
+        if not entities:
+            return None
+        best_score, best_key, best_response = 0.0, None, None
+        for key, question, response in self._db.execute(
+            "SELECT key, question, response FROM nl2sql_cache WHERE context = ?", (context,)
+        ):
+            other = _tokens(question)
+            # Different names or literals ("orders" vs "invoices", "top 10" vs "top 20") must never match
+            if _entities(other) != entities:
+                continue
+            score = len(tokens & other) / len(tokens | other)
+            if score > best_score:
+                best_score, best_key, best_response = score, key, response
+        if best_key is None or best_score < self.similarity_threshold:
+            return None
+        self._touch(best_key)
+        return best_response
+
+    def _touch(self, key: str):
+        self._db.execute(
+            "UPDATE nl2sql_cache SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        self._db.commit()
+
+    def _remember(self, key: str, response: str):
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
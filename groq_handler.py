@@ -1,20 +1,44 @@
+import hashlib
+import json
 import os
 import re
 import streamlit as st
-from groq import Groq
-from dotenv import load_dotenv
-from typing import Optional
+from groq import Groq, APIConnectionError
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Iterable, Iterator, Tuple, Hashable, List, Dict
 import logging
+import telemetry
+from data_profiler import estimate_tokens
+from generation_cache import GenerationCache
+from llm_scheduler import RequestScheduler, is_retryable
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-load_dotenv()
+def retryable_error(e: Exception) -> bool:
+    # Connection errors include client-side timeouts
+    return isinstance(e, APIConnectionError) or is_retryable(e)
+
 
 class GroqHandler:
-    def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    def __init__(self, cache: Optional[GenerationCache] = None, client=None,
+                 scheduler: Optional[RequestScheduler] = None):
+        # Any object exposing chat.completions.create works (benchmarks pass a local stub).
+        # Retries are the scheduler's job, so the SDK's own are disabled.
+        self.client = client if client is not None else Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+        self.model = "mixtral-8x7b-32768"
+        self.cache = cache
+        # Rate limits, backoff and coalescing shared by every call through this handler
+        self.scheduler = scheduler or RequestScheduler(retryable=retryable_error)
+        # Completion tokens reserved per request until the API reports actual usage
+        self.completion_token_estimate = 512
+        self.analysis_prompt = (
+            "You are a Oracle database 21 assistant. Analyze the provided data and provide insights, recommendations, "
+            "and new SQL queries to explore further. Avoid any query or syntax that is not compliant with Oracle 21c."
+        )
         self.system_prompt =  """
 **System Instructions for SQL Query Generation**
 
@@ -70,53 +94,65 @@ class GroqHandler:
 
 """
 
-    def generate_sql(self, natural_language: str) -> Optional[str]:
+    def generate_sql(self, natural_language: str, schema_context: Optional[str] = None) -> Optional[str]:
         try:
-            logging.info(f"Received natural language input: {natural_language}")
-            response = self.client.chat.completions.create(
-                model="mixtral-8x7b-32768",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": f"Convert to Oracle SQL: {natural_language}"}
-                ],
-                temperature=0.2
-            )
-            raw_output = response.choices[0].message.content.strip()
-            logging.info(f"Received SQL output: {raw_output}")
-            clean_sql = self._clean_output(raw_output)
-            return clean_sql
+            return self._generate_sql(natural_language, schema_context)
         except Exception as e:
             logging.error(f"Error in generate_sql: {str(e)}")
             st.error(f"API Error: {str(e)}")
             return None
 
+    def _generate_sql(self, natural_language: str, schema_context: Optional[str] = None) -> str:
+        """Generate SQL without Streamlit calls; raises on API errors (used off the script thread)."""
+        telemetry.log_payload("Received natural language input", natural_language)
+        cache_prompt = self._cache_prompt(schema_context)
+        with telemetry.span("llm.generate_sql", model=self.model) as span:
+            if self.cache is not None:
+                cached = self.cache.get(natural_language, cache_prompt, self.model)
+                if cached is not None:
+                    logging.info("Serving SQL from generation cache")
+                    span.attrs["cached"] = True
+                    return cached
+
+            response = self._complete(self._sql_messages(natural_language, schema_context), span)
+        raw_output = response.choices[0].message.content.strip()
+        telemetry.log_payload("Received SQL output", raw_output)
+        clean_sql = self._clean_output(raw_output)
+        if self.cache is not None and clean_sql:
+            self.cache.put(natural_language, cache_prompt, self.model, clean_sql)
+        return clean_sql
+
+    def _sql_messages(self, natural_language: str, schema_context: Optional[str]):
+        user_content = f"Convert to Oracle SQL: {natural_language}"
+        if schema_context:
+            user_content += f"\n\nRelevant tables (use only these names):\n{schema_context}"
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_content}
+        ]
+
+    def _cache_prompt(self, schema_context: Optional[str]) -> str:
+        # The schema context changes the answer, so it is part of the cache key
+        if schema_context:
+            return f"{self.system_prompt}\n{schema_context}"
+        return self.system_prompt
+
     
     def analyze_data(self, data_prompt: str) -> Optional[str]:
         try:
-            logging.info("Sending request to Groq API with prompt:")
-            logging.info(data_prompt)
-            response = self.client.chat.completions.create(
-                model="mixtral-8x7b-32768",
-                messages=[
-                    {"role": "system", "content": (
-                        "You are a Oracle database 21 assistant. Analyze the provided data and provide insights, recommendations, "
-                        "and new SQL queries to explore further. Avoid any query or syntax that is not compliant with Oracle 21c."
-                    )},
+            telemetry.log_payload("Sending request to Groq API with prompt", data_prompt)
+            with telemetry.span("llm.analyze", model=self.model) as span:
+                response = self._complete([
+                    {"role": "system", "content": self.analysis_prompt},
                     {"role": "user", "content": data_prompt}
-                ],
-                temperature=0.2
-            )
+                ], span)
             raw_output = response.choices[0].message.content.strip()
-            logging.info("Received raw output from Groq API:")
-            logging.info(raw_output)
+            telemetry.log_payload("Received raw output from Groq API", raw_output)
             if not raw_output:
                 st.error("Empty response from Groq API.")
                 return None
             # Clean and return the output
-            clean_output = self._clean_output(raw_output)
-            logging.info("Cleaned output:")
-            logging.info(clean_output)
-            return clean_output
+            return self._clean_output(raw_output)
         except Exception as e:
             st.error(f"API Error: {str(e)}")
             logging.error("Exception in analyze_data:", exc_info=True)
@@ -124,6 +160,216 @@ class GroqHandler:
 
 
 
+    def generate_sql_stream(self, natural_language: str, schema_context: Optional[str] = None,
+                            stop_event: Optional[threading.Event] = None) -> Iterator[str]:
+        """
+        Stream generated SQL as cleaned text deltas. Cached answers are yielded
+        in one piece; only complete (not stopped) generations are cached.
+        """
+        telemetry.log_payload("Received natural language input", natural_language)
+        cache_prompt = self._cache_prompt(schema_context)
+        if self.cache is not None:
+            cached = self.cache.get(natural_language, cache_prompt, self.model)
+            if cached is not None:
+                logging.info("Serving SQL from generation cache")
+                telemetry.record("llm.generate_sql", 0.0, model=self.model, cached=True)
+                yield cached
+                return
+
+        parts = []
+        completed = False
+        messages = self._sql_messages(natural_language, schema_context)
+        for delta in self._stream(messages, stop_event, "llm.generate_sql"):
+            if delta is None:
+                completed = True
+                break
+            parts.append(delta)
+            yield delta
+
+        clean_sql = "".join(parts).strip()
+        telemetry.log_payload("Received SQL output", clean_sql)
+        if completed and self.cache is not None and clean_sql:
+            self.cache.put(natural_language, cache_prompt, self.model, clean_sql)
+
+    def analyze_data_stream(self, data_prompt: str,
+                            stop_event: Optional[threading.Event] = None) -> Iterator[str]:
+        """Stream an analysis/chat answer as cleaned text deltas."""
+        telemetry.log_payload("Sending streaming request to Groq API with prompt", data_prompt)
+        for delta in self._stream([
+            {"role": "system", "content": self.analysis_prompt},
+            {"role": "user", "content": data_prompt}
+        ], stop_event, "llm.analyze"):
+            if delta is None:
+                break
+            yield delta
+
+    def chat_stream(self, messages: List[Dict[str, str]],
+                    stop_event: Optional[threading.Event] = None) -> Iterator[str]:
+        """
+        Stream the answer to the last user message of a multi-turn chat as
+        cleaned text deltas. The analysis instructions are prepended, so the
+        prompt prefix stays identical from turn to turn.
+        """
+        telemetry.log_payload("Sending chat turn to Groq API", messages[-1]["content"])
+        for delta in self._stream(
+            [{"role": "system", "content": self.analysis_prompt}] + messages, stop_event, "llm.chat"
+        ):
+            if delta is None:
+                break
+            yield delta
+
+    def _stream(self, messages, stop_event: Optional[threading.Event] = None,
+                span_name: str = "llm.stream") -> Iterator[Optional[str]]:
+        """
+        Yield cleaned content deltas as they arrive, then None once the
+        completion finished. Setting stop_event (or closing the generator)
+        stops early and closes the HTTP stream.
+        """
+        with telemetry.span(span_name, model=self.model, streamed=True) as span:
+            start = time.perf_counter()
+            # Only opening the stream is retried; a stream that fails midway is not replayed
+            estimate = self._estimate_tokens(messages)
+            stream = self.scheduler.execute(lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.2,
+                stream=True
+            ), tokens=estimate, span=span)
+            try:
+                for chunk in stream:
+                    if stop_event is not None and stop_event.is_set():
+                        logging.info("Generation stopped early by caller")
+                        span.attrs["stopped"] = True
+                        return
+                    # Groq reports token usage on the final chunk
+                    x_groq = getattr(chunk, "x_groq", None)
+                    self._record_usage(span, getattr(x_groq, "usage", None))
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        if "first_token_ms" not in span.attrs:
+                            span.attrs["first_token_ms"] = round((time.perf_counter() - start) * 1000, 3)
+                        # Backslash removal is per character, so it is safe per delta
+                        yield self._clean_output(content)
+                yield None
+            finally:
+                stream.response.close()
+                if "prompt_tokens" in span.attrs:
+                    self.scheduler.settle(estimate, span.attrs["prompt_tokens"] + span.attrs["completion_tokens"])
+
+    def _complete(self, messages, span: "telemetry.Span"):
+        """
+        One completion through the scheduler. Identical requests already in
+        flight (same model and messages) share a single API call; only the
+        caller that made it records the token usage.
+        """
+        estimate = self._estimate_tokens(messages)
+        key = hashlib.sha256(json.dumps([self.model, messages]).encode()).hexdigest()
+        response = self.scheduler.execute(lambda: self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.2
+        ), tokens=estimate, key=key, span=span)
+        if not span.attrs.get("coalesced"):
+            usage = getattr(response, "usage", None)
+            self._record_usage(span, usage)
+            self.scheduler.settle(estimate, usage.prompt_tokens + usage.completion_tokens if usage else None)
+        return response
+
+    def _estimate_tokens(self, messages) -> int:
+        return sum(estimate_tokens(m["content"]) for m in messages) + self.completion_token_estimate
+
+    def _record_usage(self, span: "telemetry.Span", usage):
+        if usage is not None:
+            span.attrs["prompt_tokens"] = usage.prompt_tokens
+            span.attrs["completion_tokens"] = usage.completion_tokens
+
+    def optimize_sql(self, sql_text: str) -> Optional[str]:
+        """Ask the model for tuning suggestions for a single slow statement."""
+        try:
+            return self._optimize(sql_text)
+        except Exception as e:
+            st.error(f"API Error: {str(e)}")
+            logging.error("Exception in optimize_sql:", exc_info=True)
+            return None
+
+    def optimize_many(self, statements: Iterable[Tuple[Hashable, str]],
+                      max_workers: int = 8) -> Iterator[Tuple[Hashable, Optional[str], Optional[str]]]:
+        """
+        Optimize several statements concurrently on a bounded thread pool.
+        Yields (key, suggestion, error) tuples in completion order so callers
+        can render each result as soon as it arrives. Runs no Streamlit calls
+        on worker threads.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="optimize") as pool:
+            futures = {pool.submit(self._optimize, sql_text): key for key, sql_text in statements}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    yield key, future.result(), None
+                except Exception as e:
+                    logging.error(f"Error optimizing statement {key}: {str(e)}")
+                    yield key, None, str(e)
+
+    def _optimize(self, sql_text: str) -> str:
+        with telemetry.span("llm.optimize", model=self.model) as span:
+            response = self._complete([
+                {"role": "system", "content": (
+                    "You are an Oracle Database 21c performance tuning expert. For the given SQL statement, "
+                    "explain the likely performance problems and suggest concrete improvements: rewritten "
+                    "Oracle 21c SQL, useful indexes, and optimizer hints where appropriate. Be concise."
+                )},
+                {"role": "user", "content": f"Optimize this Oracle SQL statement:\n{sql_text}"}
+            ], span)
+        raw_output = response.choices[0].message.content.strip()
+        if not raw_output:
+            raise ValueError("Empty response from Groq API.")
+        return self._clean_output(raw_output)
+
+    def rewrite_candidates(self, sql_text: str, plan_text: str,
+                           max_candidates: int = 4) -> List[Dict[str, str]]:
+        """
+        Ask for concrete rewrites and hint variants of a statement, given its
+        cached plan. Returns [{"label", "sql", "rationale"}]; raises
+        ValueError when the answer is not the requested JSON. Runs no
+        Streamlit calls.
+        """
+        with telemetry.span("llm.rewrite", model=self.model) as span:
+            response = self._complete([
+                {"role": "system", "content": (
+                    "You are an Oracle Database 21c performance tuning expert. Propose rewritten versions "
+                    "of the given SELECT statement that return exactly the same rows but run faster: "
+                    "restructured SQL and variants with optimizer hints. Answer with JSON only, in the form "
+                    '{"candidates": [{"label": "short name", "sql": "complete Oracle SQL without a '
+                    'trailing semicolon", "rationale": "one sentence"}]}.'
+                )},
+                {"role": "user", "content": (
+                    f"Propose up to {max_candidates} candidates.\n\nStatement:\n{sql_text}\n\n"
+                    f"Current plan (DBMS_XPLAN.DISPLAY_CURSOR):\n{plan_text}"
+                )}
+            ], span)
+        raw_output = response.choices[0].message.content.strip()
+        telemetry.log_payload("Received rewrite candidates", raw_output)
+        start, end = raw_output.find("{"), raw_output.rfind("}")
+        if start == -1 or end < start:
+            raise ValueError("Rewrite response is not JSON.")
+        try:
+            data = json.loads(raw_output[start:end + 1])
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Rewrite response is not valid JSON: {str(e)}")
+
+        candidates = []
+        for item in data.get("candidates", [])[:max_candidates]:
+            sql = str(item.get("sql") or "").strip().rstrip(";").strip()
+            if sql:
+                candidates.append({
+                    "label": str(item.get("label") or f"Candidate {len(candidates) + 1}"),
+                    "sql": sql,
+                    "rationale": str(item.get("rationale") or ""),
+                })
+        return candidates
+
     def _clean_output(self, raw_output: str) -> str:
         # Remove unwanted backslashes from the raw output
         return raw_output.replace("\\", "")
@@ -1,16 +1,191 @@
-from sklearn.ensemble import IsolationForest
 import numpy as np
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Metric keys with these prefixes are cumulative and converted to per-second deltas
+COUNTER_PREFIXES = ("stat:", "wait:")
+
+
+class MetricRingBuffer:
+    """Fixed-size, thread-safe buffer of metric samples and their anomaly scores."""
+
+    def __init__(self, capacity: int, feature_names: List[str]):
+        self.capacity = capacity
+        self.feature_names = feature_names
+        self.values = np.full((capacity, len(feature_names)), np.nan)
+        self.timestamps = np.zeros(capacity)
+        self.scores = np.full(capacity, np.nan)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp: float, row: np.ndarray) -> int:
+        with self._lock:
+            index = self.count % self.capacity
+            self.values[index] = row
+            self.timestamps[index] = timestamp
+            self.scores[index] = np.nan
+            self.count += 1
+            return index
+
+    def set_score(self, index: int, score: float):
+        with self._lock:
+            self.scores[index] = score
+
+    def latest(self, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (timestamps, values, scores) for the last n samples, oldest first."""
+        with self._lock:
+            size = min(self.count, self.capacity)
+            n = size if n is None else min(n, size)
+            start = self.count - n
+            order = np.arange(start, self.count) % self.capacity
+            return (self.timestamps[order].copy(),
+                    self.values[order].copy(),
+                    self.scores[order].copy())
+
 
 class HealthMonitor:
-    def __init__(self):
-        self.model = IsolationForest(contamination=0.1)
+    def __init__(self, model_path: Optional[str] = None, contamination: float = 0.1):
+        # scikit-learn and joblib are imported on first fit/load to keep startup fast
+        self.model = None
+        self.contamination = contamination
         self.is_trained = False
-    
-    def train_model(self, data: np.ndarray):
-        self.model.fit(data)
-        self.is_trained = True
-    
+        self.model_path = model_path
+        self.feature_names: Optional[List[str]] = None
+        self.trained_at: Optional[float] = None
+        self._lock = threading.Lock()
+        if model_path and os.path.exists(model_path):
+            self._load()
+
+    def train_model(self, data: np.ndarray, feature_names: Optional[List[str]] = None):
+        from sklearn.ensemble import IsolationForest
+
+        model = IsolationForest(contamination=self.contamination)
+        model.fit(data)
+        with self._lock:
+            self.model = model
+            self.feature_names = feature_names
+            self.trained_at = time.time()
+            self.is_trained = True
+        if self.model_path:
+            self._save()
+
     def detect_anomalies(self, new_data: np.ndarray) -> np.ndarray:
         if not self.is_trained:
             raise ValueError("Model not trained")
-        return self.model.predict(new_data)
\ No newline at end of file
+        return self.model.predict(new_data)
+
+    def score(self, new_data: np.ndarray) -> np.ndarray:
+        """Anomaly scores for samples without retraining; negative means anomalous."""
+        if not self.is_trained:
+            raise ValueError("Model not trained")
+        return self.model.decision_function(new_data)
+
+    def needs_training(self, retrain_interval: float, feature_names: List[str]) -> bool:
+        if not self.is_trained or self.feature_names != feature_names:
+            return True
+        return time.time() - (self.trained_at or 0) >= retrain_interval
+
+    def _save(self):
+        import joblib
+
+        tmp_path = f"{self.model_path}.tmp"
+        joblib.dump({
+            "model": self.model,
+            "feature_names": self.feature_names,
+            "trained_at": self.trained_at,
+        }, tmp_path)
+        os.replace(tmp_path, self.model_path)
+
+    def _load(self):
+        import joblib
+
+        try:
+            state = joblib.load(self.model_path)
+        except Exception as e:
+            print(f"Ignoring unreadable health model: {str(e)}")
+            return
+        self.model = state["model"]
+        self.feature_names = state["feature_names"]
+        self.trained_at = state["trained_at"]
+        self.is_trained = True
+
+
+class MetricsSampler:
+    """
+    Background thread that polls database metrics into a ring buffer, retrains
+    the monitor on a rolling window on a schedule and scores every new sample
+    as it arrives, so a health check only reads precomputed scores.
+    """
+
+    def __init__(self, fetch_metrics: Callable[[], Dict[str, float]], monitor: HealthMonitor,
+                 interval: float = 15.0, capacity: int = 2880, train_window: int = 960,
+                 min_train_samples: int = 40, retrain_interval: float = 3600.0,
+                 max_failures: int = 5):
+        self.fetch_metrics = fetch_metrics
+        self.monitor = monitor
+        self.interval = interval
+        self.capacity = capacity
+        self.train_window = train_window
+        self.min_train_samples = min_train_samples
+        self.retrain_interval = retrain_interval
+        self.max_failures = max_failures
+        self.buffer: Optional[MetricRingBuffer] = None
+        self.last_error: Optional[str] = None
+        self._previous: Optional[Tuple[float, Dict[str, float]]] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                self.sample_once()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                self.last_error = str(e)
+                if failures >= self.max_failures:
+                    print(f"Metrics sampler stopped after repeated errors: {str(e)}")
+                    return
+            self._stop.wait(self.interval)
+
+    def sample_once(self):
+        now = time.time()
+        raw = self.fetch_metrics()
+        previous = self._previous
+        self._previous = (now, raw)
+        if previous is None:
+            # Counters need two samples before the first delta exists
+            return
+
+        elapsed = max(now - previous[0], 1e-6)
+        if self.buffer is None:
+            self.buffer = MetricRingBuffer(self.capacity, sorted(raw))
+        names = self.buffer.feature_names
+        row = np.array([
+            (raw.get(name, np.nan) - previous[1].get(name, np.nan)) / elapsed
+            if name.startswith(COUNTER_PREFIXES) else raw.get(name, np.nan)
+            for name in names
+        ])
+        index = self.buffer.append(now, row)
+
+        if self.monitor.needs_training(self.retrain_interval, names):
+            _, window, _ = self.buffer.latest(self.train_window)
+            window = window[~np.isnan(window).any(axis=1)]
+            if len(window) >= self.min_train_samples:
+                self.monitor.train_model(window, names)
+
+        if self.monitor.is_trained and self.monitor.feature_names == names and not np.isnan(row).any():
+            self.buffer.set_score(index, float(self.monitor.score(row.reshape(1, -1))[0]))
+
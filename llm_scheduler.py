@@ -0,0 +1,214 @@
+import email.utils
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+import telemetry
+
+# HTTP statuses worth retrying: timeouts, rate limits and transient server errors
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# Keys of RequestScheduler.stats() that only ever grow
+COUNTER_STATS = ("requests", "retries", "rate_limited", "coalesced", "failed")
+
+
+class TokenBucket:
+    """
+    Refills `capacity` units per `period` seconds. Reservations are taken
+    immediately and may drive the level negative, so callers queue in
+    arrival order and each waits until its own share has refilled.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.level = capacity
+        self.updated = time.monotonic()
+        # Nothing is granted before this time (set from Retry-After)
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount and return the seconds until it is covered."""
+        self._refill(now)
+        # A single request larger than the bucket waits for a full bucket, never forever
+        self.level -= min(amount, self.capacity)
+        wait = max(0.0, -self.level / self.rate)
+        return max(wait, self.paused_until - now)
+
+    def adjust(self, amount: float, now: float):
+        """Charge (or refund, when negative) the difference to an earlier reservation."""
+        self._refill(now)
+        self.level -= amount
+
+
+class RequestScheduler:
+    """
+    Shared gate in front of an LLM API: requests-per-minute and
+    tokens-per-minute buckets, jittered exponential backoff that honours
+    Retry-After, and coalescing of identical in-flight requests so
+    concurrent callers share one completion. Limits left as None are not
+    enforced.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 retryable: Optional[Callable[[Exception], bool]] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = retryable or is_retryable
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "queued": 0, "requests": 0, "retries": 0, "rate_limited": 0,
+            "coalesced": 0, "failed": 0, "wait_total": 0.0, "wait_max": 0.0,
+        }
+
+    def execute(self, call: Callable[[], Any], tokens: int = 0, key: Optional[str] = None,
+                span: Optional["telemetry.Span"] = None) -> Any:
+        """
+        Run call once the quotas allow, retrying transient failures. Callers
+        passing the same key while a call is in flight get its result (or
+        exception) instead of issuing their own.
+        """
+        if key is not None:
+            with self._lock:
+                leader = self._in_flight.get(key)
+                if leader is None:
+                    future = self._in_flight[key] = Future()
+                else:
+                    self._stats["coalesced"] += 1
+            if leader is not None:
+                if span is not None:
+                    span.attrs["coalesced"] = True
+                return leader.result()
+            try:
+                result = self._run(call, tokens, span)
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                with self._lock:
+                    self._in_flight.pop(key, None)
+        return self._run(call, tokens, span)
+
+    def _run(self, call: Callable[[], Any], tokens: int, span: Optional["telemetry.Span"]) -> Any:
+        waited = 0.0
+        for attempt in range(self.max_retries + 1):
+            waited += self._admit(tokens)
+            try:
+                return call()
+            except Exception as e:
+                if attempt == self.max_retries or not self.retryable(e):
+                    with self._lock:
+                        self._stats["failed"] += 1
+                    raise
+                delay = retry_after(e)
+                if getattr(e, "status_code", None) == 429:
+                    with self._lock:
+                        self._stats["rate_limited"] += 1
+                if delay is not None:
+                    # The server says the quota is spent: hold back every caller,
+                    # but never longer than max_delay per attempt
+                    delay = min(delay, self.max_delay)
+                    self._pause(delay)
+                else:
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                with self._lock:
+                    self._stats["retries"] += 1
+                if span is not None:
+                    span.attrs["retries"] = attempt + 1
+                time.sleep(delay)
+                waited += delay
+            finally:
+                if span is not None and waited:
+                    span.attrs["queued_ms"] = round(waited * 1000, 3)
+
+    def _admit(self, tokens: int) -> float:
+        """Reserve one request and tokens, then sleep until both are available."""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens is not None and tokens:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            self._stats["requests"] += 1
+            self._stats["wait_total"] += wait
+            self._stats["wait_max"] = max(self._stats["wait_max"], wait)
+            if wait:
+                self._stats["queued"] += 1
+        if wait:
+            telemetry.record("llm.queue_wait", wait)
+            time.sleep(wait)
+            with self._lock:
+                self._stats["queued"] -= 1
+        return wait
+
+    def _pause(self, seconds: float):
+        with self._lock:
+            until = time.monotonic() + seconds
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.paused_until = max(bucket.paused_until, until)
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        """Correct the token bucket once the API reports the tokens a request used."""
+        if self.tokens is None or actual is None:
+            return
+        with self._lock:
+            self.tokens.adjust(actual - estimated, time.monotonic())
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth, wait times and retry counters since start."""
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = len(self._in_flight)
+        requests = stats["requests"]
+        return {
+            "queue_depth": stats["queued"],
+            "in_flight_coalescable": in_flight,
+            "requests": requests,
+            "retries": stats["retries"],
+            "rate_limited": stats["rate_limited"],
+            "coalesced": stats["coalesced"],
+            "failed": stats["failed"],
+            "avg_wait_ms": (stats["wait_total"] / requests * 1000) if requests else 0.0,
+            "max_wait_ms": stats["wait_max"] * 1000,
+        }
+
+
+def is_retryable(e: Exception) -> bool:
+    if getattr(e, "status_code", None) in RETRY_STATUSES:
+        return True
+    return isinstance(e, (TimeoutError, ConnectionError))
+
+
+def retry_after(e: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header (delta seconds or HTTP date) on the error's response."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
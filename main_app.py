@@ -1,40 +1,165 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from dotenv import load_dotenv
-from groq_handler import GroqHandler
+from groq_handler import GroqHandler, retryable_error
+from llm_scheduler import RequestScheduler, COUNTER_STATS
 from oracle_manager import OracleManager
-from health_monitor import HealthMonitor
+from health_monitor import HealthMonitor, MetricsSampler
+from sql_collector import SqlSnapshotCollector
 from security import SecurityManager
+from query_cache import get_shared_cache
+from generation_cache import GenerationCache
+from data_profiler import profile_dataframe
+from conversation import Conversation
+from query_jobs import QueryJobRunner
+from result_pager import ResultPager
+from rewrite_evaluator import RewriteEvaluator
+from deferred_values import display_frame, resolve
+import telemetry
 import os
+import threading
+import time
 import numpy as np
 
-load_dotenv()
-
-# Initialize components
-groq = GroqHandler()
-security = SecurityManager()
-monitor = HealthMonitor()
-
 # App Configuration
 st.set_page_config(page_title="AI Oracle Assistant", layout="wide")
 
+# Streamlit re-executes this script on every interaction; everything below
+# is created once per process and shared by all reruns and sessions.
+@st.cache_resource(show_spinner=False)
+def load_environment():
+    load_dotenv()
+    return True
+
+@st.cache_resource(show_spinner=False)
+def configure_telemetry():
+    telemetry.configure(
+        level=os.getenv("TELEMETRY_LEVEL", "summary"),
+        jsonl_path=os.getenv("TELEMETRY_JSONL_PATH") or None,
+    )
+    port = os.getenv("TELEMETRY_PROMETHEUS_PORT")
+    if port:
+        telemetry.start_metrics_server(int(port))
+    return True
+
+def optional_float(name):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+def gate_threshold(name, default):
+    """A plan-gate threshold; "none" or "off" disables it."""
+    value = os.getenv(name, default).strip()
+    return None if value.lower() in ("", "none", "off") else float(value)
+
+@st.cache_resource(show_spinner=False)
+def get_groq():
+    similarity = os.getenv("NL2SQL_CACHE_SIMILARITY")
+    # One scheduler for every session, so the API quotas are shared app-wide
+    scheduler = RequestScheduler(
+        requests_per_minute=optional_float("GROQ_REQUESTS_PER_MINUTE"),
+        tokens_per_minute=optional_float("GROQ_TOKENS_PER_MINUTE"),
+        max_retries=int(os.getenv("GROQ_MAX_RETRIES", "4")),
+        retryable=retryable_error,
+    )
+    telemetry.register_gauges("assistant_llm_scheduler", "Groq request scheduler state.", scheduler.stats,
+                              counters=COUNTER_STATS)
+    return GroqHandler(cache=GenerationCache(
+        os.getenv("NL2SQL_CACHE_PATH", ".nl2sql_cache.sqlite3"),
+        max_entries=int(os.getenv("NL2SQL_CACHE_MAX_ENTRIES", "5000")),
+        similarity_threshold=float(similarity) if similarity else None,
+    ), scheduler=scheduler)
+
+@st.cache_resource(show_spinner=False)
+def get_security():
+    return SecurityManager(
+        max_cost=gate_threshold("SQL_GATE_MAX_COST", "100000"),
+        max_cardinality=gate_threshold("SQL_GATE_MAX_CARDINALITY", "1000000"),
+        max_full_scan_blocks=gate_threshold("SQL_GATE_MAX_FULL_SCAN_BLOCKS", "100000"),
+        allow_cartesian=os.getenv("SQL_GATE_ALLOW_CARTESIAN", "false").lower() == "true",
+        action=os.getenv("SQL_GATE_ACTION", "limit"),
+        row_limit=int(os.getenv("SQL_GATE_ROW_LIMIT", "1000")),
+        fail_closed=os.getenv("SQL_GATE_FAIL_CLOSED", "true").lower() == "true",
+    )
+
+# Initialize components
+load_environment()
+configure_telemetry()
+groq = get_groq()
+security = get_security()
+
 def init_session_state():
     if "oracle" not in st.session_state:
-        st.session_state.oracle = OracleManager(os.getenv("ORACLE_DSN"))
+        st.session_state.oracle = OracleManager(
+            os.getenv("ORACLE_DSN"),
+            use_pool=os.getenv("ORACLE_POOL_ENABLED", "false").lower() == "true",
+            pool_min=int(os.getenv("ORACLE_POOL_MIN", "1")),
+            pool_max=int(os.getenv("ORACLE_POOL_MAX", "4")),
+            pool_increment=int(os.getenv("ORACLE_POOL_INCREMENT", "1")),
+            pool_wait_timeout=float(os.getenv("ORACLE_POOL_WAIT_TIMEOUT", "10")),
+            stmt_cache_size=int(os.getenv("ORACLE_STMT_CACHE_SIZE", "20")),
+            pool_user=os.getenv("ORACLE_POOL_USER"),
+            pool_password=os.getenv("ORACLE_POOL_PASSWORD"),
+            proxy_auth=os.getenv("ORACLE_POOL_PROXY_AUTH", "false").lower() == "true",
+            fetch_batch_size=int(os.getenv("ORACLE_FETCH_BATCH_SIZE", "1000")),
+            max_rows=int(os.getenv("ORACLE_MAX_ROWS", "100000")),
+            max_bytes=int(os.getenv("ORACLE_MAX_BYTES", str(256 * 1024 * 1024))),
+            result_cache=get_shared_cache(
+                max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+                ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300")),
+                max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256")),
+            ),
+            catalog_dir=os.getenv("SCHEMA_CATALOG_DIR", ".schema_catalog"),
+            catalog_owners=[o.strip() for o in os.getenv("SCHEMA_CATALOG_OWNERS", "").split(",") if o.strip()],
+            auto_bind=os.getenv("ORACLE_AUTO_BIND", "true").lower() == "true",
+            lob_inline_limit=int(os.getenv("ORACLE_LOB_INLINE_LIMIT", str(64 * 1024))),
+        )
     if "generated_sql" not in st.session_state:
         st.session_state.generated_sql = None
     if "executed_sql" not in st.session_state:
         st.session_state.executed_sql = None
-    if "query_df" not in st.session_state:
-        st.session_state.query_df = None
+    # Cursor over the executed query's result; pages are read from the database on demand
+    if "result_pager" not in st.session_state:
+        st.session_state.result_pager = None
+    # Background query jobs for this session; pending_job_id auto-loads when done
+    if "query_jobs" not in st.session_state:
+        workers = int(os.getenv("QUERY_JOB_WORKERS", "4"))
+        oracle = st.session_state.oracle
+        if oracle.use_pool:
+            # Leave pooled sessions free for other users and this user's own script-run calls
+            workers = min(workers, max(oracle.pool_max - 1, 1))
+        st.session_state.query_jobs = QueryJobRunner(
+            max_jobs_kept=int(os.getenv("QUERY_JOBS_KEPT", "10")),
+            max_workers=workers,
+        )
+    if "pending_job_id" not in st.session_state:
+        st.session_state.pending_job_id = None
+    # Serialized export of the full result, built on request
+    if "export_payload" not in st.session_state:
+        st.session_state.export_payload = None
+    # Compact profile of a sample of the result, built once per executed result
+    if "data_profile" not in st.session_state:
+        st.session_state.data_profile = None
+    # Timings of this session's recent requests, newest last
+    if "traces" not in st.session_state:
+        st.session_state.traces = []
+    # Trace of the job that produced the result; its first page render is timed into it
+    if "result_trace" not in st.session_state:
+        st.session_state.result_trace = None
     # Initialize chat-related state variables
-    if "chat_user_question" not in st.session_state:
-        st.session_state.chat_user_question = ""
     if "chat_ai_response" not in st.session_state:
         st.session_state.chat_ai_response = ""
-    if "chat_has_response" not in st.session_state:
-        st.session_state.chat_has_response = False
+    # Last measured rewrite evaluation from the Optimizer tab
+    if "rewrite_evaluation" not in st.session_state:
+        st.session_state.rewrite_evaluation = None
+    # Statements offered for rewrite evaluation when no interval snapshot is available
+    if "rewrite_sql_ids" not in st.session_state:
+        st.session_state.rewrite_sql_ids = None
+    # Chat about the current result, created on its first question
+    if "conversation" not in st.session_state:
+        st.session_state.conversation = None
+    # Question whose answer is streaming; recorded on the next run if Stop interrupts it
+    if "chat_pending" not in st.session_state:
+        st.session_state.chat_pending = None
     # Initialize analysis state
     if "analysis_result" not in st.session_state:
         st.session_state.analysis_result = None
@@ -49,6 +174,8 @@ def connection_form():
         
         if st.form_submit_button("Connect"):
             if st.session_state.oracle.connect(username, password):
+                with st.spinner("Loading schema catalog..."):
+                    st.session_state.oracle.refresh_catalog()
                 st.success("Connected successfully")
                 st.experimental_rerun()  # Refresh the page
             else:
@@ -69,9 +196,13 @@ def main_interface():
         handle_health_monitor()
     
     # Display query results and chat only if a query has been executed
-    if st.session_state.get("query_df") is not None and st.session_state.get("executed_sql") is not None:
+    if st.session_state.get("result_pager") is not None and st.session_state.get("executed_sql") is not None:
         st.subheader("Query Results")
-        st.dataframe(st.session_state.query_df)
+        page_df = show_result_page()
+        if page_df is not None and not page_df.empty:
+            pager = st.session_state.result_pager
+            show_large_values(page_df, pager.deferred.get(pager.page, []))
+        show_export_controls()
         
         # Add button to generate analysis
         if st.button("Generate Analysis and Recommendations"):
@@ -92,20 +223,24 @@ def main_interface():
 
 def generate_analysis():
     """Generates analysis and recommendations."""
-    if "executed_sql" not in st.session_state or "query_df" not in st.session_state:
+    if st.session_state.get("executed_sql") is None or st.session_state.get("result_pager") is None:
         st.error("No query context available for analysis.")
         return
 
     sql = st.session_state.executed_sql
-    df = st.session_state.query_df
 
-    analysis_prompt = create_analysis_prompt(sql, df)
-    with st.spinner("Analyzing data and generating recommendations..."):
-        analysis_result = groq.analyze_data(analysis_prompt)
-        if analysis_result:
-            st.session_state.analysis_result = analysis_result
-        else:
-            st.error("No analysis received from AI.")
+    with telemetry.use_trace(begin_trace("Analysis")):
+        with telemetry.span("prompt.build"):
+            profile = get_data_profile()
+            if profile is None:
+                return
+            analysis_prompt = create_analysis_prompt(sql, profile)
+        st.session_state.show_analysis = True
+        analysis_result = render_stream(
+            groq.analyze_data_stream(analysis_prompt), ("analysis_result",)
+        )
+    if not analysis_result:
+        st.error("No analysis received from AI.")
 
 def handle_nl2sql():
     col1, col2 = st.columns([3, 2])
@@ -114,10 +249,17 @@ def handle_nl2sql():
         query = st.text_area("Enter your request:", height=150)
         if st.button("Generate SQL"):
             if query:
-                with st.spinner("Generating..."):
-                    generated = groq.generate_sql(query)
-                    st.session_state.generated_sql = generated
-                    st.session_state.edited_sql = generated  # Initialize editable SQL
+                # Partial SQL is mirrored into the editable SQL as it streams
+                with telemetry.use_trace(begin_trace("Generate SQL")):
+                    with telemetry.span("schema.context"):
+                        schema_context = st.session_state.oracle.schema_context(query)
+                    generated = render_stream(
+                        groq.generate_sql_stream(query, schema_context),
+                        ("generated_sql", "edited_sql"),
+                        as_code=True,
+                    )
+                st.session_state.generated_sql = generated or None
+                st.session_state.edited_sql = generated  # Initialize editable SQL
     with col2:
         if st.session_state.generated_sql:
             st.subheader("Generated SQL")
@@ -138,79 +280,362 @@ def handle_nl2sql():
     if 'exe_gen_sql' in locals() and exe_gen_sql:
         execute_query(st.session_state.generated_sql)
 
+    show_query_jobs()
+
 def execute_query(sql):
-    """Execute SQL and persist results for further interactions."""
+    """Submit SQL as a background job; its result is loaded once it completes."""
     try:
         if security.sanitize_input(sql):
-            df = st.session_state.oracle.execute_query(sql)
-            if not df.empty:
-                # Store the query context in session state
-                st.session_state.executed_sql = sql
-                st.session_state.query_df = df
-                # Reset analysis when a new query is executed
-                st.session_state.analysis_result = None
-                st.session_state.show_analysis = False
-                # Rerun the app so that main_interface displays results once
-                st.experimental_rerun()
-            else:
-                handle_empty_query(sql)
+            oracle = st.session_state.oracle
+            with telemetry.span("sql.plan_check") as span:
+                verdict = security.check_plan(oracle, sql)
+                span.attrs.update(cached=verdict.cached, cost=verdict.cost, cardinality=verdict.cardinality)
+            if not verdict.allowed:
+                st.error(f"Query blocked by the plan check: {verdict.reason}")
+                return
+            if verdict.limited:
+                st.info(f"Limited to the first {security.row_limit} rows: {verdict.reason}")
+            timeout = float(os.getenv("QUERY_TIMEOUT_SECONDS", "120"))
+            # The job reads only the first page; later pages load as the user browses.
+            # The pager caches that page when it adopts it, so the stream does not.
+            first_page = new_pager(verdict.sql).page_query(0)
+            job = st.session_state.query_jobs.submit(
+                oracle, first_page.sql, binds=first_page.binds or None, timeout=timeout or None,
+                max_rows=first_page.max_rows, source_sql=verdict.sql, use_cache=False,
+            )
+            if telemetry.level() != "off":
+                job.trace.add(span)
+            st.session_state.pending_job_id = job.id
+            keep_trace(job.trace)
         else:
             st.error("Query blocked by security rules")
     except Exception as e:
         st.error(f"Execution error: {str(e)}")
 
+def run_job_to_completion(sql, max_rows=None):
+    """
+    Runs sql as a query job under the usual timeout and waits for its result.
+    The job is cancelled if this script run is interrupted while waiting.
+    """
+    timeout = float(os.getenv("QUERY_TIMEOUT_SECONDS", "120"))
+    job = st.session_state.query_jobs.submit(
+        st.session_state.oracle, sql, timeout=timeout or None, max_rows=max_rows,
+    )
+    try:
+        while job.running:
+            time.sleep(0.05)
+    finally:
+        if job.running:
+            job.cancel()
+    if job.status != "done":
+        raise Exception(job.error or f"Query #{job.id} {job.status} after {job.elapsed:.1f}s")
+    df = job.result
+    # Handed to the caller; the job list offers no Load for it
+    job.result = None
+    return df
+
+def load_job_result(job):
+    """Persist a finished job's result for further interactions."""
+    if job.id == st.session_state.pending_job_id:
+        st.session_state.pending_job_id = None
+    if job.status == "failed":
+        st.error(f"Execution error: {job.error}")
+        return
+    if job.status != "done":
+        st.warning(f"Query #{job.id} {job.status} after {job.elapsed:.1f}s")
+        return
+
+    df = job.result
+    # The first page moves to the result cache; the job no longer needs its copy
+    job.result = None
+    if not df.empty:
+        pager = new_pager(job.source_sql)
+        pager.adopt(st.session_state.oracle, df)
+        # Store the query context in session state
+        st.session_state.executed_sql = job.source_sql
+        st.session_state.result_pager = pager
+        st.session_state.data_profile = None
+        st.session_state.export_payload = None
+        st.session_state.conversation = None
+        st.session_state.chat_pending = None
+        st.session_state.result_trace = job.trace
+        # Reset analysis when a new query is executed
+        st.session_state.analysis_result = None
+        st.session_state.show_analysis = False
+        # Rerun the app so that main_interface displays results once
+        st.experimental_rerun()
+    else:
+        handle_empty_query(job.source_sql)
+
+def new_pager(sql):
+    return ResultPager(sql, page_size=int(os.getenv("RESULT_PAGE_SIZE", "100")))
+
+def show_result_page():
+    """Shows the current page of the result, reading it from the database on demand."""
+    pager = st.session_state.result_pager
+    oracle = st.session_state.oracle
+    cols = st.columns([1, 1, 4])
+    with cols[0]:
+        if st.button("◀ Previous", disabled=pager.page == 0):
+            pager.page -= 1
+    with cols[1]:
+        at_end = pager.last_page is not None and pager.page >= pager.last_page
+        if st.button("Next ▶", disabled=at_end):
+            pager.page += 1
+
+    # The first render of a new result is timed into its query job's trace
+    trace = st.session_state.result_trace
+    st.session_state.result_trace = None
+    with telemetry.use_trace(trace):
+        try:
+            with telemetry.span("page.load", page=pager.page, mode=pager.mode):
+                df = pager.load(oracle)
+        except Exception as e:
+            st.error(f"Error loading page {pager.page + 1}: {str(e)}")
+            return None
+        with telemetry.span("ui.render", rows=len(df)):
+            st.dataframe(display_frame(df, int(os.getenv("DISPLAY_MAX_CHARS", "200"))))
+
+    start = pager.page * pager.page_size
+    total = f" of {pager.last_page + 1}" if pager.last_page is not None else ""
+    with cols[2]:
+        st.caption(f"Page {pager.page + 1}{total} · rows {start + 1}–{start + len(df)}")
+    if pager.notice:
+        st.caption(pager.notice)
+    if pager.last_page is None or pager.page < pager.last_page:
+        pager.prefetch(oracle, pager.page + 1, st.session_state.query_jobs)
+    return df
+
+def show_large_values(df, deferred):
+    """Lets the user expand one large LOB or truncated text cell of the current page in full."""
+    wide = [
+        column for column in df.columns
+        if df[column].dtype == object or pd.api.types.is_string_dtype(df[column])
+    ]
+    if not wide:
+        return
+    with st.expander("Inspect large values"):
+        column = st.selectbox("Column", deferred or wide)
+        row = st.number_input("Row on this page", min_value=0, max_value=len(df) - 1, value=0, step=1)
+        value = resolve(df[column].iloc[int(row)])
+        if isinstance(value, bytes):
+            st.write(f"{len(value)} bytes")
+            st.code(value[:4096].hex())
+        else:
+            st.text(value)
+
+def show_export_controls():
+    """Offers the current result as an Arrow IPC stream or Parquet file."""
+    cols = st.columns([2, 1, 3])
+    with cols[0]:
+        export_format = st.selectbox("Export format", ["Parquet", "Arrow IPC"], label_visibility="collapsed")
+    with cols[1]:
+        if st.button("Prepare export"):
+            # pyarrow is only needed once someone exports
+            from result_export import to_arrow_ipc, to_parquet
+
+            try:
+                with st.spinner("Fetching the full result..."):
+                    df = run_job_to_completion(st.session_state.executed_sql)
+            except Exception as e:
+                st.error(f"Export error: {str(e)}")
+                return
+            if df.attrs.get("truncated"):
+                st.warning(f"Export truncated to the first {len(df)} rows by the fetch row/byte budget.")
+            if export_format == "Parquet":
+                st.session_state.export_payload = ("result.parquet", to_parquet(df), "application/vnd.apache.parquet")
+            else:
+                st.session_state.export_payload = ("result.arrow", to_arrow_ipc(df), "application/vnd.apache.arrow.stream")
+    if st.session_state.export_payload is not None:
+        file_name, data, mime = st.session_state.export_payload
+        with cols[2]:
+            st.download_button(f"Download {file_name}", data, file_name=file_name, mime=mime)
+
+def show_query_jobs():
+    """Lists this session's query jobs with progress, cancel and load controls."""
+    runner = st.session_state.query_jobs
+    jobs = runner.jobs()
+    if not jobs:
+        return
+
+    st.subheader("Query Jobs")
+    for job in jobs:
+        cols = st.columns([6, 1])
+        with cols[0]:
+            st.caption(
+                f"#{job.id} · {job.status} · {job.rows_fetched} rows · {job.elapsed:.1f}s — "
+                f"{' '.join(job.source_sql.split())[:120]}"
+            )
+        with cols[1]:
+            if job.running:
+                if st.button("Cancel", key=f"cancel_job_{job.id}"):
+                    job.cancel()
+            elif job.status == "done" and job.result is not None and job.id != st.session_state.pending_job_id:
+                if st.button("Load", key=f"load_job_{job.id}"):
+                    load_job_result(job)
+
+    pending = runner.get(st.session_state.pending_job_id) if st.session_state.pending_job_id else None
+    if pending is None:
+        return
+    if pending.running:
+        if pending.first_chunk is not None:
+            st.caption("Showing first rows while the rest of the result loads...")
+            st.dataframe(pending.first_chunk)
+    else:
+        load_job_result(pending)
+
+def render_stream(deltas, state_keys, as_code=False):
+    """
+    Renders streamed LLM output incrementally and returns the full text.
+    The partial text is written to session state on every delta, so pressing
+    Stop (which interrupts this script run) keeps what was generated so far.
+    """
+    placeholder = st.empty()
+    placeholder.caption("Waiting for the first tokens...")
+    st.button("Stop generating", key=f"stop_{state_keys[0]}")
+    text = ""
+    try:
+        for delta in deltas:
+            text += delta
+            for key in state_keys:
+                st.session_state[key] = text
+            if as_code:
+                placeholder.code(text)
+            else:
+                placeholder.markdown(text + "▌")
+    except Exception as e:
+        st.error(f"API Error: {str(e)}")
+    finally:
+        deltas.close()
+    placeholder.empty()
+    return text.strip()
+
+def begin_trace(name):
+    """Starts a timing trace for one user request and keeps it for the timing panel."""
+    return keep_trace(telemetry.Trace(name))
+
+def keep_trace(trace):
+    traces = st.session_state.traces
+    traces.append(trace)
+    del traces[:-int(os.getenv("TELEMETRY_TRACES_KEPT", "10"))]
+    return trace
+
+def show_timings():
+    """Shows per-stage timings of this session's recent requests in the sidebar."""
+    if telemetry.level() == "off":
+        return
+    with st.sidebar.expander("Request Timings"):
+        for trace in reversed(st.session_state.traces):
+            rows = trace.rows()
+            st.caption(f"{trace.name} · {trace.elapsed * 1000:.0f} ms")
+            if rows:
+                st.dataframe(pd.DataFrame(rows).drop(columns=["started_at"]), hide_index=True)
+        if st.button("Show process metrics"):
+            st.code(telemetry.prometheus_text(), language="text")
+
 def show_chat_section():
-    """Displays the chat section for interacting with the AI."""
+    """Displays the multi-turn chat about the current result."""
     st.subheader("Chat with AI About the Database Output")
 
     # Retrieve persisted query context
-    if "executed_sql" not in st.session_state or "query_df" not in st.session_state:
+    if st.session_state.get("executed_sql") is None or st.session_state.get("result_pager") is None:
         st.error("No query context available. Please execute a query first.")
         return
 
-    sql = st.session_state.executed_sql
-    df = st.session_state.query_df
+    conversation = st.session_state.conversation
+    if conversation is not None and st.session_state.chat_pending is not None:
+        # The previous answer was stopped; keep what was generated so far
+        conversation.add(st.session_state.chat_pending, st.session_state.chat_ai_response or "(stopped)")
+    st.session_state.chat_pending = None
 
     chat_container = st.container()
     
     with chat_container:
-        with st.form(key="chat_form"):
+        if conversation is not None:
+            if conversation.compacted_turns:
+                st.caption(f"{conversation.compacted_turns} earlier question(s) summarized to keep the prompt small")
+            for turn in conversation.turns:
+                with st.chat_message("user"):
+                    st.markdown(turn.question)
+                with st.chat_message("assistant"):
+                    st.markdown(turn.answer)
+
+        with st.form(key="chat_form", clear_on_submit=True):
             user_question = st.text_input(
                 "Ask a question about the data:", 
-                value=st.session_state.chat_user_question,
                 key="chat_question_input"
             )
             submit_button = st.form_submit_button("Ask")
         
         if submit_button and user_question:
-            st.session_state.chat_user_question = user_question
-            chat_prompt = create_chat_prompt(sql, df, user_question)
-            
-            with st.spinner("Processing your question..."):
-                try:
-                    chat_response = groq.analyze_data(chat_prompt)
-                    if chat_response:
-                        st.session_state.chat_ai_response = chat_response
-                        st.session_state.chat_has_response = True
-                    else:
-                        st.error("No response received from AI.")
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
-        
-        # Display the chat response only if it is non-empty
-        if st.session_state.chat_has_response and st.session_state.chat_ai_response.strip() != "":
-            st.subheader("Chat Response")
-            st.markdown(st.session_state.chat_ai_response)
-            
-            if st.button("Clear response", key="clear_chat"):
-                st.session_state.chat_has_response = False
+            with telemetry.use_trace(begin_trace("Chat")):
+                with telemetry.span("prompt.build") as span:
+                    conversation = get_conversation()
+                    if conversation is None:
+                        return
+                    messages = conversation.messages(user_question)
+                    span.attrs.update(
+                        turn=conversation.compacted_turns + len(conversation.turns) + 1,
+                        prompt_tokens_estimate=conversation.prompt_tokens(user_question),
+                    )
+
+                with st.chat_message("user"):
+                    st.markdown(user_question)
+                st.session_state.chat_pending = user_question
                 st.session_state.chat_ai_response = ""
+                with st.chat_message("assistant"):
+                    chat_response = render_stream(
+                        groq.chat_stream(messages), ("chat_ai_response",)
+                    )
+                    st.markdown(chat_response)
+            st.session_state.chat_pending = None
+            if chat_response:
+                conversation.add(user_question, chat_response)
+            else:
+                st.error("No response received from AI.")
+
+        if conversation is not None and conversation.turns:
+            if st.button("Clear conversation", key="clear_chat"):
+                conversation.clear()
                 st.experimental_rerun()
 
-def create_chat_prompt(sql, df, user_question):
-    """Creates the prompt for the AI chat based on the executed SQL and its results."""
+def get_conversation():
+    """Returns the chat about the current result, building its context prefix once."""
+    if st.session_state.conversation is None:
+        profile = get_data_profile()
+        if profile is None:
+            return None
+        st.session_state.conversation = Conversation(
+            create_chat_context(st.session_state.executed_sql, profile),
+            history_token_budget=int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1000")),
+        )
+    return st.session_state.conversation
+
+def get_data_profile():
+    """
+    Returns the token-budgeted profile of the current result, built once from
+    a bounded sample of its leading rows; the sample itself is not kept.
+    """
+    if st.session_state.data_profile is None:
+        sample_rows = int(os.getenv("PROFILE_SAMPLE_ROWS", "10000"))
+        try:
+            df = run_job_to_completion(st.session_state.executed_sql, max_rows=sample_rows)
+        except Exception as e:
+            st.error(f"Error reading result sample: {str(e)}")
+            return None
+        profile = profile_dataframe(df, token_budget=int(os.getenv("PROMPT_DATA_TOKEN_BUDGET", "6000")))
+        if df.attrs.get("truncated"):
+            profile = f"(Profile of the first {len(df)} rows of a larger result)\n{profile}"
+        st.session_state.data_profile = profile
+    return st.session_state.data_profile
+
+def create_chat_context(sql, profile):
+    """
+    Creates the fixed context of a chat about one result from the executed SQL
+    and its result profile; every question in the conversation reuses it.
+    """
     return f"""
-    **Task**: Answer the user's question using the SQL query results below. Follow these steps:
+    **Task**: Answer the user's questions using the SQL query results below. For each question:
     1. Directly answer the question in natural language.
     2. If relevant, provide an Oracle 21c SQL query to explore further.
     3. Format SQL with ```sql code blocks```.
@@ -219,18 +644,15 @@ def create_chat_prompt(sql, df, user_question):
     {sql}
 
     **Query Results**:
-    {df.to_string()}
-
-    **Question**:
-    {user_question}
+    {profile}
     """
 
-def create_analysis_prompt(sql, df):
-    """Creates the analysis prompt for the AI based on the executed SQL and its results."""
+def create_analysis_prompt(sql, profile):
+    """Creates the analysis prompt for the AI based on the executed SQL and its result profile."""
     return f"""
     Here is the query {sql} executed in Oracle Database 21c, based on that:
-    Here is the output from the database:
-    {df.to_string()}
+    Here is the output from the database (full rows when small, otherwise a profile and sample):
+    {profile}
 
     Analyze this data and provide:
     1. Insights: Key trends, patterns, or anomalies.
@@ -241,35 +663,336 @@ def create_analysis_prompt(sql, df):
 def handle_empty_query(sql):
     """Handles the case where the query returns no rows."""
     metadata = st.session_state.oracle.get_table_metadata(sql)
-    if metadata is not None:
+    if metadata is not None and not metadata.empty:
         st.info("Query executed successfully but returned no rows. Displaying table metadata:")
         st.dataframe(metadata)
     else:
         st.warning("Query executed successfully but returned no rows, and no metadata was available.")
 
+@st.cache_resource(show_spinner=False)
+def monitor_login_state():
+    # Survives reruns, so a failed monitor login is not retried on every rerun
+    return {"lock": threading.Lock(), "error": None, "retry_at": 0.0}
+
+def connect_monitor():
+    """Opens a dedicated session for background monitoring with the ORACLE_MONITOR_* account."""
+    user = os.getenv("ORACLE_MONITOR_USER")
+    if not user:
+        raise RuntimeError("Set ORACLE_MONITOR_USER and ORACLE_MONITOR_PASSWORD to enable monitoring.")
+    state = monitor_login_state()
+    with state["lock"]:
+        if time.time() < state["retry_at"]:
+            raise RuntimeError(state["error"])
+        oracle = OracleManager(os.getenv("ORACLE_DSN"))
+        if not oracle.connect(user, os.getenv("ORACLE_MONITOR_PASSWORD", "")):
+            # Back off so reruns and job polls cannot lock the account with failed logins
+            retry = float(os.getenv("ORACLE_MONITOR_RETRY_SECONDS", "300"))
+            state["error"] = f"Could not connect the monitoring account {user}; retrying in {retry:.0f} s."
+            state["retry_at"] = time.time() + retry
+            raise RuntimeError(state["error"])
+        state["error"], state["retry_at"] = None, 0.0
+    return oracle
+
+@st.cache_resource(show_spinner=False)
+def create_sql_collector():
+    monitor = connect_monitor()
+    interval = float(os.getenv("SQL_SNAPSHOT_INTERVAL", "60"))
+    collector = SqlSnapshotCollector(
+        lambda: monitor.get_sql_snapshot(
+            active_within=int(interval * 2),
+            max_statements=int(os.getenv("SQL_SNAPSHOT_MAX_STATEMENTS", "5000")),
+        ),
+        history_dir=os.getenv("SQL_HISTORY_DIR", ".sql_history"),
+        interval=interval,
+        top_n=int(os.getenv("SQL_SNAPSHOT_TOP_N", "200")),
+    )
+    collector.start()
+    return collector
+
+def start_sql_collector():
+    """Returns the process-wide V$SQLSTATS snapshot collector, starting it on first use."""
+    collector = create_sql_collector()
+    if not collector.is_alive():
+        # Stopped after repeated errors: reconnect and start a fresh collector
+        create_sql_collector.clear()
+        collector = create_sql_collector()
+    return collector
+
 def handle_optimization():
+    try:
+        collector, unavailable = start_sql_collector(), None
+    except RuntimeError as e:
+        collector, unavailable = None, str(e)
+    if collector is not None and collector.last_error:
+        st.warning(f"SQL snapshot error: {collector.last_error}")
+
+    top = collector.top_now(int(os.getenv("OPTIMIZER_TOP_N", "20"))) if collector is not None else None
+    if collector is None:
+        st.info(f"{unavailable} Interval statistics are unavailable; using lifetime totals.")
+    elif top is None:
+        st.info("Collecting the first snapshot interval; showing lifetime totals until then.")
+    if top is not None:
+        st.subheader("Slowest statements in the last interval")
+        st.dataframe(top[[
+            "sql_id", "plan_hash_value", "d_elapsed_time", "d_cpu_time",
+            "d_buffer_gets", "d_executions", "elapsed_per_exec_ms"
+        ]])
+
     if st.button("Analyze Slow Queries"):
-        queries = st.session_state.oracle.get_performance_data()
+        oracle = st.session_state.oracle
+        if top is not None and not top.empty:
+            # Full text is fetched only for the statements shown here
+            queries = [
+                {"sql_id": sql_id, "sql_text": oracle.get_sql_text(sql_id)}
+                for sql_id in top["sql_id"].drop_duplicates()
+            ]
+            queries = [q for q in queries if q["sql_text"]]
+        else:
+            queries = oracle.get_performance_data()
+
+        placeholders = []
         for q in queries:
             with st.expander(f"Query {q['sql_id']}"):
                 st.code(q["sql_text"])
-                optimized = groq.optimize_sql(q["sql_text"])
-                st.markdown(f"**Optimization Suggestions:**\n{optimized}")
+                history = collector.history(q["sql_id"]) if collector is not None else []
+                if len(history) > 1:
+                    import plotly.express as px
+
+                    st.plotly_chart(px.line(
+                        history, x="time", y="d_elapsed_time", color="plan_hash_value",
+                        labels={"d_elapsed_time": "Elapsed time per interval (us)"},
+                    ), use_container_width=True)
+                placeholders.append(st.empty())
+                placeholders[-1].info("Waiting for optimization suggestions...")
+
+        # Fan out to the LLM and fill in each expander as its answer completes
+        results = groq.optimize_many(
+            ((i, q["sql_text"]) for i, q in enumerate(queries)),
+            max_workers=int(os.getenv("OPTIMIZER_CONCURRENCY", "8")),
+        )
+        for i, optimized, error in results:
+            if error:
+                placeholders[i].error(f"API Error: {error}")
+            else:
+                placeholders[i].markdown(f"**Optimization Suggestions:**\n{optimized}")
+
+    show_rewrite_evaluation(top)
+
+def show_rewrite_evaluation(top):
+    """Measures model-proposed rewrites of one slow statement against the original."""
+    st.subheader("Measured rewrites")
+    oracle = st.session_state.oracle
+    if top is not None and not top.empty:
+        sql_ids = list(top["sql_id"].drop_duplicates())
+    else:
+        # Lifetime totals scan V$SQLSTATS, so they are read on request rather than every rerun
+        if st.button("Load slow statements"):
+            st.session_state.rewrite_sql_ids = [q["sql_id"] for q in oracle.get_performance_data()]
+        sql_ids = st.session_state.rewrite_sql_ids
+        if sql_ids is None:
+            return
+    if not sql_ids:
+        st.info("No slow statements to evaluate yet.")
+        return
+
+    sql_id = st.selectbox("Statement", sql_ids, key="rewrite_sql_id")
+    if st.button("Evaluate rewrites"):
+        evaluator = RewriteEvaluator(
+            oracle, groq, security,
+            repeat=int(os.getenv("REWRITE_REPEAT", "3")),
+            warmup=int(os.getenv("REWRITE_WARMUP", "1")),
+            timeout_seconds=float(os.getenv("REWRITE_TIMEOUT_SECONDS", "30")),
+            max_rows=int(os.getenv("REWRITE_MAX_ROWS", "100000")),
+            max_candidates=int(os.getenv("REWRITE_CANDIDATES", "4")),
+        )
+        status = st.empty()
+        try:
+            sql_text = oracle.get_sql_text(sql_id)
+            if not sql_text:
+                st.error(f"The text of {sql_id} is no longer in the shared pool.")
+                return
+            with telemetry.use_trace(begin_trace(f"Rewrite {sql_id}")):
+                st.session_state.rewrite_evaluation = evaluator.evaluate(sql_id, sql_text, progress=status.info)
+        except Exception as e:
+            st.error(f"Evaluation error: {str(e)}")
+        status.empty()
+
+    evaluation = st.session_state.rewrite_evaluation
+    if evaluation is None:
+        return
+    st.caption(f"Statement {evaluation.sql_id}: median of measured runs after warm-up, best first")
+    rows = []
+    for candidate in [evaluation.original] + evaluation.candidates:
+        measurement = candidate.measurement
+        rows.append({
+            "candidate": candidate.label,
+            "status": candidate.status,
+            "same rows": {True: "yes", False: "no", None: "unverified"}[candidate.equivalent]
+                         if candidate is not evaluation.original else "",
+            "elapsed ms": round(measurement.elapsed_ms, 1) if measurement else None,
+            "speedup": round(candidate.speedup, 2) if candidate.speedup else None,
+            "buffer gets": measurement.buffer_gets if measurement else None,
+            "plan cost": candidate.cost,
+            "rows": measurement.rows if measurement else None,
+            "error": candidate.error,
+        })
+    st.dataframe(pd.DataFrame(rows), hide_index=True)
+    with st.expander("Current plan (DBMS_XPLAN.DISPLAY_CURSOR)"):
+        st.code(evaluation.plan, language="text")
+    for candidate in evaluation.candidates:
+        with st.expander(f"{candidate.label}"):
+            if candidate.rationale:
+                st.write(candidate.rationale)
+            st.code(candidate.sql, language="sql")
+            if candidate.measurement and candidate.measurement.truncated:
+                st.caption(f"Result longer than {os.getenv('REWRITE_MAX_ROWS', '100000')} rows; equivalence not verified.")
+
+def show_pool_stats():
+    """Shows session pool statistics in the sidebar when running pooled."""
+    stats = st.session_state.oracle.pool_stats()
+    if stats is None:
+        return
+    with st.sidebar.expander("Connection Pool"):
+        st.write(f"Busy sessions: {stats['busy']} / open: {stats['open']} (max {stats['max']})")
+        st.write(f"Acquires: {stats['acquires']}")
+        st.write(f"Avg wait: {stats['avg_wait_ms']:.1f} ms, max wait: {stats['max_wait_ms']:.1f} ms")
+
+def show_llm_stats():
+    """Shows Groq request scheduler queueing and retry statistics in the sidebar."""
+    stats = groq.scheduler.stats()
+    with st.sidebar.expander("LLM Requests"):
+        st.write(f"Queued now: {stats['queue_depth']} · requests: {stats['requests']}")
+        st.write(f"Avg wait: {stats['avg_wait_ms']:.1f} ms, max wait: {stats['max_wait_ms']:.1f} ms")
+        st.write(f"Retries: {stats['retries']} (rate limited: {stats['rate_limited']}) · "
+                 f"coalesced: {stats['coalesced']} · failed: {stats['failed']}")
+
+def show_cache_stats():
+    """Shows shared result cache statistics and invalidation controls in the sidebar."""
+    cache = st.session_state.oracle.result_cache
+    if cache is None:
+        return
+    stats = cache.stats()
+    with st.sidebar.expander("Result Cache"):
+        st.write(f"Entries: {stats['entries']} ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+        st.write(f"Hits: {stats['hits']} / misses: {stats['misses']} ({stats['hit_ratio']:.0%})")
+        st.write(f"Evictions: {stats['evictions']}")
+        if st.button("Clear cached results for this schema"):
+            st.session_state.oracle.invalidate_cache()
+            st.experimental_rerun()
+
+def show_parse_stats():
+    """Shows literal-to-bind rewrite counts and the user's parse statistics in the sidebar."""
+    oracle = st.session_state.oracle
+    with st.sidebar.expander("Cursor Sharing"):
+        rewrites = oracle.bind_stats
+        st.write(
+            f"Statements rewritten to binds: {rewrites['rewritten']} / {rewrites['statements']} "
+            f"({rewrites['literals_bound']} literals bound)"
+        )
+        if st.button("Show parse statistics"):
+            stats = oracle.get_parse_stats()
+            if stats is None:
+                st.warning("V$SESSION / V$SESSTAT are not accessible for this user.")
+            else:
+                st.caption(
+                    f"Summed over {stats['sessions']:.0f} open sessions of {oracle.username}, "
+                    "including other clients of the same account."
+                )
+                st.write(f"Hard parses: {stats.get('parse count (hard)', 0):.0f}")
+                st.write(f"Parse calls: {stats.get('parse count (total)', 0):.0f}")
+                st.write(f"Session cursor cache hits: {stats.get('session cursor cache hits', 0):.0f}")
+                st.write(f"Executes without a parse call: {stats['executes without parse']:.0f}")
+
+def show_catalog_controls():
+    """Shows schema catalog size and an incremental refresh button in the sidebar."""
+    catalog = st.session_state.oracle.catalog
+    if catalog is None:
+        return
+    with st.sidebar.expander("Schema Catalog"):
+        st.write(f"Tables indexed: {len(catalog.tables)}")
+        if st.button("Refresh schema catalog"):
+            with st.spinner("Refreshing changed objects..."):
+                st.session_state.oracle.refresh_catalog()
+            st.experimental_rerun()
+
+@st.cache_resource(show_spinner=False)
+def create_metrics_sampler():
+    sampler = MetricsSampler(
+        connect_monitor().get_system_metrics,
+        HealthMonitor(model_path=os.getenv("HEALTH_MODEL_PATH", ".health_model.joblib")),
+        interval=float(os.getenv("HEALTH_SAMPLE_INTERVAL", "15")),
+        capacity=int(os.getenv("HEALTH_BUFFER_SIZE", "2880")),
+        train_window=int(os.getenv("HEALTH_TRAIN_WINDOW", "960")),
+        retrain_interval=float(os.getenv("HEALTH_RETRAIN_INTERVAL", "3600")),
+    )
+    sampler.start()
+    return sampler
+
+def start_metrics_sampler():
+    """Returns the process-wide metrics sampler, starting it on first use."""
+    sampler = create_metrics_sampler()
+    if not sampler.is_alive():
+        # Stopped after repeated errors: reconnect and start a fresh sampler
+        create_metrics_sampler.clear()
+        sampler = create_metrics_sampler()
+    return sampler
 
 def handle_health_monitor():
+    try:
+        sampler = start_metrics_sampler()
+    except RuntimeError as e:
+        st.info(str(e))
+        return
+    if sampler.last_error:
+        st.warning(f"Metrics sampling error: {sampler.last_error}")
+
     if st.button("Run Health Check"):
-        data = np.random.rand(100, 1)  # Replace with real metrics if available
-        monitor.train_model(data)
-        anomalies = monitor.detect_anomalies(data)
-        st.write("Anomaly Detection Results:", anomalies)
+        buffer = sampler.buffer
+        if buffer is None or not sampler.monitor.is_trained:
+            collected = buffer.count if buffer is not None else 0
+            st.info(
+                f"Collecting metrics: {collected} samples so far. The model trains "
+                f"once {sampler.min_train_samples} samples are available."
+            )
+            return
+
+        import plotly.express as px
+
+        timestamps, values, scores = buffer.latest(240)
+        times = pd.to_datetime(timestamps, unit="s")
+        st.metric("Latest anomaly score", f"{scores[-1]:.3f}" if not np.isnan(scores[-1]) else "n/a")
+        st.plotly_chart(
+            px.line(x=times, y=scores, labels={"x": "Time", "y": "Anomaly score (< 0 is anomalous)"}),
+            use_container_width=True,
+        )
+
+        anomalies = scores < 0
+        st.write("Anomaly Detection Results:", f"{int(anomalies.sum())} anomalous samples in the window")
+        if anomalies.any():
+            st.dataframe(pd.DataFrame(values[anomalies], index=times[anomalies], columns=buffer.feature_names))
+        st.caption(f"Latest sample ({times[-1]}):")
+        st.dataframe(pd.Series(values[-1], index=buffer.feature_names, name="value"))
 
 if __name__ == "__main__":
     init_session_state()
     
-    if not st.session_state.oracle.conn:
+    if not st.session_state.oracle.is_connected():
         connection_form()
     else:
+        show_pool_stats()
+        show_cache_stats()
+        show_llm_stats()
+        show_catalog_controls()
+        show_parse_stats()
         main_interface()
+        show_timings()
         if st.button("Disconnect"):
+            for job in st.session_state.query_jobs.running():
+                job.cancel()
             st.session_state.oracle.close()
+            st.experimental_rerun()
+
+        # Poll running jobs so progress and results appear without a click
+        if st.session_state.query_jobs.running():
+            time.sleep(float(os.getenv("QUERY_JOB_POLL_SECONDS", "0.5")))
             st.experimental_rerun()
\ No newline at end of file
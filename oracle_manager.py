@@ -1,28 +1,277 @@
 import cx_Oracle
-from typing import Optional, List, Dict
+import hashlib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Iterator, Any, Callable
 import pandas as pd
+from query_cache import QueryCache
+from schema_catalog import SchemaCatalog, get_catalog, extract_table_names
+from bind_variables import rewrite_literals
+from deferred_values import deferring_converter
+import telemetry
+
+# Session pools are shared by every OracleManager in the process, so all
+# Streamlit sessions logging in with the same credentials reuse one pool.
+_POOLS: Dict[tuple, "cx_Oracle.SessionPool"] = {}
+_POOL_STATS: Dict[tuple, Dict[str, float]] = {}
+_POOLS_LOCK = threading.Lock()
+
+_BIND_TYPES = {
+    "CHAR": cx_Oracle.DB_TYPE_CHAR,
+    "TIMESTAMP": cx_Oracle.DB_TYPE_TIMESTAMP,
+}
+
+
+def _typed_binds(cursor, binds: Optional[Any], input_types: Dict[str, str]):
+    """Wrap binds that need an explicit Oracle type in cursor variables."""
+    if not input_types:
+        return binds
+    typed = dict(binds)
+    for name, type_name in input_types.items():
+        value = typed[name]
+        size = max(len(value), 1) if isinstance(value, str) else 0
+        var = cursor.var(_BIND_TYPES[type_name], size) if size else cursor.var(_BIND_TYPES[type_name])
+        var.setvalue(0, value)
+        typed[name] = var
+    return typed
+
+
+def _make_output_handler(lob_inline_limit: int):
+    """
+    Build a cursor output type handler that fetches LOBs inline as str/bytes
+    in the same round trip as their row; values above lob_inline_limit are
+    wrapped as DeferredValue handles.
+    """
+    def handler(cursor, name, default_type, size, precision, scale):
+        if default_type in (cx_Oracle.DB_TYPE_CLOB, cx_Oracle.DB_TYPE_NCLOB):
+            return cursor.var(cx_Oracle.DB_TYPE_LONG, arraysize=cursor.arraysize,
+                              outconverter=deferring_converter(lob_inline_limit))
+        if default_type == cx_Oracle.DB_TYPE_BLOB:
+            return cursor.var(cx_Oracle.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize,
+                              outconverter=deferring_converter(lob_inline_limit))
+        return None
+    return handler
+
+
+class QueryStream:
+    """
+    Iterates over a query result as DataFrame chunks read with fetchmany.
+    Stops once the row or byte budget is exhausted and sets `truncated`
+    when rows were left unread.
+    """
+
+    def __init__(self, manager: "OracleManager", sql: str, batch_size: int,
+                 max_rows: Optional[int], max_bytes: Optional[int],
+                 binds: Optional[Any] = None, cache_key: Optional[str] = None,
+                 input_types: Optional[Dict[str, str]] = None,
+                 call_timeout_ms: int = 0,
+                 lob_inline_limit: Optional[int] = None):
+        self.manager = manager
+        self.sql = sql
+        self.lob_inline_limit = lob_inline_limit
+        self.binds = binds
+        self.input_types = input_types or {}
+        self.cache_key = cache_key
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.columns: List[str] = []
+        self.rows_fetched = 0
+        self.bytes_fetched = 0
+        self.truncated = False
+        self.done = False
+        self.from_cache = False
+        # Per round-trip limit enforced by the driver; 0 means no limit
+        self.call_timeout_ms = call_timeout_ms
+        self.connection = None
+
+    def cancel(self):
+        """Interrupt the statement currently running on this stream's connection."""
+        conn = self.connection
+        if conn is not None:
+            conn.cancel()
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        cache = self.manager.result_cache
+        if cache is not None and self.cache_key is not None:
+            with telemetry.span("result_cache.lookup") as span:
+                cached = cache.get(self.cache_key)
+                span.attrs["hit"] = cached is not None
+            if cached is not None:
+                self.from_cache = True
+                self.columns = list(cached.columns)
+                self.rows_fetched = len(cached)
+                self.done = True
+                yield cached
+                return
+
+        chunks = []
+        for chunk in self._fetch():
+            if self.cache_key is not None and cache is not None:
+                chunks.append(chunk)
+            yield chunk
+
+        # Only complete results are cached, never budget-truncated ones
+        if chunks and not self.truncated and self.bytes_fetched <= cache.max_bytes:
+            df = pd.concat(chunks, ignore_index=True)
+            df.attrs["truncated"] = False
+            cache.put(self.cache_key, df, self.manager.username)
+
+    def _fetch(self) -> Iterator[pd.DataFrame]:
+        try:
+            # A session of its own, so the call timeout and cancel never reach other work
+            with self.manager._owned_session() as conn, conn.cursor() as cursor:
+                self.connection = conn
+                previous_timeout = conn.call_timeout
+                conn.call_timeout = self.call_timeout_ms
+                cursor.arraysize = self.batch_size
+                # One extra prefetched row avoids a round trip to detect the end
+                cursor.prefetchrows = self.batch_size + 1
+                if self.lob_inline_limit is not None:
+                    cursor.outputtypehandler = _make_output_handler(self.lob_inline_limit)
+                try:
+                    with telemetry.span("sql.execute"):
+                        cursor.execute(self.sql, _typed_binds(cursor, self.binds, self.input_types))
+                    yield from self._read(cursor)
+                finally:
+                    conn.call_timeout = previous_timeout
+                    self.connection = None
+
+        except cx_Oracle.DatabaseError as e:
+            error = e.args[0]
+            raise Exception(f"Oracle Execution Error: ORA-{error.code}: {error.message}")
+        except Exception as e:
+            raise Exception(f"General Execution Error: {str(e)}")
+        finally:
+            self.done = True
+
+    def _read(self, cursor) -> Iterator[pd.DataFrame]:
+        if not cursor.description:
+            return
+        self.columns = [col[0] for col in cursor.description]
+
+        # Time spent in the driver and building frames, excluding the consumer's
+        fetch_seconds = 0.0
+        build_seconds = 0.0
+        fetches = 0
+        try:
+            while True:
+                size = self.batch_size
+                if self.max_rows is not None:
+                    size = min(size, self.max_rows - self.rows_fetched)
+                if size <= 0 or self._over_byte_budget():
+                    self.truncated = cursor.fetchone() is not None
+                    return
+
+                start = time.perf_counter()
+                rows = cursor.fetchmany(size)
+                fetch_seconds += time.perf_counter() - start
+                fetches += 1
+                if not rows:
+                    return
+
+                start = time.perf_counter()
+                chunk = pd.DataFrame(rows, columns=self.columns)
+                self.rows_fetched += len(chunk)
+                self.bytes_fetched += int(chunk.memory_usage(deep=True).sum())
+                build_seconds += time.perf_counter() - start
+                yield chunk
+        finally:
+            telemetry.record("sql.fetch", fetch_seconds, rows=self.rows_fetched, fetches=fetches,
+                             truncated=self.truncated)
+            telemetry.record("frame.build", build_seconds, bytes=self.bytes_fetched)
+
+    def _over_byte_budget(self) -> bool:
+        return self.max_bytes is not None and self.bytes_fetched >= self.max_bytes
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Drain the stream into a single DataFrame, flagging truncation in attrs."""
+        chunks = list(self)
+        if chunks:
+            df = pd.concat(chunks, ignore_index=True)
+        elif self.columns:
+            df = pd.DataFrame(columns=self.columns)
+        else:
+            # Return empty DataFrame if no rows are returned
+            df = pd.DataFrame()
+        df.attrs["truncated"] = self.truncated
+        return df
+
 
 class OracleManager:
-    def __init__(self, dsn: str):
+    def __init__(self, dsn: str, use_pool: bool = False, pool_min: int = 1,
+                 pool_max: int = 4, pool_increment: int = 1,
+                 pool_wait_timeout: float = 10.0,
+                 stmt_cache_size: int = 20, pool_user: Optional[str] = None,
+                 pool_password: Optional[str] = None, proxy_auth: bool = False,
+                 fetch_batch_size: int = 1000, max_rows: Optional[int] = 100000,
+                 max_bytes: Optional[int] = 256 * 1024 * 1024,
+                 result_cache: Optional[QueryCache] = None,
+                 catalog_dir: Optional[str] = None,
+                 catalog_owners: Optional[List[str]] = None,
+                 auto_bind: bool = False,
+                 lob_inline_limit: Optional[int] = 64 * 1024):
         self.dsn = dsn
         self.conn = None
+        self.pool = None
+        self.use_pool = use_pool
+        self.pool_min = pool_min
+        self.pool_max = pool_max
+        self.pool_increment = pool_increment
+        # Seconds an acquire waits for a free pooled session before failing
+        self.pool_wait_timeout = pool_wait_timeout
+        self.stmt_cache_size = stmt_cache_size
+        # When a pool account is configured the pool is heterogeneous and
+        # each user session is acquired through proxy or per-user auth.
+        self.pool_user = pool_user
+        self.pool_password = pool_password
+        self.proxy_auth = proxy_auth
+        self.fetch_batch_size = fetch_batch_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.result_cache = result_cache
+        # Schema catalog snapshots live under catalog_dir; None disables the catalog
+        self.catalog_dir = catalog_dir
+        self.catalog_owners = catalog_owners or []
+        self.catalog: Optional[SchemaCatalog] = None
+        # Rewrite literals in ad-hoc queries into binds so cursors are shared
+        self.auto_bind = auto_bind
+        self.bind_stats = {"statements": 0, "rewritten": 0, "literals_bound": 0}
+        # LOBs are fetched inline; larger values become DeferredValue handles.
+        # None keeps cx_Oracle's default of one locator round trip per cell.
+        self.lob_inline_limit = lob_inline_limit
+        self.username = None
+        # Opens further sessions for this user: per-user acquires from a
+        # heterogeneous pool, or private job connections in dedicated mode
+        self._session_password = None
+        self._pool_key = None
+        # Dedicated mode: idle private connections kept for reuse by later jobs
+        self._idle_sessions: List["cx_Oracle.Connection"] = []
+        self._sessions_lock = threading.Lock()
+
+    def _make_dsn(self) -> str:
+        # Parse DSN components
+        host, port_service = self.dsn.split(":", 1)
+        port, service_name = port_service.split("/", 1)
+        return cx_Oracle.makedsn(host, int(port), service_name=service_name)
 
     def connect(self, username: str, password: str) -> bool:
-        """Establish connection to Oracle database."""
+        """Establish connection (or session pool) to Oracle database."""
         try:
-            # Parse DSN components
-            host, port_service = self.dsn.split(":", 1)
-            port, service_name = port_service.split("/", 1)
+            if self.use_pool:
+                return self._connect_pool(username, password)
 
             self.conn = cx_Oracle.connect(
                 user=username,
                 password=password,
-                dsn=cx_Oracle.makedsn(
-                    host,
-                    int(port),
-                    service_name=service_name
-                )
+                dsn=self._make_dsn(),
+                threaded=True
             )
+            self.conn.stmtcachesize = self.stmt_cache_size
+            self.username = username.upper()
+            self._session_password = password
             print("Connection successful.")
             return True
 
@@ -37,45 +286,269 @@ class OracleManager:
             print(f"General Connection Error: {str(e)}")
             return False
 
-    def execute_query(self, sql: str) -> pd.DataFrame:
+    def _connect_pool(self, username: str, password: str) -> bool:
+        """Attach to a shared SessionPool and verify the user can acquire from it."""
+        heterogeneous = self.pool_user is not None
+        if heterogeneous and self.proxy_auth:
+            # Proxy acquires never see the end user's password, so check it once here
+            cx_Oracle.connect(user=username, password=password, dsn=self._make_dsn()).close()
+
+        pool_owner = self.pool_user if heterogeneous else username
+        pool_secret = self.pool_password if heterogeneous else password
+        key = (
+            self.dsn,
+            pool_owner.upper(),
+            hashlib.sha256((pool_secret or "").encode()).hexdigest(),
+        )
+
+        with _POOLS_LOCK:
+            pool = _POOLS.get(key)
+            if pool is None:
+                pool = cx_Oracle.SessionPool(
+                    user=pool_owner,
+                    password=pool_secret,
+                    dsn=self._make_dsn(),
+                    min=self.pool_min,
+                    max=self.pool_max,
+                    increment=self.pool_increment,
+                    homogeneous=not heterogeneous,
+                    threaded=True,
+                    getmode=cx_Oracle.SPOOL_ATTRVAL_TIMEDWAIT,
+                    wait_timeout=int(self.pool_wait_timeout * 1000),
+                    encoding="UTF-8",
+                )
+                pool.stmtcachesize = self.stmt_cache_size
+                _POOLS[key] = pool
+                _POOL_STATS[key] = {"acquires": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+        self.pool = pool
+        self._pool_key = key
+        self.username = username.upper()
+        # Heterogeneous pools authenticate every acquire with the end user's
+        # credentials; with proxy auth the pool user connects on their behalf.
+        if heterogeneous and not self.proxy_auth:
+            self._session_password = password
+        else:
+            self._session_password = None
+
+        # Acquire once so bad credentials are reported at connect time
+        try:
+            with self._acquire():
+                pass
+        except Exception:
+            self.pool = None
+            self._pool_key = None
+            self.username = None
+            self._session_password = None
+            raise
+        print("Connection pool ready.")
+        return True
+
+    def refresh_catalog(self) -> bool:
+        """Load or incrementally refresh the schema catalog for the configured owners."""
+        if self.catalog_dir is None or self.username is None:
+            return False
+        try:
+            if self.catalog is None:
+                self.catalog = get_catalog(self.dsn, self.username, self.catalog_dir)
+            with self._acquire() as conn:
+                self.catalog.refresh(conn, [self.username] + self.catalog_owners)
+            return True
+        except cx_Oracle.DatabaseError as e:
+            error = e.args[0]
+            print(f"Schema Catalog Error: ORA-{error.code}: {error.message}")
+            return False
+        except OSError as e:
+            print(f"Schema Catalog Snapshot Error: {str(e)}")
+            return False
+
+    def schema_context(self, question: str, max_tables: int = 5) -> Optional[str]:
+        """Definitions of the catalog tables most relevant to a natural-language question."""
+        if self.catalog is None:
+            return None
+        return self.catalog.describe(self.catalog.relevant_tables(question, max_tables)) or None
+
+    def is_connected(self) -> bool:
+        """Return True when a dedicated connection or a session pool is attached."""
+        return self.conn is not None or self.pool is not None
+
+    @contextmanager
+    def _acquire(self):
+        """Yield a connection for one call, releasing pooled sessions afterwards."""
+        if self.pool is None:
+            if not self.conn:
+                raise Exception("No active connection to the database.")
+            yield self.conn
+            return
+
+        start = time.perf_counter()
+        try:
+            if self.pool_user is not None:
+                conn = self.pool.acquire(user=self.username, password=self._session_password)
+            else:
+                conn = self.pool.acquire()
+        except cx_Oracle.DatabaseError as e:
+            if e.args[0].code != 24457:
+                raise
+            # ORA-24457: every pooled session stayed busy for the whole wait
+            raise Exception(
+                f"No pooled session became free within {self.pool_wait_timeout:g} s "
+                f"({self.pool.max} sessions busy); try again shortly."
+            )
+        waited = time.perf_counter() - start
+
+        stats = _POOL_STATS[self._pool_key]
+        with _POOLS_LOCK:
+            stats["acquires"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+
+        try:
+            yield conn
+        finally:
+            self.pool.release(conn)
+
+    @contextmanager
+    def _owned_session(self):
+        """
+        Yield a session nothing else uses until it is released: a pooled
+        session, or in dedicated mode a private connection that is kept
+        (up to pool_max idle) for later calls instead of the shared one.
+        """
+        if self.pool is not None:
+            with self._acquire() as conn:
+                yield conn
+            return
+        if not self.conn:
+            raise Exception("No active connection to the database.")
+
+        with self._sessions_lock:
+            conn = self._idle_sessions.pop() if self._idle_sessions else None
+        if conn is None:
+            conn = cx_Oracle.connect(
+                user=self.username,
+                password=self._session_password,
+                dsn=self._make_dsn(),
+                threaded=True
+            )
+            conn.stmtcachesize = self.stmt_cache_size
+
+        reusable = False
+        try:
+            yield conn
+            reusable = True
+        finally:
+            with self._sessions_lock:
+                keep = reusable and self.conn is not None and len(self._idle_sessions) < self.pool_max
+                if keep:
+                    self._idle_sessions.append(conn)
+            if not keep:
+                # Sessions that saw an error (or outlived the manager) are not reused
+                try:
+                    conn.close()
+                except cx_Oracle.DatabaseError:
+                    pass
+
+    def pool_stats(self) -> Optional[Dict]:
+        """Report pool sizing statistics, or None when not running pooled."""
+        if self.pool is None:
+            return None
+        stats = _POOL_STATS[self._pool_key]
+        acquires = stats["acquires"]
+        return {
+            "busy": self.pool.busy,
+            "open": self.pool.opened,
+            "min": self.pool.min,
+            "max": self.pool.max,
+            "increment": self.pool.increment,
+            "acquires": acquires,
+            "avg_wait_ms": (stats["wait_total"] / acquires * 1000) if acquires else 0.0,
+            "max_wait_ms": stats["wait_max"] * 1000,
+        }
+
+    def execute_query(self, sql: str, binds: Optional[Any] = None,
+                      use_cache: bool = True) -> pd.DataFrame:
         """
         Execute SQL query and return results as a DataFrame.
+        The result is bounded by the row and byte budgets; df.attrs["truncated"]
+        is set when rows were left unread.
         Raises exceptions for errors to be handled by the application.
         """
-        try:
-            if not self.conn:
-                raise Exception("No active connection to the database.")
+        return self.stream_query(sql, binds=binds, use_cache=use_cache).to_dataframe()
 
-            # Strip trailing semicolon
-            sql = sql.rstrip(";")
+    def stream_query(self, sql: str, binds: Optional[Any] = None,
+                     batch_size: Optional[int] = None,
+                     max_rows: Optional[int] = None,
+                     max_bytes: Optional[int] = None,
+                     use_cache: bool = True,
+                     call_timeout_ms: int = 0) -> QueryStream:
+        """
+        Execute SQL query lazily, yielding DataFrame chunks of batch_size rows.
+        Budgets default to the manager's configured limits. Complete results
+        are served from and stored in the shared result cache when enabled.
+        """
+        if self.auto_bind:
+            self.bind_stats["statements"] += 1
+        with telemetry.span("sql.auto_bind"):
+            sql, binds, input_types, literals = self._prepare(sql, binds)
+        if literals:
+            self.bind_stats["rewritten"] += 1
+            self.bind_stats["literals_bound"] += literals
+        max_rows = max_rows if max_rows is not None else self.max_rows
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
 
-            with self.conn.cursor() as cursor:
-                cursor.execute(sql)
+        cache_key = None
+        if use_cache and self.result_cache is not None:
+            cache_key = self.result_cache.make_key(
+                sql, self.username, [binds, max_rows, max_bytes]
+            )
 
-                if cursor.description:
-                    columns = [col[0] for col in cursor.description]
-                    return pd.DataFrame(cursor.fetchall(), columns=columns)
+        return QueryStream(
+            self,
+            sql,
+            batch_size or self.fetch_batch_size,
+            max_rows,
+            max_bytes,
+            binds=binds,
+            cache_key=cache_key,
+            input_types=input_types,
+            call_timeout_ms=call_timeout_ms,
+            lob_inline_limit=self.lob_inline_limit,
+        )
 
-                # Return empty DataFrame if no rows are returned
-                return pd.DataFrame()
+    def _prepare(self, sql: str, binds: Optional[Any]):
+        """
+        Statement, binds, bind input types and number of literals bound, as
+        sent to the database: with auto_bind on, literals become binds next
+        to the caller's named binds.
+        """
+        # Strip trailing semicolon
+        sql = sql.rstrip(";")
+        if not self.auto_bind or (binds and not isinstance(binds, dict)):
+            return sql, binds, None, 0
+        bound = rewrite_literals(sql, allow_binds=True)
+        if not bound.binds:
+            return sql, binds, None, 0
+        return bound.sql, {**(binds or {}), **bound.binds}, bound.input_types, len(bound.binds)
 
-        except cx_Oracle.DatabaseError as e:
-            error = e.args[0]
-            raise Exception(f"Oracle Execution Error: ORA-{error.code}: {error.message}")
-        except Exception as e:
-            raise Exception(f"General Execution Error: {str(e)}")
+    def invalidate_cache(self, all_schemas: bool = False):
+        """Drop cached results for the connected schema (or for every schema)."""
+        if self.result_cache is None:
+            return
+        self.result_cache.invalidate(None if all_schemas else self.username)
 
 
-    def get_performance_data(self) -> List[Dict]:
-        """Retrieve slow-performing queries from V$SQL."""
+    def get_performance_data(self, top_n: int = 20) -> List[Dict]:
+        """Retrieve the top slow-performing statements from V$SQLSTATS."""
         try:
-            with self.conn.cursor() as cursor:
+            with self._acquire() as conn, conn.cursor() as cursor:
                 cursor.execute("""
                     SELECT sql_id, sql_text, elapsed_time, executions
-                    FROM V$SQL 
+                    FROM V$SQLSTATS
                     WHERE elapsed_time > 1000000
                     ORDER BY elapsed_time DESC
-                """)
+                    FETCH FIRST :top_n ROWS ONLY
+                """, top_n=top_n)
                 return [
                     dict(zip(
                         ["sql_id", "sql_text", "elapsed_time", "executions"],
@@ -87,25 +560,260 @@ class OracleManager:
             error = e.args[0]
             print(f"Performance Data Error: ORA-{error.code}: {error.message}")
             return []
-        
+
+    def get_sql_snapshot(self, active_within: int = 3600, max_statements: int = 5000) -> List[Dict]:
+        """
+        Cumulative statistics, without SQL text, for the statements active in
+        the last active_within seconds (at most max_statements, most recently
+        active first). Callers rank by the change between snapshots, since a
+        lifetime top-N misses statements that only became hot recently.
+        """
+        columns = ["sql_id", "plan_hash_value", "elapsed_time", "cpu_time",
+                   "buffer_gets", "executions"]
+        with self._acquire() as conn, conn.cursor() as cursor:
+            cursor.arraysize = min(max_statements, 1000)
+            cursor.execute("""
+                SELECT sql_id, plan_hash_value, elapsed_time, cpu_time,
+                       buffer_gets, executions
+                FROM V$SQLSTATS
+                WHERE last_active_time >= SYSDATE - :active_within / 86400
+                ORDER BY last_active_time DESC
+                FETCH FIRST :max_statements ROWS ONLY
+            """, active_within=active_within, max_statements=max_statements)
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_sql_text(self, sql_id: str) -> Optional[str]:
+        """Fetch the full text of one statement, for statements shown in the UI."""
+        with self._acquire() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT sql_fulltext
+                FROM V$SQLSTATS
+                WHERE sql_id = :sql_id
+                FETCH FIRST 1 ROWS ONLY
+            """, sql_id=sql_id)
+            row = cursor.fetchone()
+            return row[0].read() if row else None
+
+    def get_parsing_schema(self, sql_id: str) -> Optional[str]:
+        """Schema a cached statement was parsed in, which its unqualified names resolve against."""
+        with self._acquire() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT parsing_schema_name
+                FROM V$SQL
+                WHERE sql_id = :sql_id AND ROWNUM = 1
+            """, sql_id=sql_id)
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def explain_plan(self, sql: str, binds: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """
+        Optimizer plan of a statement from EXPLAIN PLAN, one dict per step
+        with cost, cardinality and, for tables and indexes, their block and
+        row statistics. The statement is explained as stream_query would run
+        it (literals bound when auto_bind is on), on a session of its own so
+        the rollback of the PLAN_TABLE rows touches nothing else.
+        """
+        sql = self._prepare(sql, binds)[0]
+        statement_id = f"NL2SQL_{uuid.uuid4().hex[:20]}"
+        try:
+            with self._owned_session() as conn, conn.cursor() as cursor:
+                try:
+                    cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {sql}")
+                    cursor.execute("""
+                        SELECT p.id, p.operation, p.options, p.object_owner, p.object_name,
+                               p.object_type, p.cost, p.cardinality, p.bytes,
+                               COALESCE(t.blocks, i.leaf_blocks) AS blocks,
+                               COALESCE(t.num_rows, i.num_rows) AS num_rows
+                        FROM plan_table p
+                        LEFT JOIN all_tables t
+                          ON t.owner = p.object_owner AND t.table_name = p.object_name
+                        LEFT JOIN all_indexes i
+                          ON i.owner = p.object_owner AND i.index_name = p.object_name
+                        WHERE p.statement_id = :statement_id
+                        ORDER BY p.id
+                    """, statement_id=statement_id)
+                    columns = [col[0].lower() for col in cursor.description]
+                    return [dict(zip(columns, row)) for row in cursor]
+                finally:
+                    conn.rollback()
+        except cx_Oracle.DatabaseError as e:
+            error = e.args[0]
+            raise Exception(f"Oracle Explain Error: ORA-{error.code}: {error.message}")
+
+    def display_cursor(self, sql_id: str, max_lines: int = 200) -> str:
+        """
+        Cached plan of a statement with its runtime statistics from
+        DBMS_XPLAN.DISPLAY_CURSOR (A-Rows and buffers appear when row source
+        statistics were collected for the last execution).
+        """
+        try:
+            with self._acquire() as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT plan_table_output
+                    FROM TABLE(DBMS_XPLAN.DISPLAY_CURSOR(:sql_id, NULL, 'ALLSTATS LAST +COST'))
+                """, sql_id=sql_id)
+                lines = [row[0] or "" for row in cursor.fetchmany(max_lines)]
+        except cx_Oracle.DatabaseError as e:
+            error = e.args[0]
+            raise Exception(f"Oracle Plan Error: ORA-{error.code}: {error.message}")
+        return "\n".join(lines)
+
+    def run_measured(self, sql: str, consume: Callable[[List[tuple]], None],
+                     timeout_ms: int = 0, max_rows: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Execute a query once and read all its rows into consume(batch) without
+        building a DataFrame. Returns the elapsed time, the buffer gets for
+        the run (a V$MYSTAT 'session logical reads' delta on a session used by
+        nothing else meanwhile), the rows read and whether max_rows cut the
+        result short. timeout_ms bounds each database call.
+        """
+        stat_sql = """
+            SELECT s.value
+            FROM V$MYSTAT s
+            JOIN V$STATNAME n ON n.statistic# = s.statistic#
+            WHERE n.name = 'session logical reads'
+        """
+        try:
+            with self._owned_session() as conn, conn.cursor() as cursor:
+                previous_timeout = conn.call_timeout
+                conn.call_timeout = timeout_ms
+                try:
+                    cursor.execute(stat_sql)
+                    gets_before = cursor.fetchone()[0]
+                    cursor.arraysize = self.fetch_batch_size
+                    cursor.outputtypehandler = _make_output_handler(False, self.lob_inline_limit)
+                    start = time.perf_counter()
+                    cursor.execute(sql.rstrip().rstrip(";"))
+                    rows = 0
+                    truncated = False
+                    while True:
+                        batch = cursor.fetchmany()
+                        if not batch:
+                            break
+                        if max_rows is not None and rows + len(batch) > max_rows:
+                            batch = batch[: max_rows - rows]
+                            truncated = True
+                        rows += len(batch)
+                        consume(batch)
+                        if truncated:
+                            break
+                    elapsed = time.perf_counter() - start
+                    cursor.execute(stat_sql)
+                    gets_after = cursor.fetchone()[0]
+                finally:
+                    conn.call_timeout = previous_timeout
+        except cx_Oracle.DatabaseError as e:
+            error = e.args[0]
+            raise Exception(f"Oracle Execution Error: ORA-{error.code}: {error.message}")
+        return {
+            "elapsed": elapsed,
+            # The two statistic queries add a small constant to every run
+            "buffer_gets": gets_after - gets_before,
+            "rows": rows,
+            "truncated": truncated,
+        }
+
+    def get_parse_stats(self) -> Optional[Dict[str, float]]:
+        """
+        Parse and cursor-cache counters summed over every session of the
+        connected user (pooled and per-job sessions alike), with the session
+        count under "sessions". Other clients using the same account are
+        included.
+        """
+        try:
+            with self._acquire() as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT n.name, SUM(st.value), COUNT(DISTINCT st.sid)
+                    FROM V$SESSION s
+                    JOIN V$SESSTAT st ON st.sid = s.sid
+                    JOIN V$STATNAME n ON n.statistic# = st.statistic#
+                    WHERE s.username = :username
+                      AND n.name IN (
+                        'parse count (total)', 'parse count (hard)',
+                        'session cursor cache hits', 'execute count'
+                      )
+                    GROUP BY n.name
+                """, username=self.username)
+                rows = cursor.fetchall()
+        except cx_Oracle.DatabaseError as e:
+            error = e.args[0]
+            print(f"Parse Stats Error: ORA-{error.code}: {error.message}")
+            return None
+        stats = {name: float(value) for name, value, _ in rows}
+        stats["sessions"] = float(max((sessions for _, _, sessions in rows), default=0))
+        # Executions that reused an open cursor (driver statement cache or a held cursor)
+        stats["executes without parse"] = max(
+            stats.get("execute count", 0) - stats.get("parse count (total)", 0), 0
+        )
+        return stats
+
+    def get_system_metrics(self) -> Dict[str, float]:
+        """
+        Sample instance-wide health metrics. Keys are prefixed by source:
+        "metric:" values are V$SYSMETRIC rates, while "stat:" and "wait:"
+        values are cumulative V$SYSSTAT counters and V$SYSTEM_WAIT_CLASS
+        wait times (centiseconds) that callers turn into deltas.
+        """
+        metrics: Dict[str, float] = {}
+        with self._acquire() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT metric_name, value
+                FROM V$SYSMETRIC
+                WHERE group_id = 2
+                  AND metric_name IN (
+                      'Host CPU Utilization (%)', 'Average Active Sessions',
+                      'Database CPU Time Ratio', 'SQL Service Response Time',
+                      'Executions Per Sec', 'User Transaction Per Sec',
+                      'Logical Reads Per Sec', 'Physical Reads Per Sec',
+                      'Hard Parse Count Per Sec'
+                  )
+            """)
+            for name, value in cursor:
+                metrics[f"metric:{name}"] = float(value)
+
+            cursor.execute("""
+                SELECT name, value
+                FROM V$SYSSTAT
+                WHERE name IN (
+                    'user commits', 'execute count', 'parse count (hard)',
+                    'session logical reads', 'physical reads', 'redo size'
+                )
+            """)
+            for name, value in cursor:
+                metrics[f"stat:{name}"] = float(value)
+
+            cursor.execute("""
+                SELECT wait_class, time_waited
+                FROM V$SYSTEM_WAIT_CLASS
+                WHERE wait_class <> 'Idle'
+            """)
+            for name, value in cursor:
+                metrics[f"wait:{name}"] = float(value)
+        return metrics
 
     def get_table_metadata(self, sql: str) -> Optional[pd.DataFrame]:
         """
         Fetch and return metadata of the table involved in the SQL query.
+        Served from the schema catalog when loaded, otherwise from ALL_TAB_COLUMNS.
         """
         try:
-            # Extract table name from the SQL query (basic implementation)
-            table_name = sql.split("FROM")[1].split()[0]
-
-            # Query to fetch metadata
-            metadata_query = f"""
-                SELECT column_name, data_type, data_length
-                FROM all_tab_columns
-                WHERE table_name = UPPER('{table_name}')
-            """
-
-            with self.conn.cursor() as cursor:
-                cursor.execute(metadata_query)
+            tables = extract_table_names(sql, self.username)
+            if not tables:
+                return None
+            owner, table_name = tables[0]
+
+            if self.catalog is not None:
+                metadata = self.catalog.columns_frame(owner, table_name)
+                if metadata is not None:
+                    return metadata
+
+            with self._acquire() as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT column_name, data_type, data_length
+                    FROM all_tab_columns
+                    WHERE owner = :owner AND table_name = :table_name
+                    ORDER BY column_id
+                """, owner=owner, table_name=table_name)
                 columns = [col[0] for col in cursor.description]
                 return pd.DataFrame(cursor.fetchall(), columns=columns)
 
@@ -115,10 +823,31 @@ class OracleManager:
 
 
     def close(self):
-        """Close the database connection."""
+        """Close the database connection, or detach from the shared pool."""
         if self.conn:
             self.conn.close()
             self.conn = None
+        with self._sessions_lock:
+            idle, self._idle_sessions = self._idle_sessions, []
+        for conn in idle:
+            conn.close()
+        # The pool is shared with other sessions, so only drop our reference
+        self.pool = None
+        self._pool_key = None
+        self.username = None
+        self._session_password = None
+
+    def close_pool(self):
+        """Close the shared session pool this manager is attached to."""
+        key = self._pool_key
+        self.close()
+        if key is None:
+            return
+        with _POOLS_LOCK:
+            pool = _POOLS.pop(key, None)
+            _POOL_STATS.pop(key, None)
+        if pool is not None:
+            pool.close(force=True)
 
 
     def __enter__(self):
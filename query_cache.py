@@ -0,0 +1,134 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+import pandas as pd
+
+# Splits SQL into quoted literals/identifiers and the text between them
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"[^\"]*\")")
+
+
+def normalize_sql(sql: str) -> str:
+    """Normalize SQL text so formatting-only differences share a cache entry."""
+    parts = _QUOTED.split(sql.strip().rstrip(";"))
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            # Keep string literals and quoted identifiers exactly as written
+            normalized.append(part)
+        else:
+            normalized.append(" ".join(part.split()).upper())
+    return "".join(normalized).strip()
+
+
+class QueryCache:
+    """
+    Thread-safe result cache shared by every session in the process.
+    Entries expire after a TTL and the least recently used ones are evicted
+    once the total DataFrame memory usage exceeds the byte ceiling.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, ttl_seconds: float = 300,
+                 max_entries: int = 256):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(sql: str, schema: Optional[str], binds: Optional[Any] = None) -> str:
+        payload = json.dumps(
+            [normalize_sql(sql), (schema or "").upper(), binds],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Return a copy of the cached DataFrame, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.monotonic() - entry["stored_at"] > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            df = entry["df"]
+        # Copy outside the lock; callers must not mutate the shared frame
+        result = df.copy()
+        result.attrs = dict(df.attrs)
+        return result
+
+    def put(self, key: str, df: pd.DataFrame, schema: Optional[str] = None):
+        """Store a result, evicting LRU entries to stay within the budgets."""
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                "df": df,
+                "bytes": size,
+                "schema": (schema or "").upper(),
+                "stored_at": time.monotonic(),
+            }
+            self.total_bytes += size
+            while self._entries and (
+                self.total_bytes > self.max_bytes or len(self._entries) > self.max_entries
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, schema: Optional[str] = None):
+        """Drop every entry, or only the entries cached for one schema."""
+        with self._lock:
+            if schema is None:
+                self._entries.clear()
+                self.total_bytes = 0
+                return
+            schema = schema.upper()
+            for key in [k for k, e in self._entries.items() if e["schema"] == schema]:
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry["bytes"]
+
+
+_shared_cache: Optional[QueryCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache(**kwargs) -> QueryCache:
+    """Return the process-wide cache, creating it with kwargs on first use."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = QueryCache(**kwargs)
+        return _shared_cache
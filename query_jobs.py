@@ -0,0 +1,188 @@
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import pandas as pd
+import telemetry
+
+_job_ids = itertools.count(1)
+
+
+class QueryJob:
+    """State of one statement running on a worker thread."""
+
+    def __init__(self, sql: str, binds: Optional[Any], timeout: Optional[float],
+                 max_rows: Optional[int] = None, source_sql: Optional[str] = None,
+                 use_cache: bool = True):
+        self.id = next(_job_ids)
+        self.sql = sql
+        self.binds = binds
+        self.timeout = timeout
+        self.max_rows = max_rows
+        # Statement the user ran when sql is derived from it (e.g. its first page)
+        self.source_sql = source_sql or sql
+        # False when the caller caches the result itself (e.g. a pager's first page)
+        self.use_cache = use_cache
+        self.status = "queued"
+        self.rows_fetched = 0
+        self.first_chunk: Optional[pd.DataFrame] = None
+        self.result: Optional[pd.DataFrame] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = False
+        self.timed_out = False
+        self._stream = None
+        self._lock = threading.Lock()
+        # Per-stage timings of this job, shown in the request timing panel
+        self.trace = telemetry.Trace(f"Query #{self.id}")
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def running(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def cancel(self):
+        """Stop fetching and interrupt the in-flight database call."""
+        with self._lock:
+            self.cancel_requested = True
+            stream = self._stream
+        if stream is not None:
+            try:
+                stream.cancel()
+            except Exception as e:
+                print(f"Error cancelling job {self.id}: {str(e)}")
+
+    def _expire(self):
+        self.timed_out = True
+        self.cancel()
+
+
+class QueryJobRunner:
+    """
+    Runs one user's statements on worker threads with per-query timeouts
+    and cancellation, so a slow statement never blocks the Streamlit script
+    run. At most max_workers of the user's jobs run at once; later ones wait
+    their turn without holding up other users' sessions.
+    """
+
+    def __init__(self, max_jobs_kept: int = 20, max_workers: int = 4):
+        self.max_jobs_kept = max_jobs_kept
+        self.max_workers = max_workers
+        self._jobs: Dict[int, QueryJob] = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def submit(self, oracle, sql: str, binds: Optional[Any] = None,
+               timeout: Optional[float] = None, max_rows: Optional[int] = None,
+               source_sql: Optional[str] = None, use_cache: bool = True) -> QueryJob:
+        job = QueryJob(sql, binds, timeout, max_rows, source_sql, use_cache)
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [j for j in self._jobs.values() if not j.running]
+            for old in finished[:max(len(self._jobs) - self.max_jobs_kept, 0)]:
+                del self._jobs[old.id]
+        self._start(self._traced_run, job, oracle)
+        return job
+
+    def background(self, fn: Callable[[], Any], name: str = "background"):
+        """Run fn on a worker thread within this user's worker limit, e.g. a page prefetch."""
+        def run():
+            with self._slots:
+                try:
+                    fn()
+                except Exception as e:
+                    print(f"Error in {name}: {str(e)}")
+
+        self._start(run)
+
+    @staticmethod
+    def _start(target, *args):
+        # A thread per job: nothing queues behind another user's work, and idle
+        # sessions leave no threads behind
+        threading.Thread(target=target, args=args, name="query-job", daemon=True).start()
+
+    def get(self, job_id: int) -> Optional[QueryJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[QueryJob]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.id, reverse=True)
+
+    def running(self) -> List[QueryJob]:
+        return [j for j in self.jobs() if j.running]
+
+    def _traced_run(self, job: QueryJob, oracle):
+        with telemetry.use_trace(job.trace), telemetry.span("job.run") as span:
+            # Wait for one of this user's worker slots, giving up if cancelled meanwhile
+            while not self._slots.acquire(timeout=0.2):
+                if job.cancel_requested:
+                    break
+            else:
+                try:
+                    self._run(job, oracle)
+                finally:
+                    self._slots.release()
+            if job.cancel_requested and job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.monotonic()
+            span.attrs["status"] = job.status
+            if job.started_at is not None:
+                span.attrs["queued_ms"] = round((job.started_at - job.submitted_at) * 1000, 3)
+
+    def _run(self, job: QueryJob, oracle):
+        if job.cancel_requested:
+            job.status = "cancelled"
+            return
+        job.status = "running"
+        job.started_at = time.monotonic()
+
+        call_timeout_ms = int(job.timeout * 1000) if job.timeout else 0
+        stream = oracle.stream_query(job.sql, binds=job.binds, max_rows=job.max_rows,
+                                     use_cache=job.use_cache, call_timeout_ms=call_timeout_ms)
+        with job._lock:
+            job._stream = stream
+        # The driver call_timeout bounds each round trip; the timer bounds the whole job
+        timer = threading.Timer(job.timeout, job._expire) if job.timeout else None
+        if timer is not None:
+            timer.daemon = True
+            timer.start()
+
+        chunks = []
+        try:
+            for chunk in stream:
+                if job.cancel_requested:
+                    break
+                chunks.append(chunk)
+                job.rows_fetched = stream.rows_fetched
+                if job.first_chunk is None:
+                    job.first_chunk = chunk
+
+            if job.cancel_requested:
+                job.status = "timeout" if job.timed_out else "cancelled"
+            else:
+                if chunks:
+                    df = pd.concat(chunks, ignore_index=True)
+                else:
+                    df = pd.DataFrame(columns=stream.columns)
+                df.attrs["truncated"] = stream.truncated
+                job.result = df
+                job.status = "done"
+        except Exception as e:
+            if job.cancel_requested:
+                job.status = "timeout" if job.timed_out else "cancelled"
+            else:
+                job.status = "failed"
+            job.error = str(e)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            with job._lock:
+                job._stream = None
+            job.finished_at = time.monotonic()
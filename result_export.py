@@ -0,0 +1,47 @@
+import io
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from deferred_values import deferred_columns, resolve
+
+
+def to_arrow_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Convert a result to Arrow. Numeric columns without nulls are wrapped
+    without copying; object columns Arrow cannot type are exported as strings.
+    Deferred LOB values are exported in full.
+    """
+    deferred = deferred_columns(df)
+    if deferred:
+        df = df.copy(deep=False)
+        for column in deferred:
+            df[column] = df[column].map(resolve)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        converted = df.copy(deep=False)
+        for column in converted.columns:
+            if converted[column].dtype == object:
+                try:
+                    pa.array(converted[column], from_pandas=True)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                    converted[column] = converted[column].map(
+                        lambda v: None if v is None else str(v)
+                    )
+        return pa.Table.from_pandas(converted, preserve_index=False)
+
+
+def to_arrow_ipc(df: pd.DataFrame) -> bytes:
+    """Serialize a result as an Arrow IPC stream."""
+    table = to_arrow_table(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_parquet(df: pd.DataFrame, compression: str = "zstd") -> bytes:
+    """Serialize a result as a Parquet file."""
+    buffer = io.BytesIO()
+    pq.write_table(to_arrow_table(df), buffer, compression=compression)
+    return buffer.getvalue()
@@ -0,0 +1,403 @@
+import datetime
+import decimal
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+import pandas as pd
+from deferred_values import deferred_columns
+from sql_tokenizer import Token, tokenize, significant, keyword, SQLTokenizeError
+
+_SET_OPERATORS = {"UNION", "INTERSECT", "MINUS", "EXCEPT"}
+# Errors from wrapping the statement for keyset paging: column ambiguously
+# defined (duplicate names in SELECT *) or invalid identifier
+_KEYSET_ERRORS = re.compile(r"\bORA-0*(?:918|904)\b")
+# Key values of these types compare exactly when bound back into the query
+_EXACT_TYPES = (int, str, decimal.Decimal, datetime.date)
+
+
+class OrderItem(NamedTuple):
+    # Dotted name parts as written (uppercased unless quoted), or a select-list position
+    parts: Tuple[str, ...]
+    position: Optional[int]
+    descending: bool
+    nulls_first: bool
+
+
+class OrderKey(NamedTuple):
+    column: str
+    descending: bool
+    nulls_first: bool
+
+
+class PageQuery(NamedTuple):
+    sql: str
+    binds: Dict[str, Any]
+    # Row budget to fetch; scan pages read up to the end of the page
+    max_rows: Optional[int]
+    # Rows to drop from the front of the fetched result
+    skip: int = 0
+
+
+class ResultPager:
+    """
+    Cursor over a query result that loads one page at a time from the
+    database. Results ordered by plain columns are paged by keyset (seeking
+    past the last row of the previous page); other queries use OFFSET/FETCH,
+    and statements that already limit their rows are re-read up to the page.
+    Only the statement and page boundaries are kept here; page frames live
+    in the manager's shared result cache.
+    """
+
+    def __init__(self, sql: str, page_size: int = 100):
+        self.sql = sql.strip().rstrip(";")
+        self.page_size = page_size
+        self.page = 0
+        # Index of the last page once a short page has been seen
+        self.last_page: Optional[int] = None
+        self.columns: List[str] = []
+        self.keys: Optional[List[OrderKey]] = None
+        # page -> (key of its last row, rows of the previous pages sharing that key)
+        self._boundaries: Dict[int, Optional[Tuple[tuple, int]]] = {}
+        # page -> columns holding DeferredValue handles, found once per page
+        self.deferred: Dict[int, List[str]] = {}
+        # Why keyset paging was given up for OFFSET paging, shown with the page
+        self.notice: Optional[str] = None
+        self._prefetched = set()
+
+        analysis = _analyze(self.sql)
+        if analysis is None:
+            self.mode = "scan"
+            self._base_sql = self.sql
+            self._order_items: List[OrderItem] = []
+            self._select_names: Optional[List[Tuple[Tuple[str, ...], Optional[str]]]] = None
+        else:
+            base_sql, order_items, select_names = analysis
+            self.mode = "keyset" if order_items else "offset"
+            self._base_sql = base_sql
+            self._order_items = order_items
+            self._select_names = select_names
+
+    def page_query(self, page: int) -> PageQuery:
+        """Statement, binds and row budget that read the given page."""
+        n = self.page_size
+        if self.mode == "scan":
+            return PageQuery(self.sql, {}, (page + 1) * n, page * n)
+        if page == 0:
+            return PageQuery(f"{self.sql}\nFETCH FIRST :pager_rows ROWS ONLY", {"pager_rows": n}, None)
+
+        boundary = self._boundaries.get(page - 1) if self.mode == "keyset" and self.keys else None
+        if boundary is None:
+            return PageQuery(
+                f"{self.sql}\nOFFSET :pager_offset ROWS FETCH NEXT :pager_rows ROWS ONLY",
+                {"pager_offset": page * n, "pager_rows": n}, None,
+            )
+
+        values, ties = boundary
+        binds: Dict[str, Any] = {"pager_ties": ties, "pager_rows": n}
+        for i, value in enumerate(values, 1):
+            binds[f"pager_k{i}"] = value
+        order_by = ", ".join(
+            f'"{k.column}" {"DESC" if k.descending else "ASC"} NULLS {"FIRST" if k.nulls_first else "LAST"}'
+            for k in self.keys
+        )
+        sql = (
+            f"SELECT * FROM (\n{self._base_sql}\n) pager_q\n"
+            f"WHERE {_seek_predicate(self.keys)}\n"
+            f"ORDER BY {order_by}\n"
+            f"OFFSET :pager_ties ROWS FETCH NEXT :pager_rows ROWS ONLY"
+        )
+        return PageQuery(sql, binds, None)
+
+    def load(self, oracle, page: Optional[int] = None) -> pd.DataFrame:
+        """Read a page (the current one by default), served from the result cache when warm."""
+        page = self.page if page is None else page
+        query = self.page_query(page)
+        try:
+            df = self._execute(oracle, query)
+        except Exception as e:
+            if self.mode != "keyset" or page == 0 or not _KEYSET_ERRORS.search(str(e)):
+                raise
+            # The wrapped keyset query can fail on its column names; page by offset instead
+            self._fall_back("the keyset query could not name its ORDER BY columns")
+            df = self._execute(oracle, self.page_query(page))
+        self.remember(page, df)
+        return df
+
+    def prefetch(self, oracle, page: int, runner):
+        """
+        Warm the result cache with a page on one of the user's query workers.
+        The worker only fetches; the pager's state is updated when load()
+        later reads the page on the script thread.
+        """
+        if page < 0 or page in self._prefetched or (self.last_page is not None and page > self.last_page):
+            return
+        self._prefetched.add(page)
+        query = self.page_query(page)
+        runner.background(lambda: self._execute(oracle, query), f"prefetch of page {page}")
+
+    def adopt(self, oracle, df: pd.DataFrame):
+        """Use a frame fetched elsewhere with page_query(0), such as by a query job, as page 0."""
+        cache = oracle.result_cache
+        if cache is not None:
+            cache.put(self._cache_key(oracle, self.page_query(0)), df, oracle.username)
+        self.remember(0, df)
+
+    def remember(self, page: int, df: pd.DataFrame):
+        """Record a loaded page's columns, deferred columns, end-of-result and keyset boundary."""
+        if not self.columns:
+            self.columns = list(df.columns)
+        if page not in self.deferred:
+            self.deferred[page] = deferred_columns(df)
+        if len(df) < self.page_size:
+            self.last_page = page if self.last_page is None else min(self.last_page, page)
+        if self.mode == "keyset" and self.keys is None:
+            self.keys = self._resolve_keys(list(df.columns))
+            if self.keys is None:
+                self._fall_back("ORDER BY does not name a unique result column for every key")
+                return
+        if self.mode == "keyset" and not df.empty:
+            self._boundaries[page] = self._boundary(page, df)
+
+    def _fall_back(self, reason: str):
+        print(f"Keyset pagination unavailable: {reason}; falling back to OFFSET paging.")
+        self.mode = "offset"
+        self.notice = f"Pages after the first are read with OFFSET paging because {reason}."
+
+    def _execute(self, oracle, query: PageQuery) -> pd.DataFrame:
+        # Pages are cached here rather than by the stream, which skips truncated (scan) reads
+        cache = oracle.result_cache
+        key = self._cache_key(oracle, query) if cache is not None else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        df = oracle.stream_query(query.sql, binds=query.binds or None,
+                                 max_rows=query.max_rows, use_cache=False).to_dataframe()
+        if query.skip:
+            df = df.iloc[query.skip:].reset_index(drop=True)
+        if key is not None:
+            cache.put(key, df, oracle.username)
+        return df
+
+    def _cache_key(self, oracle, query: PageQuery) -> str:
+        return oracle.result_cache.make_key(
+            query.sql, oracle.username, ["page", query.binds, query.max_rows, query.skip]
+        )
+
+    def _boundary(self, page: int, df: pd.DataFrame) -> Optional[Tuple[tuple, int]]:
+        keys = [tuple(_exact(v) for v in row)
+                for row in df[[k.column for k in self.keys]].itertuples(index=False)]
+        last = keys[-1]
+        if any(v is None for v in last):
+            return None
+        ties = sum(1 for key in keys if key == last)
+        if keys[0] == last:
+            # The run of equal keys may have started on an earlier page
+            previous = self._boundaries.get(page - 1) if page else (None, 0)
+            if previous is None or (page and previous[0] != last):
+                return None
+            ties += previous[1]
+        return last, ties
+
+    def _resolve_keys(self, columns: List[str]) -> Optional[List[OrderKey]]:
+        """Map ORDER BY items to result column names, or None when any is ambiguous."""
+        keys = []
+        for item in self._order_items:
+            name = None
+            if item.position is not None:
+                if 1 <= item.position <= len(columns):
+                    name = columns[item.position - 1]
+            else:
+                name = self._output_name(item.parts, columns)
+            if name is None or columns.count(name) != 1:
+                return None
+            keys.append(OrderKey(name, item.descending, item.nulls_first))
+        return keys
+
+    def _output_name(self, parts: Tuple[str, ...], columns: List[str]) -> Optional[str]:
+        select_names = self._select_names
+        if select_names is None:
+            return None
+        for expression, alias in select_names:
+            if expression == parts and alias is not None:
+                return alias
+        if len(parts) == 1:
+            for _, alias in select_names:
+                if alias == parts[0]:
+                    return alias
+        if any(expression == ("*",) or expression[-1:] == ("*",) for expression, _ in select_names):
+            # SELECT * hides the mapping; the column name is unambiguous only if it is unique
+            return parts[-1] if columns.count(parts[-1]) == 1 else None
+        return None
+
+
+def _exact(value) -> Any:
+    """Python value of a key cell if it binds back exactly, else None."""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, bool) or not isinstance(value, _EXACT_TYPES):
+        return None
+    return value
+
+
+def _seek_predicate(keys: List[OrderKey]) -> str:
+    """Rows at or after the bound key in the query's order (ties are skipped by OFFSET)."""
+    def after(i: int, key: OrderKey, inclusive: bool) -> str:
+        op = ("<" if key.descending else ">") + ("=" if inclusive else "")
+        condition = f'"{key.column}" {op} :pager_k{i}'
+        if not key.nulls_first:
+            # NULLs sort after every value, so they are always still ahead
+            condition = f'({condition} OR "{key.column}" IS NULL)'
+        return condition
+
+    predicate = after(len(keys), keys[-1], inclusive=True)
+    for i in range(len(keys) - 1, 0, -1):
+        key = keys[i - 1]
+        predicate = f'({after(i, key, False)} OR ("{key.column}" = :pager_k{i} AND {predicate}))'
+    return predicate
+
+
+def _analyze(sql: str):
+    """
+    Split a query into (SQL without its top-level ORDER BY, order items,
+    select-list names). Returns None when the statement already has a
+    top-level row limit and cannot take OFFSET/FETCH. Order items are empty
+    when the ordering is not usable for keyset paging.
+    """
+    try:
+        words = significant(tokenize(sql))
+    except SQLTokenizeError:
+        return None
+
+    depth = 0
+    top: List[int] = []
+    for i, token in enumerate(words):
+        if token.kind == "op" and token.text == "(":
+            depth += 1
+        elif token.kind == "op" and token.text == ")":
+            depth -= 1
+        elif depth == 0:
+            top.append(i)
+    top_words = {keyword(words[i]) for i in top}
+    if "FETCH" in top_words or "OFFSET" in top_words:
+        return None
+    if top_words & _SET_OPERATORS:
+        return sql, [], None
+
+    order_at = None
+    for n, i in enumerate(top[:-1]):
+        if keyword(words[i]) == "ORDER" and keyword(words[top[n + 1]]) == "BY":
+            order_at = i
+    if order_at is None:
+        return sql, [], None
+
+    items = _order_items(words[order_at + 2:])
+    if not items:
+        return sql, [], None
+    base_sql = sql[:words[order_at].pos].rstrip()
+    return base_sql, items, _select_names(words, top)
+
+
+def _split_top(words: List[Token]) -> List[List[Token]]:
+    """Split tokens on commas outside parentheses."""
+    groups, current, depth = [], [], 0
+    for token in words:
+        if token.kind == "op" and token.text == "(":
+            depth += 1
+        elif token.kind == "op" and token.text == ")":
+            depth -= 1
+        if depth == 0 and token.kind == "op" and token.text == ",":
+            groups.append(current)
+            current = []
+        else:
+            current.append(token)
+    groups.append(current)
+    return groups
+
+
+def _name(token: Token) -> Optional[str]:
+    if token.kind == "ident":
+        return token.text.upper()
+    if token.kind == "quoted_ident":
+        return token.text[1:-1]
+    return None
+
+
+def _dotted(tokens: List[Token]) -> Optional[Tuple[str, ...]]:
+    """Parts of a dotted name such as e.salary, or None for any other expression."""
+    if not tokens or len(tokens) % 2 == 0:
+        return None
+    parts = []
+    for i, token in enumerate(tokens):
+        if i % 2:
+            if not (token.kind == "op" and token.text == "."):
+                return None
+        else:
+            name = "*" if token.kind == "op" and token.text == "*" and i == len(tokens) - 1 else _name(token)
+            if name is None:
+                return None
+            parts.append(name)
+    return tuple(parts)
+
+
+def _order_items(words: List[Token]) -> List[OrderItem]:
+    items = []
+    for group in _split_top(words):
+        descending = False
+        nulls_first = None
+        tail = [keyword(t) for t in group]
+        if tail[-2:] in (["NULLS", "FIRST"], ["NULLS", "LAST"]):
+            nulls_first = tail[-1] == "FIRST"
+            group, tail = group[:-2], tail[:-2]
+        if tail[-1:] in (["ASC"], ["DESC"]):
+            descending = tail[-1] == "DESC"
+            group = group[:-1]
+        if nulls_first is None:
+            # Oracle sorts NULLs as the largest value
+            nulls_first = descending
+
+        if len(group) == 1 and group[0].kind == "number" and group[0].text.isdigit():
+            items.append(OrderItem((), int(group[0].text), descending, nulls_first))
+            continue
+        parts = _dotted(group)
+        if parts is None or "*" in parts:
+            return []
+        items.append(OrderItem(parts, None, descending, nulls_first))
+    return items
+
+
+def _select_names(words: List[Token], top: List[int]) -> Optional[List[Tuple[Tuple[str, ...], Optional[str]]]]:
+    """(expression parts, output name) per item of the main select list."""
+    start = end = None
+    for i in top:
+        word = keyword(words[i])
+        if start is None and word == "SELECT":
+            start = i + 1
+        elif start is not None and word == "FROM":
+            end = i
+            break
+    if start is None or end is None:
+        return None
+    if keyword(words[start]) in ("DISTINCT", "UNIQUE", "ALL"):
+        start += 1
+
+    names = []
+    for group in _split_top(words[start:end]):
+        parts = _dotted(group)
+        if parts is not None:
+            names.append((parts, None if parts[-1] == "*" else parts[-1]))
+            continue
+        alias = _name(group[-1]) if len(group) > 1 else None
+        before = group[-2] if len(group) > 1 else None
+        # An alias follows AS or a complete operand, never an operator such as . or ||
+        if alias is not None and not (before.kind == "op" and before.text != ")"):
+            expression = _dotted(group[:-2] if keyword(before) == "AS" else group[:-1])
+            names.append((expression or (), alias))
+        else:
+            names.append(((), None))
+    return names
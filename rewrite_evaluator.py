@@ -0,0 +1,227 @@
+import datetime
+import hashlib
+import statistics
+from decimal import Decimal
+from typing import Callable, List, NamedTuple, Optional
+from deferred_values import resolve
+from security import SecurityManager
+from sql_tokenizer import tokenize, significant, SQLTokenizeError
+import telemetry
+
+_MASK = (1 << 128) - 1
+
+
+class RowDigest:
+    """
+    Order-insensitive digest of a result: the sum of per-row hashes, so the
+    same multiset of rows gives the same digest in any order. Numbers are
+    compared by value, so 1, 1.0 and Decimal('1') hash alike.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._sum = 0
+
+    def update(self, rows: List[tuple]):
+        for row in rows:
+            encoded = "\x1f".join(_canonical(value) for value in row).encode()
+            self._sum = (self._sum + int.from_bytes(hashlib.sha256(encoded).digest()[:16], "big")) & _MASK
+        self.rows += len(rows)
+
+    def hexdigest(self) -> str:
+        return f"{self.rows}:{self._sum:032x}"
+
+
+def _canonical(value) -> str:
+    value = resolve(value)
+    if value is None:
+        return "\x00"
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float, Decimal)):
+        # 15 significant digits absorb floating-point noise from reordered arithmetic
+        number = Decimal(format(value, ".15g")) if isinstance(value, float) else Decimal(value)
+        if number == number.to_integral_value():
+            return str(int(number))
+        return format(number.normalize(), "f")
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+class Measurement(NamedTuple):
+    elapsed_ms: float
+    buffer_gets: float
+    rows: int
+    truncated: bool
+    digest: str
+    runs_ms: List[float]
+
+
+class Candidate(NamedTuple):
+    label: str
+    sql: str
+    rationale: str = ""
+    # "ok", "rejected" or "failed"
+    status: str = "ok"
+    error: Optional[str] = None
+    cost: Optional[float] = None
+    measurement: Optional[Measurement] = None
+    # True/False once compared with the original; None when it cannot be verified
+    equivalent: Optional[bool] = None
+    speedup: Optional[float] = None
+
+
+class Evaluation(NamedTuple):
+    sql_id: str
+    plan: str
+    original: Candidate
+    # Ranked: verified-equivalent candidates by elapsed time, buffer gets and cost first
+    candidates: List[Candidate]
+
+
+class RewriteEvaluator:
+    """
+    Rewrite-and-verify loop for one statement: read its cached plan, ask the
+    model for rewrites, pass each candidate through the plan gate, run the
+    original and every admitted candidate under a timeout with warm-up and
+    measured repetitions on a session of their own, check each candidate
+    returns the same rows, and rank them by measurements. Only statements
+    parsed in the connected schema are evaluated, so names resolve the same.
+    """
+
+    def __init__(self, oracle, groq, security: SecurityManager, repeat: int = 3, warmup: int = 1,
+                 timeout_seconds: float = 30.0, max_rows: int = 100000,
+                 max_candidates: int = 4):
+        self.oracle = oracle
+        self.groq = groq
+        self.security = security
+        self.repeat = repeat
+        self.warmup = warmup
+        self.timeout_seconds = timeout_seconds
+        # Results longer than this are measured but cannot be verified as equivalent
+        self.max_rows = max_rows
+        self.max_candidates = max_candidates
+
+    def evaluate(self, sql_id: str, sql_text: str,
+                 progress: Optional[Callable[[str], None]] = None) -> Evaluation:
+        """Raises when the original statement cannot be measured; candidate failures are recorded."""
+        progress = progress or (lambda message: None)
+        problem = runnable(sql_text)
+        if problem:
+            raise ValueError(problem)
+        schema = self.oracle.get_parsing_schema(sql_id)
+        if schema != self.oracle.username:
+            raise ValueError(
+                f"{sql_id} was parsed in schema {schema or 'unknown'}; only statements of "
+                f"{self.oracle.username} can be measured here"
+            )
+
+        progress("Reading the cached plan")
+        with telemetry.span("rewrite.plan"):
+            plan = self.oracle.display_cursor(sql_id)
+        progress("Asking for rewrite candidates")
+        proposals = self.groq.rewrite_candidates(sql_text, plan, self.max_candidates)
+
+        progress("Measuring the original statement")
+        # The original already runs in production, so only the rewrites are gated
+        original = self._candidate("Original", sql_text.rstrip().rstrip(";"), gated=False)
+        if original.status != "ok":
+            raise ValueError(f"The original statement could not be measured: {original.error}")
+
+        candidates = []
+        for i, proposal in enumerate(proposals, 1):
+            progress(f"Measuring candidate {i} of {len(proposals)}: {proposal['label']}")
+            candidates.append(self._verify(
+                self._candidate(proposal["label"], proposal["sql"], proposal["rationale"]), original
+            ))
+        return Evaluation(sql_id, plan, original, sorted(candidates, key=_rank))
+
+    def _candidate(self, label: str, sql: str, rationale: str = "", gated: bool = True) -> Candidate:
+        candidate = Candidate(label, sql, rationale)
+        problem = runnable(sql)
+        if problem:
+            return candidate._replace(status="rejected", error=problem)
+        if gated:
+            with telemetry.span("sql.plan_check", label=label):
+                verdict = self.security.check_plan(self.oracle, sql)
+            # A row limit would change the result, so limited statements are not run either
+            if not verdict.allowed or verdict.limited:
+                return candidate._replace(status="rejected", error=f"blocked by the plan check: {verdict.reason}")
+            cost = verdict.cost
+        else:
+            try:
+                plan = self.oracle.explain_plan(sql)
+                cost = plan[0].get("cost") if plan else None
+            except Exception as e:
+                # The cost only breaks ties; a statement that cannot be explained can still be measured
+                print(f"Explain failed for {label}: {str(e)}")
+                cost = None
+        try:
+            with telemetry.span("rewrite.measure", label=label):
+                measurement = self._measure(sql)
+        except Exception as e:
+            return candidate._replace(status="failed", error=str(e))
+        return candidate._replace(cost=cost, measurement=measurement)
+
+    def _measure(self, sql: str) -> Measurement:
+        timeout_ms = int(self.timeout_seconds * 1000)
+        # Warm-up runs load the buffer cache and cursor; the digest is taken from the first run
+        digest = None
+        runs = []
+        for run in range(self.warmup + self.repeat):
+            row_digest = RowDigest()
+            result = self.oracle.run_measured(sql, row_digest.update, timeout_ms, self.max_rows)
+            digest = digest or row_digest.hexdigest()
+            if run >= self.warmup:
+                runs.append(result)
+        return Measurement(
+            elapsed_ms=statistics.median(r["elapsed"] for r in runs) * 1000,
+            buffer_gets=statistics.median(r["buffer_gets"] for r in runs),
+            rows=runs[-1]["rows"],
+            truncated=runs[-1]["truncated"],
+            digest=digest,
+            runs_ms=[round(r["elapsed"] * 1000, 3) for r in runs],
+        )
+
+    @staticmethod
+    def _verify(candidate: Candidate, original: Candidate) -> Candidate:
+        if candidate.status != "ok":
+            return candidate
+        mine, theirs = candidate.measurement, original.measurement
+        equivalent = None
+        if not (mine.truncated or theirs.truncated):
+            equivalent = mine.digest == theirs.digest
+        speedup = theirs.elapsed_ms / mine.elapsed_ms if mine.elapsed_ms else None
+        return candidate._replace(equivalent=equivalent, speedup=speedup)
+
+
+def runnable(sql: str) -> Optional[str]:
+    """Why a statement cannot be measured, or None: it must be a single query without binds."""
+    if not SecurityManager.sanitize_input(sql):
+        return "only single SELECT statements can be measured"
+    try:
+        if any(token.kind == "bind" for token in significant(tokenize(sql))):
+            return "the statement uses bind variables, which have no values here"
+    except SQLTokenizeError as e:
+        return str(e)
+    return None
+
+
+def _rank(candidate: Candidate):
+    # Verified rewrites first, then unverifiable ones, then wrong or failed ones
+    if candidate.status != "ok":
+        group = 3
+    elif candidate.equivalent is None:
+        group = 1
+    else:
+        group = 0 if candidate.equivalent else 2
+    measurement = candidate.measurement
+    return (
+        group,
+        measurement.elapsed_ms if measurement else float("inf"),
+        measurement.buffer_gets if measurement else float("inf"),
+        candidate.cost if candidate.cost is not None else float("inf"),
+    )
@@ -0,0 +1,337 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Optional, List, Dict, Tuple, Set, Iterable
+import pandas as pd
+from sql_tokenizer import tokenize, significant, keyword, SQLTokenizeError
+
+TableKey = Tuple[str, str]
+
+# Above this many changed objects an owner is reloaded in one pass instead
+# of table by table.
+_INCREMENTAL_LIMIT = 50
+
+_WORD = re.compile(r"[A-Za-z0-9]+")
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = f"  {word.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def extract_table_names(sql: str, default_owner: Optional[str] = None) -> List[TableKey]:
+    """
+    Return (owner, table) pairs named after a FROM/JOIN clause keyword, in
+    query order. FROM inside function calls (EXTRACT, TRIM) is not a clause.
+    """
+    try:
+        tokens = significant(tokenize(sql))
+    except SQLTokenizeError:
+        return []
+
+    keys = []
+    # One entry per open parenthesis: True when it opens a subquery
+    parens: List[bool] = []
+    for i, token in enumerate(tokens):
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token.text == "(":
+            parens.append(following is not None and keyword(following) in ("SELECT", "WITH"))
+            continue
+        if token.text == ")":
+            if parens:
+                parens.pop()
+            continue
+        if keyword(token) not in ("FROM", "JOIN") or (parens and not parens[-1]):
+            continue
+        parts = _dotted_name(tokens, i + 1)
+        if not parts:
+            continue
+        key = (parts[0], parts[1]) if len(parts) == 2 else ((default_owner or "").upper(), parts[0])
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+def _dotted_name(tokens, start: int) -> List[str]:
+    """Parts of a [owner.]name at tokens[start], or [] for inline views and table functions."""
+    parts = []
+    i = start
+    while i < len(tokens) and tokens[i].kind in ("ident", "quoted_ident"):
+        text = tokens[i].text
+        parts.append(text[1:-1] if tokens[i].kind == "quoted_ident" else text.upper())
+        if i + 1 < len(tokens) and tokens[i + 1].text == "." and len(parts) < 2:
+            i += 2
+        else:
+            i += 1
+            break
+    if i < len(tokens) and tokens[i].text == "(":
+        return []
+    return parts
+
+
+class SchemaCatalog:
+    """
+    In-memory index of tables, columns, constraints and indexes for a set of
+    schema owners. The catalog is persisted as a JSON snapshot and refreshed
+    incrementally from ALL_OBJECTS.LAST_DDL_TIME, so metadata lookups and
+    prompt retrieval never touch the data dictionary.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self.tables: Dict[TableKey, Dict] = {}
+        self._lock = threading.RLock()
+        self._word_index: Dict[str, Set[Tuple[TableKey, float]]] = {}
+        self._trigram_index: Dict[str, Set[str]] = {}
+
+    # ------------------------------------------------------------------ loading
+
+    def refresh(self, conn, owners: Iterable[str]):
+        """Load new or changed tables for the owners and drop removed ones."""
+        for owner in {o.upper() for o in owners if o}:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT object_name, TO_CHAR(last_ddl_time, 'YYYY-MM-DD HH24:MI:SS')
+                    FROM all_objects
+                    WHERE owner = :owner AND object_type IN ('TABLE', 'VIEW')
+                """, owner=owner)
+                current = dict(cursor.fetchall())
+
+            with self._lock:
+                known = {name: t["last_ddl"] for (o, name), t in self.tables.items() if o == owner}
+            changed = [name for name, ddl in current.items() if known.get(name) != ddl]
+            dropped = [name for name in known if name not in current]
+
+            if len(changed) > _INCREMENTAL_LIMIT:
+                loaded = self._load(conn, owner, None)
+            else:
+                loaded = {}
+                for name in changed:
+                    loaded.update(self._load(conn, owner, name))
+
+            with self._lock:
+                for name in dropped:
+                    self.tables.pop((owner, name), None)
+                for key, table in loaded.items():
+                    table["last_ddl"] = current.get(key[1])
+                    self.tables[key] = table
+                if changed or dropped:
+                    self._build_index()
+
+        if self.snapshot_path:
+            self.save_snapshot()
+
+    def _load(self, conn, owner: str, table_name: Optional[str]) -> Dict[TableKey, Dict]:
+        """Read dictionary metadata for one table, or all tables of the owner."""
+        table_filter = "AND table_name = :table_name" if table_name else ""
+        constraint_filter = "AND c.table_name = :table_name" if table_name else ""
+        binds = {"owner": owner}
+        if table_name:
+            binds["table_name"] = table_name
+
+        tables: Dict[TableKey, Dict] = {}
+
+        def table(name):
+            return tables.setdefault((owner, name), {
+                "owner": owner,
+                "name": name,
+                "columns": [],
+                "primary_key": [],
+                "foreign_keys": [],
+                "indexes": {},
+                "last_ddl": None,
+            })
+
+        with conn.cursor() as cursor:
+            cursor.arraysize = 1000
+            cursor.execute(f"""
+                SELECT table_name, column_name, data_type, data_length,
+                       data_precision, data_scale, nullable
+                FROM all_tab_columns
+                WHERE owner = :owner {table_filter}
+                ORDER BY table_name, column_id
+            """, binds)
+            for name, column, dtype, length, precision, scale, nullable in cursor:
+                table(name)["columns"].append({
+                    "name": column,
+                    "type": dtype,
+                    "length": length,
+                    "precision": precision,
+                    "scale": scale,
+                    "nullable": nullable == "Y",
+                })
+
+            cursor.execute(f"""
+                SELECT c.table_name, c.constraint_type, c.constraint_name, cc.column_name,
+                       r.owner, r.table_name
+                FROM all_constraints c
+                JOIN all_cons_columns cc
+                  ON cc.owner = c.owner AND cc.constraint_name = c.constraint_name
+                LEFT JOIN all_constraints r
+                  ON r.owner = c.r_owner AND r.constraint_name = c.r_constraint_name
+                WHERE c.owner = :owner AND c.constraint_type IN ('P', 'R')
+                  {constraint_filter}
+                ORDER BY c.table_name, c.constraint_name, cc.position
+            """, binds)
+            foreign = defaultdict(lambda: {"columns": [], "ref_owner": None, "ref_table": None})
+            for name, ctype, cname, column, ref_owner, ref_table in cursor:
+                if (owner, name) not in tables:
+                    continue
+                if ctype == "P":
+                    table(name)["primary_key"].append(column)
+                else:
+                    fk = foreign[(name, cname)]
+                    fk["columns"].append(column)
+                    fk["ref_owner"], fk["ref_table"] = ref_owner, ref_table
+            for (name, _), fk in foreign.items():
+                table(name)["foreign_keys"].append(fk)
+
+            cursor.execute(f"""
+                SELECT table_name, index_name, column_name
+                FROM all_ind_columns
+                WHERE table_owner = :owner {table_filter}
+                ORDER BY table_name, index_name, column_position
+            """, binds)
+            for name, index, column in cursor:
+                if (owner, name) in tables:
+                    table(name)["indexes"].setdefault(index, []).append(column)
+
+        return tables
+
+    # ---------------------------------------------------------------- snapshot
+
+    def save_snapshot(self):
+        with self._lock:
+            payload = list(self.tables.values())
+        # A private temp file per writer, so concurrent saves never interleave
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(self.snapshot_path) + ".", suffix=".tmp",
+            dir=os.path.dirname(self.snapshot_path) or ".",
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load_snapshot(self) -> bool:
+        """Populate the catalog from the snapshot file; returns False if absent."""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable schema snapshot: {str(e)}")
+            return False
+        with self._lock:
+            self.tables = {(t["owner"], t["name"]): t for t in payload}
+            self._build_index()
+        return True
+
+    # ----------------------------------------------------------------- lookups
+
+    def get_table(self, owner: str, name: str) -> Optional[Dict]:
+        return self.tables.get((owner.upper(), name.upper()))
+
+    def columns_frame(self, owner: str, name: str) -> Optional[pd.DataFrame]:
+        """Column metadata in the shape of an ALL_TAB_COLUMNS query."""
+        table = self.get_table(owner, name)
+        if table is None:
+            return None
+        return pd.DataFrame(
+            [(c["name"], c["type"], c["length"]) for c in table["columns"]],
+            columns=["COLUMN_NAME", "DATA_TYPE", "DATA_LENGTH"],
+        )
+
+    def relevant_tables(self, question: str, k: int = 5) -> List[TableKey]:
+        """Rank tables by fuzzy trigram overlap between the question and table/column names."""
+        scores: Dict[TableKey, float] = defaultdict(float)
+        with self._lock:
+            for word in {w.lower() for w in _WORD.findall(question) if len(w) >= 3}:
+                grams = trigrams(word)
+                candidates = set()
+                for gram in grams:
+                    candidates |= self._trigram_index.get(gram, set())
+                best: Dict[TableKey, float] = {}
+                for candidate in candidates:
+                    similarity = len(grams & trigrams(candidate)) / len(grams | trigrams(candidate))
+                    if similarity < 0.5:
+                        continue
+                    for key, weight in self._word_index[candidate]:
+                        best[key] = max(best.get(key, 0.0), similarity * weight)
+                for key, score in best.items():
+                    scores[key] += score
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [key for key, _ in ranked[:k]]
+
+    def describe(self, keys: Iterable[TableKey]) -> str:
+        """Compact DDL-like definitions of the given tables for the NL2SQL prompt."""
+        lines = []
+        for key in keys:
+            table = self.tables.get(key)
+            if table is None:
+                continue
+            columns = ", ".join(f"{c['name']} {_format_type(c)}" for c in table["columns"])
+            lines.append(f"{table['owner']}.{table['name']}({columns})")
+            if table["primary_key"]:
+                lines.append(f"  PRIMARY KEY ({', '.join(table['primary_key'])})")
+            for fk in table["foreign_keys"]:
+                lines.append(
+                    f"  FOREIGN KEY ({', '.join(fk['columns'])}) "
+                    f"REFERENCES {fk['ref_owner']}.{fk['ref_table']}"
+                )
+        return "\n".join(lines)
+
+    def _build_index(self):
+        # Table-name words weigh more than column-name words
+        word_index: Dict[str, Set[Tuple[TableKey, float]]] = defaultdict(set)
+        for key, table in self.tables.items():
+            for word in _name_words(table["name"]):
+                word_index[word].add((key, 2.0))
+            for column in table["columns"]:
+                for word in _name_words(column["name"]):
+                    word_index[word].add((key, 1.0))
+        trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        for word in word_index:
+            for gram in trigrams(word):
+                trigram_index[gram].add(word)
+        self._word_index = dict(word_index)
+        self._trigram_index = dict(trigram_index)
+
+
+def _name_words(name: str) -> Set[str]:
+    words = {w.lower() for w in name.split("_") if len(w) >= 2}
+    words.add(name.lower())
+    return words
+
+
+def _format_type(column: Dict) -> str:
+    if column["type"] == "NUMBER" and column["precision"] is not None:
+        return f"NUMBER({column['precision']},{column['scale'] or 0})"
+    if column["type"] in ("VARCHAR2", "NVARCHAR2", "CHAR", "NCHAR", "RAW"):
+        return f"{column['type']}({column['length']})"
+    return column["type"]
+
+
+_CATALOGS: Dict[tuple, SchemaCatalog] = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def get_catalog(dsn: str, username: str, snapshot_dir: str) -> SchemaCatalog:
+    """Return the process-wide catalog for a DSN and user, warmed from its snapshot."""
+    key = (dsn, username.upper())
+    with _CATALOGS_LOCK:
+        catalog = _CATALOGS.get(key)
+        if catalog is None:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            safe_name = re.sub(r"[^A-Za-z0-9]+", "_", f"{dsn}_{username}").strip("_")
+            catalog = SchemaCatalog(os.path.join(snapshot_dir, f"{safe_name}.json"))
+            catalog.load_snapshot()
+            _CATALOGS[key] = catalog
+        return catalog
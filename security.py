@@ -1,30 +1,176 @@
-import re
-from cx_Oracle import DatabaseError
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+from query_cache import normalize_sql
+from sql_tokenizer import tokenize, significant, keyword, split_statements, SQLTokenizeError
+
+# Plan operations that read a whole segment
+_FULL_SCANS = {
+    ("TABLE ACCESS", "FULL"),
+    ("MAT_VIEW ACCESS", "FULL"),
+    ("INDEX", "FAST FULL SCAN"),
+    ("INDEX", "FULL SCAN"),
+}
+
+
+class PlanVerdict(NamedTuple):
+    allowed: bool
+    # Statement to execute; carries a row limit when the gate added one
+    sql: str
+    reason: Optional[str] = None
+    cost: Optional[float] = None
+    cardinality: Optional[float] = None
+    full_scans: List[str] = []
+    limited: bool = False
+    cached: bool = False
+
 
 class SecurityManager:
+    """
+    Pre-flight checks for SQL before it reaches the database: the statement
+    must be a single query, and its EXPLAIN PLAN estimates must stay within
+    the configured cost, cardinality and full-scan thresholds. Thresholds
+    set to None are not enforced. Plans are cached by SQL hash and user.
+    """
+
+    def __init__(self, max_cost: Optional[float] = 100000,
+                 max_cardinality: Optional[float] = 1000000,
+                 max_full_scan_blocks: Optional[int] = 100000,
+                 allow_cartesian: bool = False, action: str = "reject",
+                 row_limit: int = 1000, plan_cache_size: int = 512,
+                 plan_ttl_seconds: float = 600, fail_closed: bool = True):
+        if action not in ("reject", "limit"):
+            raise ValueError("action must be 'reject' or 'limit'")
+        self.max_cost = max_cost
+        self.max_cardinality = max_cardinality
+        # Full scans of tables (or indexes) larger than this many blocks count as violations
+        self.max_full_scan_blocks = max_full_scan_blocks
+        self.allow_cartesian = allow_cartesian
+        # "limit" appends a row limit to cost/cardinality violations instead of rejecting
+        self.action = action
+        self.row_limit = row_limit
+        self.plan_cache_size = plan_cache_size
+        self.plan_ttl_seconds = plan_ttl_seconds
+        # When EXPLAIN PLAN itself fails, block the query instead of letting it run
+        self.fail_closed = fail_closed
+        self._plans: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
     @staticmethod
     def sanitize_input(sql: str) -> bool:
-        # """
-        # Sanitizes input SQL by checking for forbidden patterns.
-        # Allows SELECT queries and blocks potentially harmful operations.
-        # """
-        # sql_upper = sql.upper().strip()
-
-        # # Allow only SELECT statements
-        # if not sql_upper.startswith("SELECT"):
-        #     print("Only SELECT statements are allowed.")
-        #     return False
-
-        # # Block dangerous patterns
-        # forbidden_patterns = [
-        #     r";\s*--",        # Inline comment after a semicolon
-        #     r"EXEC\s",        # EXEC calls
-        #     r"XP_",           # Extended stored procedures (irrelevant to Oracle)
-        #     r"\b(DROP|DELETE|UPDATE|INSERT)\b"  # DDL and DML commands
-        # ]
-        
-        # if any(re.search(pattern, sql, re.IGNORECASE) for pattern in forbidden_patterns):
-        #     print("Query contains forbidden patterns.")
-        #     return False
+        """Allow only a single SELECT (or WITH ... SELECT) statement."""
+        try:
+            statements = split_statements(tokenize(sql))
+        except SQLTokenizeError as e:
+            print(f"Unable to parse SQL: {str(e)}")
+            return False
+
+        if len(statements) != 1:
+            print("Only a single statement is allowed.")
+            return False
+        words = significant(statements[0])
+        if keyword(words[0]) not in ("SELECT", "WITH"):
+            print("Only SELECT statements are allowed.")
+            return False
 
+        if len(words) > 1 and keyword(words[1]) in ("FUNCTION", "PROCEDURE"):
+            print("PL/SQL declarations in WITH are not allowed.")
+            return False
+        for previous, token in zip(words, words[1:]):
+            if keyword(previous) == "FOR" and keyword(token) == "UPDATE":
+                print("SELECT ... FOR UPDATE is not allowed.")
+                return False
         return True
+
+    def check_plan(self, oracle, sql: str) -> PlanVerdict:
+        """Explain sql and judge its estimates against the configured thresholds."""
+        sql = sql.strip().rstrip(";")
+        key = hashlib.sha256(f"{oracle.username}\0{normalize_sql(sql)}".encode()).hexdigest()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._plans.get(key)
+            if entry is not None and now - entry[0] < self.plan_ttl_seconds:
+                self._plans.move_to_end(key)
+                return entry[1]._replace(cached=True)
+
+        try:
+            plan = oracle.explain_plan(sql)
+        except Exception as e:
+            print(f"Plan check unavailable: {str(e)}")
+            if self.fail_closed:
+                return PlanVerdict(False, sql, reason=f"Plan check unavailable: {str(e)}")
+            # Not cached, so the check is retried once the plan can be read
+            return PlanVerdict(True, sql, reason=f"Plan check unavailable: {str(e)}")
+
+        verdict = self._judge(sql, plan)
+        with self._lock:
+            self._plans[key] = (now, verdict)
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.plan_cache_size:
+                self._plans.popitem(last=False)
+        return verdict
+
+    def _judge(self, sql: str, plan: List[dict]) -> PlanVerdict:
+        if not plan:
+            return PlanVerdict(True, sql)
+        root = plan[0]
+        cost = root.get("cost")
+        cardinality = root.get("cardinality")
+
+        full_scans = []
+        cartesian = False
+        for step in plan:
+            if (step.get("operation"), step.get("options")) in _FULL_SCANS:
+                blocks = step.get("blocks")
+                large = (self.max_full_scan_blocks is not None and blocks is not None
+                         and blocks > self.max_full_scan_blocks)
+                if large:
+                    full_scans.append(f"{step.get('object_owner')}.{step.get('object_name')} ({blocks} blocks)")
+            if step.get("options") == "CARTESIAN":
+                cartesian = True
+
+        details = dict(cost=cost, cardinality=cardinality, full_scans=full_scans)
+        if cartesian and not self.allow_cartesian:
+            return PlanVerdict(False, sql, reason="the plan contains a Cartesian join", **details)
+        if full_scans:
+            return PlanVerdict(
+                False, sql, reason=f"full scan of large segments: {', '.join(full_scans)}", **details
+            )
+
+        violations = []
+        if self.max_cost is not None and cost is not None and cost > self.max_cost:
+            violations.append(f"estimated cost {cost:,.0f} exceeds {self.max_cost:,.0f}")
+        if self.max_cardinality is not None and cardinality is not None and cardinality > self.max_cardinality:
+            violations.append(f"estimated {cardinality:,.0f} rows exceeds {self.max_cardinality:,.0f}")
+        if not violations:
+            return PlanVerdict(True, sql, **details)
+
+        reason = "; ".join(violations)
+        if self.action == "limit":
+            limited = add_row_limit(sql, self.row_limit)
+            if limited is not None:
+                return PlanVerdict(True, limited, reason=reason, limited=True, **details)
+        return PlanVerdict(False, sql, reason=reason, **details)
+
+
+def add_row_limit(sql: str, row_limit: int) -> Optional[str]:
+    """
+    Append FETCH FIRST n ROWS ONLY to a query without a top-level row-limiting
+    clause. Returns None when the statement already limits its rows.
+    """
+    try:
+        words = significant(tokenize(sql))
+    except SQLTokenizeError:
+        return None
+    depth = 0
+    for token in words:
+        if token.kind == "op" and token.text == "(":
+            depth += 1
+        elif token.kind == "op" and token.text == ")":
+            depth -= 1
+        elif depth == 0 and keyword(token) in ("FETCH", "OFFSET"):
+            return None
+    return f"{sql.rstrip().rstrip(';')}\nFETCH FIRST {int(row_limit)} ROWS ONLY"
@@ -0,0 +1,133 @@
+import glob
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+
+METRICS = ["elapsed_time", "cpu_time", "buffer_gets", "executions"]
+
+
+class SqlSnapshotCollector:
+    """
+    Periodically snapshots recently active statements from V$SQLSTATS and
+    turns the cumulative counters into per-interval deltas keyed on (sql_id,
+    plan_hash_value), keeping the top_n by elapsed time in the interval.
+    Every snapshot is appended to a local Parquet history so the Optimizer
+    tab can show what is slow now and how it trends.
+    """
+
+    def __init__(self, fetch_snapshot: Callable[[], List[Dict]], history_dir: str,
+                 interval: float = 60.0, top_n: int = 200,
+                 retention_seconds: float = 7 * 86400,
+                 compact_every: int = 60, max_failures: int = 5):
+        self.fetch_snapshot = fetch_snapshot
+        self.history_dir = history_dir
+        self.interval = interval
+        self.top_n = top_n
+        self.retention_seconds = retention_seconds
+        # Small per-snapshot files are merged into one segment file this often
+        self.compact_every = compact_every
+        self.max_failures = max_failures
+        self.last_error: Optional[str] = None
+        self.last_deltas: Optional[pd.DataFrame] = None
+        self._previous: Optional[Tuple[float, Dict[Tuple[str, int], Dict]]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sql-collector", daemon=True)
+        os.makedirs(history_dir, exist_ok=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                self.collect_once()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                self.last_error = str(e)
+                if failures >= self.max_failures:
+                    print(f"SQL collector stopped after repeated errors: {str(e)}")
+                    return
+            self._stop.wait(self.interval)
+
+    def collect_once(self) -> Optional[pd.DataFrame]:
+        """Take one snapshot and return its deltas against the previous one."""
+        now = time.time()
+        current = {(row["sql_id"], row["plan_hash_value"]): row for row in self.fetch_snapshot()}
+        previous = self._previous
+        self._previous = (now, current)
+        if previous is None:
+            # The first snapshot only establishes the baseline
+            return None
+
+        interval = now - previous[0]
+        rows = []
+        for key, row in current.items():
+            before = previous[1].get(key)
+            # Statements not active before this interval have no baseline yet
+            if before is None or row["executions"] < before["executions"]:
+                continue
+            delta = {f"d_{m}": row[m] - before[m] for m in METRICS}
+            if delta["d_elapsed_time"] <= 0:
+                continue
+            rows.append({"ts": now, "interval_s": interval, **row, **delta})
+
+        deltas = pd.DataFrame(rows, columns=["ts", "interval_s", "sql_id", "plan_hash_value"]
+                              + METRICS + [f"d_{m}" for m in METRICS])
+        deltas = deltas.sort_values("d_elapsed_time", ascending=False, ignore_index=True).head(self.top_n)
+        with self._lock:
+            self.last_deltas = deltas
+        if not deltas.empty:
+            self._append_history(deltas, now)
+        return deltas
+
+    def _append_history(self, deltas: pd.DataFrame, now: float):
+        path = os.path.join(self.history_dir, f"snapshot_{int(now * 1000)}.parquet")
+        deltas.to_parquet(path, index=False, compression="zstd")
+
+        snapshots = sorted(glob.glob(os.path.join(self.history_dir, "snapshot_*.parquet")))
+        if len(snapshots) >= self.compact_every:
+            segment = pd.concat([pd.read_parquet(f) for f in snapshots], ignore_index=True)
+            segment_path = os.path.join(self.history_dir, f"segment_{int(now * 1000)}.parquet")
+            segment.to_parquet(segment_path, index=False, compression="zstd")
+            for f in snapshots:
+                os.remove(f)
+
+        # Segment names carry their newest timestamp, so expiry needs no reads
+        cutoff_ms = (now - self.retention_seconds) * 1000
+        for f in glob.glob(os.path.join(self.history_dir, "segment_*.parquet")):
+            if int(os.path.basename(f)[8:-8]) < cutoff_ms:
+                os.remove(f)
+
+    def top_now(self, n: int = 20) -> Optional[pd.DataFrame]:
+        """The n statements with the most elapsed time in the last interval."""
+        with self._lock:
+            if self.last_deltas is None:
+                return None
+            top = self.last_deltas.head(n).copy()
+        executions = top["d_executions"].where(top["d_executions"] > 0)
+        top["elapsed_per_exec_ms"] = top["d_elapsed_time"] / executions / 1000
+        return top
+
+    def history(self, sql_id: str) -> pd.DataFrame:
+        """Per-interval history of one statement across all stored snapshots."""
+        files = sorted(glob.glob(os.path.join(self.history_dir, "*.parquet")))
+        if not files:
+            return pd.DataFrame()
+        history = pd.concat(
+            [pd.read_parquet(f, filters=[("sql_id", "==", sql_id)]) for f in files],
+            ignore_index=True,
+        )
+        history["time"] = pd.to_datetime(history["ts"], unit="s")
+        return history.sort_values("time", ignore_index=True)
+
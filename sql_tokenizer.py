@@ -0,0 +1,76 @@
+import re
+from typing import List, NamedTuple
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    pos: int
+
+
+# Order matters: comments and quoted forms must win over operators.
+_TOKEN_SPEC = [
+    ("ws", r"\s+"),
+    ("comment", r"--[^\n]*|/\*.*?\*/"),
+    ("string", r"[nN]?[qQ]'(?:\[.*?\]|\{.*?\}|\(.*?\)|<.*?>|(?P<qdelim>.).*?(?P=qdelim))'"
+               r"|[nN]?'(?:[^']|'')*'"),
+    ("quoted_ident", r'"[^"]*"'),
+    ("number", r"(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?[fFdD]?(?![A-Za-z0-9_$#])"),
+    ("bind", r":(?:\w+|\d+)"),
+    ("ident", r"[A-Za-z][A-Za-z0-9_$#]*"),
+    ("op", r"<=|>=|<>|!=|\^=|\|\||=>|\*\*|[-+*/%=<>(),.;@\[\]|&!^~?{}]"),
+]
+_TOKEN_RE = re.compile(
+    "|".join(f"(?P<{name}{i}>{pattern})" for i, (name, pattern) in enumerate(_TOKEN_SPEC)),
+    re.DOTALL,
+)
+_KIND_BY_GROUP = {f"{name}{i}": name for i, (name, _) in enumerate(_TOKEN_SPEC)}
+
+
+class SQLTokenizeError(ValueError):
+    pass
+
+
+def tokenize(sql: str) -> List[Token]:
+    """Split Oracle SQL into tokens, keeping whitespace and comments so text round-trips."""
+    tokens = []
+    pos = 0
+    while pos < len(sql):
+        match = _TOKEN_RE.match(sql, pos)
+        if match is None:
+            raise SQLTokenizeError(f"Unexpected character {sql[pos]!r} at position {pos}")
+        tokens.append(Token(_KIND_BY_GROUP[match.lastgroup], match.group(), pos))
+        pos = match.end()
+    return tokens
+
+
+def significant(tokens: List[Token]) -> List[Token]:
+    """Drop whitespace and comments (hints included)."""
+    return [t for t in tokens if t.kind not in ("ws", "comment")]
+
+
+def keyword(token: Token) -> str:
+    """Uppercased identifier text, or '' for anything that is not a bare identifier."""
+    return token.text.upper() if token.kind == "ident" else ""
+
+
+def split_statements(tokens: List[Token]) -> List[List[Token]]:
+    """Group tokens into statements separated by top-level semicolons."""
+    statements, current = [], []
+    for token in tokens:
+        if token.kind == "op" and token.text == ";":
+            statements.append(current)
+            current = []
+        else:
+            current.append(token)
+    statements.append(current)
+    return [s for s in statements if significant(s)]
+
+
+def string_value(text: str) -> str:
+    """Python value of an Oracle string literal token."""
+    if text[:1] in "nN":
+        text = text[1:]
+    if text[:1] in "qQ":
+        return text[3:-2]
+    return text[1:-1].replace("''", "'")
@@ -0,0 +1,283 @@
+import itertools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+LEVELS = ("off", "summary", "full")
+
+# "off" records nothing, "summary" records spans and logs payload sizes,
+# "full" also logs complete prompts and model outputs
+_level = "summary"
+_jsonl_path: Optional[str] = None
+_jsonl_lock = threading.Lock()
+_local = threading.local()
+_trace_ids = itertools.count(1)
+
+
+def configure(level: str = "summary", jsonl_path: Optional[str] = None):
+    """Set the process-wide sampling level and optional JSON-lines span log."""
+    global _level, _jsonl_path
+    level = level.lower()
+    if level not in LEVELS:
+        raise ValueError(f"Unknown telemetry level {level!r}; expected one of {', '.join(LEVELS)}")
+    _level = level
+    _jsonl_path = jsonl_path
+
+
+def level() -> str:
+    return _level
+
+
+def log_payload(label: str, text: Optional[str]):
+    """Log a prompt or model output according to the sampling level."""
+    if _level == "full":
+        logging.info(f"{label}:\n{text}")
+    elif _level == "summary":
+        logging.info(f"{label}: {len(text or '')} chars")
+
+
+class Span:
+    """One timed stage of a request; attrs carry sizes, token counts and flags."""
+
+    __slots__ = ("name", "started_at", "duration", "attrs", "error")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.attrs = attrs
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span": self.name,
+            "started_at": self.started_at,
+            "ms": round(self.duration * 1000, 3),
+            "error": self.error,
+            **self.attrs,
+        }
+
+
+class Trace:
+    """Spans recorded for one user request: a generation, a query job or a chat answer."""
+
+    def __init__(self, name: str, max_spans: int = 200):
+        self.id = next(_trace_ids)
+        self.name = name
+        self.started_at = time.time()
+        self.max_spans = max_spans
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            if len(self._spans) < self.max_spans:
+                self._spans.append(span)
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    @property
+    def elapsed(self) -> float:
+        """Wall time from the first span's start to the last span's end."""
+        spans = self.spans
+        if not spans:
+            return 0.0
+        return max(s.started_at + s.duration for s in spans) - min(s.started_at for s in spans)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [s.to_dict() for s in self.spans]
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]):
+    """Attach spans recorded on this thread to trace for the duration of the block."""
+    previous = getattr(_local, "trace", None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def current_trace() -> Optional[Trace]:
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """Time a block as a span of the current trace and the process-wide metrics."""
+    current = Span(name, attrs)
+    if _level == "off":
+        yield current
+        return
+    start = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        _finish(current)
+
+
+def record(name: str, duration: float, **attrs):
+    """Record a span whose time was accumulated elsewhere, such as fetch loops."""
+    if _level == "off":
+        return
+    current = Span(name, attrs)
+    current.started_at -= duration
+    current.duration = duration
+    _finish(current)
+
+
+def _finish(current: Span):
+    trace = current_trace()
+    if trace is not None:
+        trace.add(current)
+    _REGISTRY.observe(current)
+    if _jsonl_path:
+        line = {"trace_id": trace.id if trace else None,
+                "trace": trace.name if trace else None,
+                **current.to_dict()}
+        try:
+            with _jsonl_lock, open(_jsonl_path, "a") as f:
+                f.write(json.dumps(line, default=str) + "\n")
+        except OSError as e:
+            logging.error(f"Error writing telemetry span: {str(e)}")
+
+
+class MetricsRegistry:
+    """Process-wide span latency and LLM token aggregates."""
+
+    def __init__(self):
+        self._spans: Dict[str, Dict[str, float]] = {}
+        self._tokens: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, current: Span):
+        with self._lock:
+            stats = self._spans.setdefault(
+                current.name, {"count": 0, "sum": 0.0, "max": 0.0, "errors": 0}
+            )
+            stats["count"] += 1
+            stats["sum"] += current.duration
+            stats["max"] = max(stats["max"], current.duration)
+            if current.error:
+                stats["errors"] += 1
+            model = current.attrs.get("model", "")
+            for kind in ("prompt", "completion"):
+                tokens = current.attrs.get(f"{kind}_tokens")
+                if tokens:
+                    key = (current.name, model, kind)
+                    self._tokens[key] = self._tokens.get(key, 0) + int(tokens)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._spans.items()}
+
+    def prometheus_text(self) -> str:
+        """Render the aggregates in the Prometheus text exposition format."""
+        with self._lock:
+            spans = {name: dict(stats) for name, stats in self._spans.items()}
+            tokens = dict(self._tokens)
+        lines = [
+            "# HELP assistant_span_seconds Time spent per request stage.",
+            "# TYPE assistant_span_seconds summary",
+        ]
+        for name, stats in sorted(spans.items()):
+            lines.append(f'assistant_span_seconds_count{{span="{name}"}} {stats["count"]}')
+            lines.append(f'assistant_span_seconds_sum{{span="{name}"}} {stats["sum"]:.6f}')
+        lines += [
+            "# HELP assistant_span_seconds_max Slowest observation per request stage.",
+            "# TYPE assistant_span_seconds_max gauge",
+        ]
+        for name, stats in sorted(spans.items()):
+            lines.append(f'assistant_span_seconds_max{{span="{name}"}} {stats["max"]:.6f}')
+        lines += [
+            "# HELP assistant_span_errors_total Failed observations per request stage.",
+            "# TYPE assistant_span_errors_total counter",
+        ]
+        for name, stats in sorted(spans.items()):
+            lines.append(f'assistant_span_errors_total{{span="{name}"}} {stats["errors"]}')
+        lines += [
+            "# HELP assistant_llm_tokens_total LLM tokens reported by the API.",
+            "# TYPE assistant_llm_tokens_total counter",
+        ]
+        for (name, model, kind), count in sorted(tokens.items()):
+            lines.append(f'assistant_llm_tokens_total{{span="{name}",model="{model}",kind="{kind}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+_REGISTRY = MetricsRegistry()
+
+
+def metrics() -> MetricsRegistry:
+    return _REGISTRY
+
+
+_gauges: Dict[str, tuple] = {}
+
+
+def register_gauges(prefix: str, description: str, read: Callable[[], Dict[str, float]],
+                    counters: Iterable[str] = ()):
+    """
+    Export the values returned by read() on /metrics as <prefix>_<key>
+    gauges; keys listed in counters are monotonic and exported as
+    <prefix>_<key>_total counters.
+    """
+    _gauges[prefix] = (description, read, frozenset(counters))
+
+
+def prometheus_text() -> str:
+    lines = [_REGISTRY.prometheus_text()]
+    for prefix, (description, read, counters) in sorted(_gauges.items()):
+        try:
+            values = read()
+        except Exception as e:
+            logging.error(f"Error reading {prefix} gauges: {str(e)}")
+            continue
+        for key, value in values.items():
+            if key in counters:
+                name, kind = f"{prefix}_{key}_total", "counter"
+            else:
+                name, kind = f"{prefix}_{key}", "gauge"
+            lines.append(f"# HELP {name} {description}\n# TYPE {name} {kind}\n{name} {value}\n")
+    return "".join(lines)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics for Prometheus on a daemon thread, once per process."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
@@ -0,0 +1,91 @@
+import datetime
+import decimal
+import pytest
+from bind_variables import rewrite_literals
+
+
+def test_string_literals_bind_with_char_semantics():
+    bound = rewrite_literals("SELECT * FROM t WHERE a = 'it''s' AND b = q'[x'y]'")
+    assert bound.sql == "SELECT * FROM t WHERE a = :b1 AND b = :b2"
+    assert bound.binds == {"b1": "it's", "b2": "x'y"}
+    assert bound.input_types == {"b1": "CHAR", "b2": "CHAR"}
+
+
+def test_national_literals_stay_inline():
+    sql = "SELECT * FROM t WHERE a = N'abc'"
+    assert rewrite_literals(sql).sql == sql
+
+
+def test_comments_and_hints_are_preserved():
+    sql = "SELECT /*+ FIRST_ROWS(10) */ a FROM t -- where b = 'x'\nWHERE b = 'y'"
+    bound = rewrite_literals(sql)
+    assert bound.sql == "SELECT /*+ FIRST_ROWS(10) */ a FROM t -- where b = 'x'\nWHERE b = :b1"
+    assert bound.binds == {"b1": "y"}
+
+
+def test_date_and_timestamp_literals_bind_as_values():
+    bound = rewrite_literals(
+        "SELECT * FROM t WHERE d = DATE '2024-01-31' AND ts < TIMESTAMP '2024-01-31 12:30:00'"
+    )
+    assert bound.sql == "SELECT * FROM t WHERE d = :b1 AND ts < :b2"
+    assert bound.binds == {"b1": datetime.date(2024, 1, 31), "b2": datetime.datetime(2024, 1, 31, 12, 30)}
+    assert bound.input_types == {"b2": "TIMESTAMP"}
+
+
+@pytest.mark.parametrize("literal", [
+    "TIMESTAMP '2020-01-01 10:00:00 +02:00'",
+    "TIMESTAMP '2020-01-01 10:00:00+00:00'",
+    "TIMESTAMP '2020-01-01 10:00:00 US/Pacific'",
+])
+def test_timestamp_literals_with_a_time_zone_stay_inline(literal):
+    sql = f"SELECT * FROM t WHERE ts < {literal}"
+    assert rewrite_literals(sql).sql == sql
+
+
+def test_invalid_date_literal_stays_inline():
+    sql = "SELECT * FROM t WHERE d = DATE '2024-02-30'"
+    assert rewrite_literals(sql).sql == sql
+
+
+def test_interval_literals_stay_inline():
+    sql = "SELECT * FROM t WHERE d > SYSDATE - INTERVAL '5' DAY"
+    assert rewrite_literals(sql).sql == sql
+
+
+def test_negative_numbers_keep_their_sign():
+    bound = rewrite_literals("SELECT * FROM t WHERE a = -5 AND b > -1.5e3")
+    assert bound.sql == "SELECT * FROM t WHERE a = -:b1 AND b > -:b2"
+    assert bound.binds == {"b1": 5, "b2": decimal.Decimal("1.5e3")}
+
+
+def test_binary_float_literals_stay_inline():
+    sql = "SELECT * FROM t WHERE f = 1.5f"
+    assert rewrite_literals(sql).sql == sql
+
+
+def test_in_lists_are_padded_to_a_power_of_two():
+    bound = rewrite_literals("SELECT * FROM t WHERE id IN (1, 2, 3)")
+    assert bound.sql == "SELECT * FROM t WHERE id IN (:b1, :b2, :b3, :b4)"
+    assert list(bound.binds.values()) == [1, 2, 3, 3]
+
+
+def test_select_list_and_order_by_literals_stay_inline():
+    sql = "SELECT 'label', 1 FROM t ORDER BY 1"
+    assert rewrite_literals(sql).sql == sql
+
+
+def test_statements_with_binds_or_dml_are_unchanged():
+    for sql in ("SELECT * FROM t WHERE a = :x AND b = 1", "UPDATE t SET a = 1", "SELECT 'open FROM t"):
+        assert rewrite_literals(sql).binds == {}
+
+
+def test_allow_binds_keeps_named_binds_and_avoids_their_names():
+    bound = rewrite_literals("SELECT * FROM t WHERE a = :B1 AND b = 'x'\nFETCH FIRST :pager_rows ROWS ONLY",
+                             allow_binds=True)
+    assert bound.sql == "SELECT * FROM t WHERE a = :B1 AND b = :b2\nFETCH FIRST :pager_rows ROWS ONLY"
+    assert bound.binds == {"b2": "x"}
+
+
+def test_allow_binds_leaves_positional_binds_alone():
+    sql = "SELECT * FROM t WHERE a = :1 AND b = 'x'"
+    assert rewrite_literals(sql, allow_binds=True).sql == sql
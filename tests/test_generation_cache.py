@@ -0,0 +1,40 @@
+from generation_cache import GenerationCache, normalize_question
+
+
+def cache(tmp_path, threshold=None):
+    return GenerationCache(str(tmp_path / "nl2sql.db"), similarity_threshold=threshold)
+
+
+def test_normalize_keeps_operators_and_quoted_values():
+    assert normalize_question("Show  salary > 5000!") == "show salary > 5000"
+    assert normalize_question("Employees named 'King'") == "employees named 'King'"
+
+
+def test_exact_key_distinguishes_operators_and_literal_case(tmp_path):
+    c = cache(tmp_path)
+    c.put("employees with salary < 5000", "prompt", "model", "SQL_LT")
+    c.put("employees with name = 'KING'", "prompt", "model", "SQL_UPPER")
+    assert c.get("Employees with salary < 5000?", "prompt", "model") == "SQL_LT"
+    assert c.get("employees with salary > 5000", "prompt", "model") is None
+    assert c.get("employees with name = 'King'", "prompt", "model") is None
+
+
+def test_near_duplicates_only_differ_in_filler_words(tmp_path):
+    c = cache(tmp_path, threshold=0.5)
+    c.put("show me all employees in sales", "prompt", "model", "SQL")
+    assert c.get("show me the employees in sales", "prompt", "model") == "SQL"
+    assert c.get("show me all employees in marketing", "prompt", "model") is None
+
+
+def test_logical_words_are_not_filler(tmp_path):
+    c = cache(tmp_path, threshold=0.5)
+    c.put("employees in sales and marketing", "prompt", "model", "SQL_AND")
+    assert c.get("employees in sales or marketing", "prompt", "model") is None
+    assert c.get("employees not in sales and marketing", "prompt", "model") is None
+
+
+def test_context_change_misses(tmp_path):
+    c = cache(tmp_path)
+    c.put("count orders", "prompt", "model", "SQL")
+    assert c.get("count orders", "prompt v2", "model") is None
+    assert c.get("count orders", "prompt", "other-model") is None
@@ -0,0 +1,159 @@
+import re
+import sqlite3
+import pandas as pd
+import pytest
+from result_pager import ResultPager, OrderKey, _seek_predicate, _analyze
+
+ROWS = [
+    # ID, GRP, NAME
+    (1, "a", "x"), (2, "a", None), (3, "a", "y"), (4, "b", "x"), (5, "b", "x"),
+    (6, "b", None), (7, "b", "z"), (8, "c", "y"), (9, "c", None), (10, "c", "x"),
+    (11, "c", "x"), (12, "d", "w"),
+]
+
+
+class _Stream:
+    def __init__(self, df):
+        self.df = df
+
+    def to_dataframe(self):
+        return self.df
+
+
+class SqliteOracle:
+    """Runs page queries against an in-memory table, translating Oracle row limiting to LIMIT/OFFSET."""
+
+    username = "APP"
+    result_cache = None
+
+    def __init__(self, error=None):
+        self.db = sqlite3.connect(":memory:")
+        self.db.execute("CREATE TABLE T (ID INTEGER, GRP TEXT, NAME TEXT)")
+        self.db.executemany("INSERT INTO T VALUES (?, ?, ?)", ROWS)
+        self.error = error
+        self.statements = []
+
+    def stream_query(self, sql, binds=None, max_rows=None, use_cache=True):
+        self.statements.append(sql)
+        if self.error is not None and "pager_q" in sql:
+            raise Exception(self.error)
+        sql = re.sub(r"OFFSET (:\w+) ROWS FETCH NEXT (:\w+) ROWS ONLY", r"LIMIT \2 OFFSET \1", sql)
+        sql = re.sub(r"FETCH FIRST (:?\w+) ROWS ONLY", r"LIMIT \1", sql)
+        cursor = self.db.execute(sql, binds or {})
+        rows = cursor.fetchall()
+        if max_rows is not None:
+            rows = rows[:max_rows]
+        return _Stream(pd.DataFrame(rows, columns=[d[0] for d in cursor.description]))
+
+    def ordered(self, sql):
+        return [tuple(row) for row in self.db.execute(sql)]
+
+
+def read_all(pager, oracle, limit=20):
+    rows = []
+    for page in range(limit):
+        df = pager.load(oracle, page)
+        rows += [tuple(None if pd.isna(v) else v for v in row) for row in df.itertuples(index=False)]
+        if pager.last_page is not None and page >= pager.last_page:
+            break
+    return rows
+
+
+@pytest.mark.parametrize("order_by", [
+    "GRP, ID",
+    "GRP DESC, ID",
+    "GRP, ID DESC",
+    # NULL ordering spelled out: SQLite's defaults differ from Oracle's
+    "GRP DESC, NAME NULLS LAST, ID",
+    "NAME NULLS FIRST, ID DESC",
+    "NAME DESC NULLS LAST, GRP, ID",
+    "2, 1",
+])
+def test_keyset_pages_match_the_full_ordered_result(order_by):
+    sql = f"SELECT * FROM T ORDER BY {order_by}"
+    oracle = SqliteOracle()
+    pager = ResultPager(sql, page_size=3)
+    assert read_all(pager, oracle) == oracle.ordered(sql)
+    assert pager.mode == "keyset" and pager.notice is None
+    assert any("pager_q" in statement for statement in oracle.statements)
+
+
+def test_ties_on_a_non_unique_key_span_pages():
+    sql = "SELECT * FROM T ORDER BY GRP"
+    oracle = SqliteOracle()
+    pager = ResultPager(sql, page_size=2)
+    rows = read_all(pager, oracle)
+    assert [row[1] for row in rows] == [row[1] for row in oracle.ordered(sql)]
+    assert sorted(row[0] for row in rows) == list(range(1, 13))
+    # Page 2 ends inside the run of "b" rows that started on page 1
+    assert pager.page_query(3).binds["pager_ties"] == 3
+
+
+def test_null_last_key_falls_back_to_offset_for_the_next_page():
+    sql = "SELECT * FROM T ORDER BY NAME NULLS FIRST, ID"
+    oracle = SqliteOracle()
+    pager = ResultPager(sql, page_size=2)
+    pager.load(oracle, 0)
+    assert pager.page_query(1).binds == {"pager_offset": 2, "pager_rows": 2}
+    assert read_all(pager, oracle) == oracle.ordered(sql)
+
+
+def test_seek_predicate_handles_mixed_directions_and_nulls():
+    keys = [OrderKey("A", False, False), OrderKey("B", True, True)]
+    assert _seek_predicate(keys) == (
+        '(("A" > :pager_k1 OR "A" IS NULL) OR ("A" = :pager_k1 AND "B" <= :pager_k2))'
+    )
+
+
+def test_order_by_a_column_missing_from_the_result_falls_back_with_a_notice():
+    oracle = SqliteOracle()
+    pager = ResultPager("SELECT ID, NAME FROM T ORDER BY GRP, ID", page_size=5)
+    assert pager.mode == "keyset"
+    pager.load(oracle, 0)
+    assert pager.mode == "offset"
+    assert "ORDER BY does not name a unique result column" in pager.notice
+    assert "pager_offset" in pager.page_query(1).binds
+
+
+def test_keyset_query_errors_fall_back_to_offset():
+    oracle = SqliteOracle(error="ORA-00918: column ambiguously defined")
+    pager = ResultPager("SELECT * FROM T ORDER BY ID", page_size=5)
+    assert read_all(pager, oracle) == oracle.ordered("SELECT * FROM T ORDER BY ID")
+    assert pager.mode == "offset" and pager.notice is not None
+
+
+def test_other_keyset_query_errors_are_raised():
+    oracle = SqliteOracle(error="ORA-01013: user requested cancel of current operation")
+    pager = ResultPager("SELECT * FROM T ORDER BY ID", page_size=5)
+    pager.load(oracle, 0)
+    with pytest.raises(Exception, match="ORA-01013"):
+        pager.load(oracle, 1)
+
+
+@pytest.mark.parametrize("sql, mode", [
+    ("SELECT * FROM T", "offset"),
+    ("SELECT * FROM T ORDER BY UPPER(NAME)", "offset"),
+    ("SELECT * FROM T ORDER BY T.*", "offset"),
+    ("SELECT ID FROM T UNION SELECT ID FROM T ORDER BY 1", "offset"),
+    ("SELECT * FROM T ORDER BY ID FETCH FIRST 5 ROWS ONLY", "scan"),
+    ("SELECT * FROM (SELECT * FROM T FETCH FIRST 5 ROWS ONLY) ORDER BY ID", "keyset"),
+])
+def test_paging_mode_by_statement_shape(sql, mode):
+    assert ResultPager(sql).mode == mode
+
+
+def test_scan_pages_re_read_the_limited_statement():
+    oracle = SqliteOracle()
+    sql = "SELECT * FROM T ORDER BY ID FETCH FIRST 7 ROWS ONLY"
+    pager = ResultPager(sql, page_size=3)
+    assert read_all(pager, oracle) == oracle.ordered("SELECT * FROM T ORDER BY ID LIMIT 7")
+    assert pager.last_page == 2
+
+
+def test_analyze_strips_only_the_top_level_order_by():
+    base_sql, items, names = _analyze(
+        "SELECT e.id AS emp_id, name FROM (SELECT * FROM t ORDER BY x) e ORDER BY emp_id DESC"
+    )
+    assert base_sql == "SELECT e.id AS emp_id, name FROM (SELECT * FROM t ORDER BY x) e"
+    assert [(item.parts, item.descending, item.nulls_first) for item in items] == [(("EMP_ID",), True, True)]
+    assert names == [(("E", "ID"), "EMP_ID"), (("NAME",), "NAME")]
@@ -0,0 +1,145 @@
+import pytest
+from security import SecurityManager, add_row_limit
+
+
+class PlanSource:
+    """Stands in for OracleManager.explain_plan with a fixed plan or error."""
+
+    def __init__(self, plan=None, error=None):
+        self.username = "APP"
+        self.plan = plan or []
+        self.error = error
+        self.calls = 0
+
+    def explain_plan(self, sql):
+        self.calls += 1
+        if self.error is not None:
+            raise Exception(self.error)
+        return self.plan
+
+
+def plan(cost=10, cardinality=100, steps=()):
+    return [{"id": 0, "operation": "SELECT STATEMENT", "options": None,
+             "cost": cost, "cardinality": cardinality}] + list(steps)
+
+
+def full_scan(blocks, operation="TABLE ACCESS", options="FULL", name="ORDERS"):
+    return {"operation": operation, "options": options, "object_owner": "APP",
+            "object_name": name, "blocks": blocks}
+
+
+def test_defaults_enforce_every_threshold():
+    security = SecurityManager()
+    assert security.max_cost == 100000
+    assert security.max_cardinality == 1000000
+    assert security.max_full_scan_blocks == 100000
+    assert security.fail_closed
+
+
+def test_plan_within_thresholds_is_allowed():
+    verdict = SecurityManager().check_plan(PlanSource(plan(cost=500, cardinality=1000)), "SELECT * FROM t")
+    assert verdict.allowed and not verdict.limited
+    assert verdict.sql == "SELECT * FROM t"
+    assert (verdict.cost, verdict.cardinality) == (500, 1000)
+
+
+@pytest.mark.parametrize("cost, cardinality, reason", [
+    (200001, 10, "estimated cost 200,001 exceeds 100,000"),
+    (10, 2000000, "estimated 2,000,000 rows exceeds 1,000,000"),
+])
+def test_cost_and_cardinality_violations_reject(cost, cardinality, reason):
+    verdict = SecurityManager().check_plan(PlanSource(plan(cost, cardinality)), "SELECT * FROM t")
+    assert not verdict.allowed
+    assert verdict.reason == reason
+
+
+def test_disabled_thresholds_are_not_enforced():
+    security = SecurityManager(max_cost=None, max_cardinality=None)
+    assert security.check_plan(PlanSource(plan(10 ** 9, 10 ** 9)), "SELECT * FROM t").allowed
+
+
+def test_limit_action_adds_a_row_limit():
+    security = SecurityManager(action="limit", row_limit=50)
+    verdict = security.check_plan(PlanSource(plan(cost=10 ** 6)), "SELECT * FROM t;")
+    assert verdict.allowed and verdict.limited
+    assert verdict.sql == "SELECT * FROM t\nFETCH FIRST 50 ROWS ONLY"
+
+
+def test_limit_action_rejects_statements_that_already_limit_rows():
+    security = SecurityManager(action="limit")
+    verdict = security.check_plan(PlanSource(plan(cost=10 ** 6)), "SELECT * FROM t FETCH FIRST 10 ROWS ONLY")
+    assert not verdict.allowed and not verdict.limited
+
+
+def test_cartesian_join_is_rejected_unless_allowed():
+    steps = [{"operation": "MERGE JOIN", "options": "CARTESIAN"}]
+    assert SecurityManager().check_plan(PlanSource(plan(steps=steps)), "SELECT * FROM a, b").reason == \
+        "the plan contains a Cartesian join"
+    assert SecurityManager(allow_cartesian=True).check_plan(PlanSource(plan(steps=steps)), "SELECT * FROM a, b").allowed
+
+
+@pytest.mark.parametrize("operation, options", [
+    ("TABLE ACCESS", "FULL"),
+    ("MAT_VIEW ACCESS", "FULL"),
+    ("INDEX", "FAST FULL SCAN"),
+    ("INDEX", "FULL SCAN"),
+])
+def test_full_scans_of_large_segments_are_rejected(operation, options):
+    steps = [full_scan(200000, operation, options)]
+    verdict = SecurityManager(action="limit").check_plan(PlanSource(plan(steps=steps)), "SELECT * FROM orders")
+    assert not verdict.allowed and not verdict.limited
+    assert verdict.full_scans == ["APP.ORDERS (200000 blocks)"]
+
+
+def test_full_scans_of_small_or_unanalyzed_segments_pass():
+    steps = [full_scan(10), full_scan(None, name="STAGING"), full_scan(10 ** 6, options="BY INDEX ROWID")]
+    assert SecurityManager().check_plan(PlanSource(plan(steps=steps)), "SELECT * FROM orders").allowed
+
+
+def test_empty_plan_is_allowed():
+    assert SecurityManager().check_plan(PlanSource([]), "SELECT 1 FROM dual").allowed
+
+
+def test_fails_closed_by_default_when_the_plan_is_unavailable():
+    verdict = SecurityManager().check_plan(PlanSource(error="ORA-01039"), "SELECT * FROM v")
+    assert not verdict.allowed
+    assert verdict.reason == "Plan check unavailable: ORA-01039"
+
+
+def test_fail_open_allows_and_retries_the_plan_check():
+    source = PlanSource(error="ORA-01039")
+    security = SecurityManager(fail_closed=False)
+    assert security.check_plan(source, "SELECT * FROM v").allowed
+    assert security.check_plan(source, "SELECT * FROM v").allowed
+    assert source.calls == 2
+
+
+def test_verdicts_are_cached_per_statement():
+    source = PlanSource(plan())
+    security = SecurityManager()
+    assert not security.check_plan(source, "SELECT * FROM t").cached
+    assert security.check_plan(source, "select *  from t").cached
+    assert source.calls == 1
+
+
+@pytest.mark.parametrize("sql, limited", [
+    ("SELECT * FROM t ORDER BY a", "SELECT * FROM t ORDER BY a\nFETCH FIRST 5 ROWS ONLY"),
+    ("SELECT * FROM t;", "SELECT * FROM t\nFETCH FIRST 5 ROWS ONLY"),
+    ("SELECT * FROM t -- note", "SELECT * FROM t -- note\nFETCH FIRST 5 ROWS ONLY"),
+    # ROWNUM filters before ORDER BY and may allow more rows; the fetch limit still applies
+    ("SELECT * FROM t WHERE ROWNUM <= 10000", "SELECT * FROM t WHERE ROWNUM <= 10000\nFETCH FIRST 5 ROWS ONLY"),
+    ("SELECT * FROM (SELECT * FROM t FETCH FIRST 10 ROWS ONLY)",
+     "SELECT * FROM (SELECT * FROM t FETCH FIRST 10 ROWS ONLY)\nFETCH FIRST 5 ROWS ONLY"),
+])
+def test_add_row_limit(sql, limited):
+    assert add_row_limit(sql, 5) == limited
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM t FETCH FIRST 10 ROWS ONLY",
+    "SELECT * FROM t OFFSET 10 ROWS",
+    "SELECT * FROM t ORDER BY a OFFSET 5 ROWS FETCH NEXT 10 ROWS ONLY",
+    "SELECT 'open FROM t",
+])
+def test_add_row_limit_leaves_limited_or_unparsable_statements(sql):
+    assert add_row_limit(sql, 5) is None
@@ -0,0 +1,80 @@
+import pytest
+from sql_tokenizer import tokenize, significant, split_statements, string_value, SQLTokenizeError
+
+
+def kinds(sql):
+    return [(t.kind, t.text) for t in significant(tokenize(sql))]
+
+
+def test_tokens_round_trip():
+    sql = "SELECT /*+ FULL(t) */ a, 'x' FROM t -- done\nWHERE b = :1"
+    assert "".join(t.text for t in tokenize(sql)) == sql
+
+
+def test_quoted_literal_with_doubled_quote():
+    assert kinds("SELECT 'it''s' FROM dual")[1] == ("string", "'it''s'")
+    assert string_value("'it''s'") == "it's"
+
+
+@pytest.mark.parametrize("literal, value", [
+    ("q'[it's]'", "it's"),
+    ("q'{a}b}'", "a}b"),
+    ("Q'(x)'", "x"),
+    ("q'<--not a comment>'", "--not a comment"),
+    ("q'!a'b!'", "a'b"),
+    ("nq'[x]'", "x"),
+])
+def test_q_quoted_literals(literal, value):
+    tokens = kinds(f"SELECT {literal} FROM dual")
+    assert tokens[1] == ("string", literal)
+    assert string_value(literal) == value
+
+
+def test_national_literal():
+    assert kinds("SELECT N'abc' FROM dual")[1] == ("string", "N'abc'")
+    assert string_value("N'abc'") == "abc"
+
+
+def test_comments_hide_quotes_and_keywords():
+    tokens = tokenize("SELECT a -- it's 'not' a string\nFROM t /* WHERE 'x' */")
+    assert [t.text for t in tokens if t.kind == "comment"] == ["-- it's 'not' a string", "/* WHERE 'x' */"]
+    assert [t.text for t in significant(tokens)] == ["SELECT", "a", "FROM", "t"]
+
+
+def test_hint_is_a_comment():
+    tokens = tokenize("SELECT /*+ INDEX(t t_i) FIRST_ROWS(10) */ * FROM t")
+    assert (tokens[2].kind, tokens[2].text) == ("comment", "/*+ INDEX(t t_i) FIRST_ROWS(10) */")
+
+
+def test_date_and_interval_literals():
+    assert kinds("DATE '2024-01-31'") == [("ident", "DATE"), ("string", "'2024-01-31'")]
+    assert kinds("INTERVAL '5' DAY") == [("ident", "INTERVAL"), ("string", "'5'"), ("ident", "DAY")]
+
+
+def test_negative_numbers_are_unary_minus():
+    assert kinds("a-1") == [("ident", "a"), ("op", "-"), ("number", "1")]
+    assert kinds("-1.5e-3") == [("op", "-"), ("number", "1.5e-3")]
+
+
+def test_binary_float_suffix_and_identifiers():
+    assert kinds("1.5f 2d") == [("number", "1.5f"), ("number", "2d")]
+    # A digit run followed by letters is not a number
+    assert kinds("t1 col$x") == [("ident", "t1"), ("ident", "col$x")]
+
+
+def test_quoted_identifier_and_binds():
+    assert kinds('SELECT "Mixed Case" FROM t WHERE a = :name AND b = :1') == [
+        ("ident", "SELECT"), ("quoted_ident", '"Mixed Case"'), ("ident", "FROM"), ("ident", "t"),
+        ("ident", "WHERE"), ("ident", "a"), ("op", "="), ("bind", ":name"), ("ident", "AND"),
+        ("ident", "b"), ("op", "="), ("bind", ":1"),
+    ]
+
+
+def test_split_statements_ignores_semicolons_in_literals_and_comments():
+    statements = split_statements(tokenize("SELECT ';' FROM dual; -- ;\nSELECT 1 FROM dual;"))
+    assert len(statements) == 2
+
+
+def test_unterminated_literal_raises():
+    with pytest.raises(SQLTokenizeError):
+        tokenize("SELECT 'open FROM dual")